@@ -198,3 +198,33 @@ class SheriffBombRule(Enum):
             '单爆吞警徽': cls.SINGLE_LOSS,
             '双爆吞警徽': cls.DOUBLE_LOSS,
         }
+
+
+# === 对局节奏 ===
+class PacingProfile(Enum):
+    STANDARD = '标准'
+    FAST = '快速'
+    TOURNAMENT = '比赛'
+    CUSTOM = '自定义'
+
+    @classmethod
+    def as_options(cls) -> list:
+        return list(cls.mapping().keys())
+
+    @classmethod
+    def from_option(cls, option: Union[str, list]):
+        if isinstance(option, list):
+            return [cls.mapping()[item] for item in option]
+        elif isinstance(option, str):
+            return cls.mapping()[option]
+        else:
+            raise NotImplementedError
+
+    @classmethod
+    def mapping(cls) -> dict:
+        return {
+            '标准': cls.STANDARD,
+            '快速': cls.FAST,
+            '比赛': cls.TOURNAMENT,
+            '自定义': cls.CUSTOM,
+        }
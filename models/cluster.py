@@ -0,0 +1,32 @@
+# models/cluster.py
+"""Multi-worker mode: rooms are sharded over worker processes by room id.
+
+``python server.py --workers N`` starts N server processes on consecutive
+ports.  The worker owning a room is ``room id % N``; room ids are allocated so
+that every worker only creates rooms it owns (``Global.reg_room``).  A room
+never spans processes, so socket.io needs no cross-process client manager:
+before joining a room owned by another worker, the player is sent to that
+worker (``switch_shard``) and reconnects there with their token.  Workers share
+the SQLite store (``models/store.py``) for reconnect tokens, room membership
+and the per-worker lobby listings.
+"""
+from models.system import Config
+
+
+def enabled() -> bool:
+    return Config.SHARD_COUNT > 1
+
+
+def shard_of(room_id) -> int:
+    return int(room_id) % Config.SHARD_COUNT
+
+
+def is_local(room_id) -> bool:
+    return shard_of(room_id) == Config.SHARD_INDEX
+
+
+def shard_address(index: int) -> dict:
+    """Where browsers reach worker ``index``: a public URL if configured, else a port on the same host."""
+    if index < len(Config.SHARD_URLS):
+        return {'url': Config.SHARD_URLS[index]}
+    return {'port': Config.SHARD_BASE_PORT + index}
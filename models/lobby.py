@@ -10,7 +10,7 @@ from presets.game_config_registry import (
     get_special_preset_templates,
 )
 from models.room import Room
-from models.system import Global
+from models.system import Global, ROOM_FULL, ROOM_STARTED
 
 PRESET_DEV_3 = 'preset_dev_3'
 PRESET_DEV_6 = 'preset_dev_6'
@@ -92,20 +92,37 @@ def _format_role_config_summary(roles) -> str:
     return '、'.join(parts)
 
 
+# 大厅房间列表缓存：房间顺序按 Global.rooms_version 失效，每行按房间的座位/配置版本与人数失效
+_sorted_rooms: dict = {'key': None, 'rooms': []}
+_room_lines: dict = {}  # room id -> ((seat_state_version, 人数, 状态), line)
+STATUS_TAGS = {ROOM_FULL: '｜已满', ROOM_STARTED: '｜游戏中'}
+
+
+def room_info_line(room: Room) -> dict:
+    status = Global.room_status(room.id)
+    stamp = (room.seat_state_version, len(room.players), status)
+    cached = _room_lines.get(room.id)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    config = _format_role_config_summary(room.roles)
+    line = {
+        'room_id': str(room.id),
+        'status': status,
+        'text': f"{room.id}号：{len(room.players)}/{len(room.roles)} 人｜{config}{STATUS_TAGS.get(status, '')}"
+    }
+    _room_lines[room.id] = (stamp, line)
+    return line
+
+
 def build_room_info_lines() -> list:
-    rooms = list(Global.rooms.values())
-    if not rooms:
-        return []
-    lines = []
-    for room in sorted(rooms, key=lambda r: r.id or 0):
-        current = len(room.players)
-        total = len(room.roles)
-        config = _format_role_config_summary(room.roles)
-        lines.append({
-            'room_id': str(room.id),
-            'text': f"{room.id}号：{current}/{total} 人｜{config}"
-        })
-    return lines
+    key = (Global.rooms_version, len(Global.rooms))
+    if _sorted_rooms['key'] != key:
+        _sorted_rooms['key'] = key
+        _sorted_rooms['rooms'] = sorted(Global.rooms.values(), key=lambda r: r.id or 0)
+        live = {room.id for room in _sorted_rooms['rooms']}
+        for room_id in [room_id for room_id in _room_lines if room_id not in live]:
+            del _room_lines[room_id]
+    return [room_info_line(room) for room in _sorted_rooms['rooms']]
 
 
 def resolve_room_config(preset_choice: str, custom_data: Optional[dict] = None) -> Optional[dict]:
@@ -0,0 +1,210 @@
+# models/message_log.py
+"""Room message log indexed by audience.
+
+Every entry is kept once in the transcript (in order) and additionally indexed
+into the channel of its audience:
+
+* broadcast channel – public messages (``Config.SYS_NICK``) and control entries
+  (``LogCtrl.RemoveInput``), delivered to everyone in the room;
+* private channels – one per nick, delivered only to that player.
+
+Each channel stores the client message dict already built, so a broadcast is
+serialised once and the same dict is shared by every recipient.  A player's
+``LogCursor`` remembers a position in the broadcast channel and in their own
+private channel, so delivering pending messages costs O(new messages for me).
+
+Entries are numbered by an absolute ``seq`` (carried in every client message)
+that keeps growing while the room lives, across ``clear()``.  Only the recent part of the log stays
+in memory: ``spill()`` drops whole ``SEGMENT``s that every connected reader
+has passed and that the on-disk journal (``LogArchive``'s ``room_log``) has
+committed; ``history()`` pages older messages back from memory or the journal.
+"""
+from dataclasses import dataclass
+from heapq import merge
+from operator import itemgetter
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from enums import LogCtrl
+from models.system import Config
+
+LogContent = Union[str, LogCtrl, Dict[str, Any]]
+_seq_of = itemgetter(0)
+SEGMENT = 256  # entries spilled from memory at a time
+
+# (before seq, limit, nick) -> the latest journaled (seq, sender, content) visible to nick, newest first
+ArchiveReader = Callable[[int, int, str], Awaitable[List[Tuple[int, Optional[str], LogContent]]]]
+
+
+class LogEntry(NamedTuple):
+    """One transcript line; unpacks like the historical ``(sender, content)`` tuple."""
+    sender: Optional[str]
+    content: LogContent
+
+
+@dataclass
+class LogCursor:
+    """Per-user read position: next index in the broadcast and private channels."""
+    broadcast: int = 0
+    private: int = 0
+
+
+def _format(seq: int, sender: Optional[str], content: LogContent) -> Optional[dict]:
+    """Client message dict for a log entry (None for entries that are never delivered)."""
+    if sender == Config.SYS_NICK:
+        if isinstance(content, dict):
+            return {'type': 'public', 'text': content.get('text', ''), 'tts': bool(content.get('tts')), 'seq': seq}
+        return {'type': 'public', 'text': str(content), 'tts': False, 'seq': seq}
+    if sender is None:
+        return {'type': 'cancel_input', 'seq': seq} if content == LogCtrl.RemoveInput else None
+    return {'type': 'private', 'text': str(content), 'seq': seq}
+
+
+class MessageLog:
+    """Indexing (``log[i]``, ``log[i:]``) and ``len()`` use absolute seq numbers; iteration
+    covers the entries still in memory, from ``first_seq`` on."""
+
+    def __init__(self, first_seq: int = 0):
+        self._entries: List[LogEntry] = []
+        self._base = first_seq  # seq of _entries[0]; earlier entries were spilled
+        self._start = 0         # first seq of the current transcript (see clear())
+        self._broadcast: List[Tuple[int, dict]] = []
+        self._broadcast_base = 0  # channel positions spilled before _broadcast[0]
+        self._private: Dict[str, List[Tuple[int, dict]]] = {}
+        self._private_base: Dict[str, int] = {}
+        self.generation = 0  # bumped by clear(), so readers can tell a restarted log from a grown one
+
+    def __len__(self) -> int:
+        return self._base + len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return self._entries[max(start - self._base, 0):max(stop - self._base, 0):step]
+        if index < 0:
+            return self._entries[index]
+        if index < self._base:
+            raise IndexError('log entry was spilled from memory')
+        return self._entries[index - self._base]
+
+    @property
+    def first_seq(self) -> int:
+        return self._base
+
+    def append(self, sender: Optional[str], content: LogContent) -> None:
+        seq = len(self)
+        self._entries.append(LogEntry(sender, content))
+        msg = _format(seq, sender, content)
+        if msg is None:
+            return
+        if msg['type'] == 'private':
+            self._private.setdefault(sender, []).append((seq, msg))
+        else:
+            self._broadcast.append((seq, msg))
+
+    def clear(self) -> None:
+        """Start a new transcript; seq numbers keep counting so clients can tell old messages from new."""
+        self.generation += 1
+        self._base = self._start = len(self)
+        self._entries.clear()
+        self._broadcast.clear()
+        self._broadcast_base = 0
+        self._private.clear()
+        self._private_base.clear()
+
+    def tail_cursor(self, nick: str) -> LogCursor:
+        """Cursor positioned after everything currently in the log (for a player joining now)."""
+        return LogCursor(self._broadcast_base + len(self._broadcast),
+                         self._private_base.get(nick, 0) + len(self._private.get(nick, ())))
+
+    def read(self, nick: str, cursor: LogCursor) -> Tuple[List[dict], LogCursor]:
+        """Return the messages ``nick`` has not seen since ``cursor`` and the advanced cursor."""
+        public = self._broadcast[max(cursor.broadcast - self._broadcast_base, 0):]
+        own = self._private.get(nick, [])
+        private_base = self._private_base.get(nick, 0)
+        private = own[max(cursor.private - private_base, 0):]
+        if not private:
+            msgs = [msg for _, msg in public]
+        elif not public:
+            msgs = [msg for _, msg in private]
+        else:
+            msgs = [msg for _, msg in merge(public, private, key=_seq_of)]
+        return msgs, LogCursor(self._broadcast_base + len(self._broadcast), private_base + len(own))
+
+    def unread_seq(self, nick: str, cursor: LogCursor) -> int:
+        """Seq of the first entry ``nick`` has not read yet (``len(self)`` if none)."""
+        seq = len(self)
+        i = cursor.broadcast - self._broadcast_base
+        if 0 <= i < len(self._broadcast):
+            seq = self._broadcast[i][0]
+        own = self._private.get(nick, ())
+        i = cursor.private - self._private_base.get(nick, 0)
+        if 0 <= i < len(own):
+            seq = min(seq, own[i][0])
+        return seq
+
+    def spill(self, cursors: Iterable[Tuple[str, LogCursor]], archived: int, keep: int) -> int:
+        """Drop from memory the whole segments below ``archived`` that every cursor has passed,
+        keeping at least the latest ``keep`` entries; return how many entries were dropped."""
+        floor = min(archived, len(self) - keep)
+        if floor - self._base < SEGMENT:
+            return 0
+        for nick, cursor in cursors:
+            floor = min(floor, self.unread_seq(nick, cursor))
+        drop = (floor - self._base) // SEGMENT * SEGMENT
+        if drop <= 0:
+            return 0
+        del self._entries[:drop]
+        self._base += drop
+        n = _count_below(self._broadcast, self._base)
+        del self._broadcast[:n]
+        self._broadcast_base += n
+        for nick, channel in self._private.items():
+            n = _count_below(channel, self._base)
+            del channel[:n]
+            self._private_base[nick] = self._private_base.get(nick, 0) + n
+        return drop
+
+    async def history(self, nick: str, before: Optional[int] = None, limit: int = 50,
+                      archive: Optional[ArchiveReader] = None) -> Tuple[List[dict], bool]:
+        """Up to ``limit`` public and own private messages older than seq ``before``
+        (oldest first), and whether older ones exist.
+
+        The in-memory part is taken before awaiting ``archive``, so a spill
+        while the archive is read cannot leave a gap.
+        """
+        before = len(self) if before is None else min(before, len(self))
+        base = self._base
+        visible = [item for item in merge(self._broadcast, self._private.get(nick, ()), key=_seq_of)
+                   if item[0] < before and item[1]['type'] != 'cancel_input']
+        page = [msg for _, msg in visible[-(limit + 1):]]
+        if len(page) <= limit and archive is not None and base > self._start:
+            older = await archive(min(before, base), limit + 1 - len(page), nick)
+            page = [msg for msg in (_format(*row) for row in reversed(older)) if msg] + page
+        more = len(page) > limit
+        return page[-limit:] if more else page, more
+
+    async def replay(self, nick: str, after: int = -1, archive: Optional[ArchiveReader] = None) -> List[dict]:
+        """Every message ``nick`` can see with seq greater than ``after`` (the whole transcript
+        by default), reading spilled ones back from ``archive``.
+
+        Covers the log as it is when called: the in-memory part is taken before awaiting ``archive``.
+        """
+        after = max(after, self._start - 1)
+        base = self._base
+        recent = [msg for seq, msg in merge(self._broadcast, self._private.get(nick, ()), key=_seq_of)
+                  if seq > after]
+        msgs = []
+        if archive is not None and after + 1 < base:
+            rows = await archive(base, base - after - 1, nick)
+            msgs = [msg for msg in (_format(*row) for row in reversed(rows)) if msg and msg['seq'] > after]
+        return msgs + recent
+
+
+def _count_below(channel: List[Tuple[int, dict]], seq: int) -> int:
+    n = 0
+    while n < len(channel) and channel[n][0] < seq:
+        n += 1
+    return n
@@ -4,15 +4,20 @@ import random
 from collections import Counter
 from copy import copy
 from dataclasses import dataclass, field
-from typing import Optional, List, Dict, Tuple, Union, Any
+from typing import Optional, List, Dict, Union, Any
 
 from enums import Role, WitchRule, GuardRule, SheriffBombRule, GameStage, LogCtrl, PlayerStatus
 from presets.base import BaseGameConfig
-from presets.game_config_registry import resolve_game_config_class
-from models.system import Global, Config
+from presets.game_config_registry import preset_key_for, resolve_game_config_class
+from models.system import Global, Config, ROOM_FULL, ROOM_OPEN, ROOM_STARTED
+from models.message_log import SEGMENT, MessageLog
 from models.user import User
 from models.room_runtime import RoomRuntimeMixin
-from utils import async_sleep
+from models.runtime.actor import RoomActor
+from models.runtime.pacing import Pacing
+from models.runtime.players import PlayerTable
+from models.runtime.timeline import GameTimeline
+from models.runtime.tools import PhaseState
 from . import logger
 
 # ---------- 角色类 ----------
@@ -52,6 +57,15 @@ role_classes = {
     Role.MAGIC_MIRROR_GIRL: MagicMirrorGirl,
 }
 
+# 赋值后需要通知推送任务的房间字段（客户端可见状态）
+WATCHED_FIELDS = frozenset({
+    'stage', 'waiting', 'started', 'game_over', 'round', 'current_speaker',
+    'day_state', 'sheriff_state', 'seat_state_version', 'open_stages',
+})
+PHASE_STATE_FIELDS = ('day_state', 'sheriff_state')
+# 赋值后需要更新 Global 房间状态索引的字段
+LOBBY_STATUS_FIELDS = frozenset({'started', 'game_over'})
+
 
 @dataclass
 class Room(RoomRuntimeMixin):
@@ -60,14 +74,18 @@ class Room(RoomRuntimeMixin):
     witch_rule: WitchRule = WitchRule.NO_SELF_RESCUE
     guard_rule: GuardRule = GuardRule.MED_CONFLICT
     sheriff_bomb_rule: SheriffBombRule = SheriffBombRule.DOUBLE_LOSS
+    pacing: Pacing = field(default_factory=Pacing)  # 对局节奏：倒计时与流程停顿时长
+    concurrent_night: bool = False  # 并行夜间模式：互不依赖的夜间角色与狼人同时睁眼
 
     started: bool = False
     roles_pool: List[Role] = field(default_factory=list)
     players: Dict[str, User] = field(default_factory=dict)
+    player_table: PlayerTable = field(default_factory=PlayerTable, init=False, repr=False)  # players 的数组镜像，供 O(1) 查询
     round: int = 0
     stage: Optional[GameStage] = None
+    open_stages: frozenset = field(default=frozenset(), init=False)  # 并行夜间模式下与 stage 同时进行的阶段
     waiting: bool = False
-    log: List[Tuple[Union[str, None], Union[str, LogCtrl, Dict[str, Any]]]] = field(default_factory=list)
+    log: MessageLog = field(default_factory=MessageLog)
     skill: Dict[str, Any] = field(default_factory=dict)
 
     logic_thread: Optional[asyncio.Task] = None
@@ -82,11 +100,51 @@ class Room(RoomRuntimeMixin):
     day_state: Dict[str, Any] = field(default_factory=dict)
     sheriff_badge_destroyed: bool = False
     seat_state_version: int = 0
+    state_version: int = 0
+    _change_event: Optional[asyncio.Event] = field(default=None, init=False, repr=False)
+    _payload_cache: Dict[str, Any] = field(default_factory=dict, init=False, repr=False)
+    countdown: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False)  # 当前房间倒计时（发给前端）
+    preset: Optional[str] = field(default=None, init=False)  # 创建房间时选择的版型标识（时间线按版型汇总）
+    timeline: GameTimeline = field(default_factory=GameTimeline, init=False, repr=False)  # 本局各阶段耗时记录
+    _countdown_handle: Any = field(default=None, init=False, repr=False)
+    actor: RoomActor = field(default_factory=RoomActor, init=False, repr=False)  # 房间命令队列：玩家操作与超时处理依次执行
 
     # --- 机械狼专属配置（仅含机械狼角色时生效）---
     mw_shield_blocks_hunter: bool = False      # 机械盾是否抵挡猎人子弹
     mw_double_knife_breaks_shield: bool = False # 双刀狼双刀是否可破盾
 
+    def __setattr__(self, name, value):
+        if name in PHASE_STATE_FIELDS and not isinstance(value, PhaseState):
+            value = PhaseState(value, on_phase=self.notify_change)
+        if name == 'stage' and getattr(self, 'stage', None) is not value and getattr(self, 'timeline', None):
+            self.timeline.enter(value.name if value else None, self.round)
+        super().__setattr__(name, value)
+        if name in WATCHED_FIELDS:
+            self.notify_change()
+        if name in LOBBY_STATUS_FIELDS:
+            Global.index_room(self)
+
+    def notify_change(self):
+        """记录一次状态变化：唤醒房间推送任务（多次变化合并为一次推送）及等待中的游戏流程。"""
+        object.__setattr__(self, 'state_version', getattr(self, 'state_version', 0) + 1)
+        event = getattr(self, '_change_event', None)
+        if event is not None:
+            event.set()
+        barrier = getattr(self, '_stage_barrier', None)
+        if barrier is not None:
+            barrier.notify()
+
+    def checkpoint(self):
+        """保存对局检查点（每晚开始前），服务重启后从该晚重新开始。"""
+        if Global.store:
+            Global.store.save_room(self)
+
+    def change_event(self) -> asyncio.Event:
+        """返回房间状态变化事件；由唯一的推送任务等待并清除。"""
+        if self._change_event is None:
+            self._change_event = asyncio.Event()
+        return self._change_event
+
     async def start_game(self):
         if self.started:
             return
@@ -100,9 +158,12 @@ class Room(RoomRuntimeMixin):
             return
         self.started = True
         self.game_over = False
+        pacing = self.pacing.profile.value + ('・并行夜间' if self.concurrent_night else '')
+        self.timeline.start(self.id, self.preset or preset_key_for(self.roles) or 'custom', len(self.players), pacing)
         # Reset runtime state from any previous game
         self.round = 0
         self.stage = None
+        self.open_stages = frozenset()
         self.waiting = False
         self.skill.clear()
         self.day_state.clear()
@@ -119,7 +180,7 @@ class Room(RoomRuntimeMixin):
         # 在游戏开始时添加公共隔断，提升可读性
         self.broadcast_msg('=' * 22)
         self.broadcast_msg("游戏开始！身份发放中...", tts=True)
-        await async_sleep(2)
+        await self.pause(2)
 
         random.shuffle(self.roles_pool)
         for user in self.players.values():
@@ -141,7 +202,7 @@ class Room(RoomRuntimeMixin):
             user.send_msg(f'你当前的号码牌：{user.seat}号')
         # 游戏开始后刷新所有玩家界面
         self._mark_seat_state_dirty()
-        await async_sleep(3)
+        await self.pause(3)
 
         if not self.logic_thread:
             self.logic_thread = asyncio.create_task(self.game_loop())
@@ -149,45 +210,89 @@ class Room(RoomRuntimeMixin):
     def is_full(self) -> bool:
         return len(self.players) >= len(self.roles)
 
+    def lobby_status(self) -> str:
+        """大厅中的房间状态：对局进行中 / 人数已满 / 等待加入。"""
+        if self.started and not self.game_over:
+            return ROOM_STARTED
+        return ROOM_FULL if self.is_full() else ROOM_OPEN
+
     def add_player(self, user: 'User'):
         if user.room or user.nick in self.players:
             raise AssertionError
         seat = self._pick_available_seat(user.seat)
         self.players[user.nick] = user
         user.room = self
-        user.message_cursor = len(self.log)
+        self.player_table.add(user)
+        user.message_cursor = self.log.tail_cursor(user.nick)
         user.seat = seat
         status = f'【{user.nick}】进入房间，人数 {len(self.players)}/{len(self.roles)}，房主是 {self.get_host().nick}'
         self.broadcast_msg(status)
         logger.info(f'用户 "{user.nick}" 加入房间 "{self.id}"，座位 {user.seat}')
         user.send_msg(f'你当前的号码牌：{user.seat}号')
         self._mark_seat_state_dirty()
+        Global.index_room(self)
 
     def remove_player(self, user: 'User'):
         if user.nick not in self.players:
             raise AssertionError
         self.players.pop(user.nick)
+        self.player_table.remove(user.nick)
         user.room = None
         user.seat = None
         if not self.players:
             Global.remove_room(self.id)
+            self.notify_change()
             return
         self.broadcast_msg(f'人数 {len(self.players)}/{len(self.roles)}，房主是 {self.get_host().nick}')
         self._mark_seat_state_dirty()
+        Global.index_room(self)
         logger.info(f'用户 "{user.nick}" 离开房间 "{self.id}"')
 
     def get_host(self) -> User:
         return next(iter(self.players.values())) if self.players else None
 
     def send_msg(self, text: str, nick: str):
-        self.log.append((nick, text))
+        self.log.append(nick, text)
+        self.notify_change()
+
+    def send_ctrl(self, ctrl: LogCtrl):
+        self.log.append(None, ctrl)
+        self.notify_change()
 
     def broadcast_msg(self, text: str, tts: bool = False):
         if tts:
             payload: Union[str, Dict[str, Any]] = {'text': text, 'tts': True}
         else:
             payload = text
-        self.log.append((Config.SYS_NICK, payload))
+        self.log.append(Config.SYS_NICK, payload)
+        self.notify_change()
+
+    def spill_log(self):
+        """把在线玩家都已读过、且已写入日志归档的旧日志段移出内存（之后经 history 分页取回）。"""
+        if len(self.log) - self.log.first_seq < Config.LOG_MEMORY_ENTRIES + SEGMENT:
+            return  # 内存中的日志尚未超出上限
+        archive = Global.log_archive()
+        if archive is None:
+            return  # 未配置日志归档时日志全部留在内存
+        archive.sync_log(self)
+        cursors = [(u.nick, u.message_cursor) for u in self.players.values() if u.sid]
+        self.log.spill(cursors, archive.log_mark(self), Config.LOG_MEMORY_ENTRIES)
+
+    async def history(self, nick: str, before: Optional[int] = None, limit: int = 50):
+        """分页读取 nick 可见的较早消息（内存中没有的从日志归档读取），返回 (消息列表, 是否还有更早的)。"""
+        return await self.log.history(nick, before, limit, self._archive_reader())
+
+    async def catch_up(self, user: User, after: int = -1) -> list:
+        """重连补发：返回 user 可见的、序号大于 after 的全部消息（默认整局回放），并把读取位置移到末尾。"""
+        # replay() covers the log as of this call, so the cursor moves to the same point before it awaits
+        user.message_cursor = self.log.tail_cursor(user.nick)
+        return await self.log.replay(user.nick, after, self._archive_reader())
+
+    def _archive_reader(self):
+        if not Global.store and not Config.LOG_ARCHIVE:
+            return None
+        # 只在内存中的日志已有段被移出时才会调用，归档此时必然已打开
+        return lambda before, limit, nick: Global.log_archive().read_log(str(self.id), before, limit, nick)
 
     def desc(self) -> str:
         return f'房间号 {self.id}，需要玩家 {len(self.roles)} 人，人员配置：{dict(Counter(self.roles))}'
@@ -201,7 +306,10 @@ class Room(RoomRuntimeMixin):
         room = cls.get(room_id)
         if not room:
             return '房间不存在'
-        if room.is_full():
+        status = Global.room_status(room_id)
+        if status == ROOM_STARTED:
+            return '对局已开始'
+        if status == ROOM_FULL:
             return '房间已满'
 
     def _mark_seat_state_dirty(self):
@@ -279,6 +387,8 @@ class Room(RoomRuntimeMixin):
                 sheriff_bomb_rule=SheriffBombRule.from_option(
                     room_setting.get('sheriff_bomb_rule', DEFAULT_ROOM_RULES['sheriff_bomb_rule'])
                 ),
+                pacing=Pacing.from_config(room_setting),
+                concurrent_night=bool(room_setting.get('concurrent_night', False)),
                 mw_shield_blocks_hunter=bool(room_setting.get('mw_shield_blocks_hunter', False)) if has_mw else False,
                 mw_double_knife_breaks_shield=bool(room_setting.get('mw_double_knife_breaks_shield', False)) if has_mw else False,
                 started=False,
@@ -287,7 +397,7 @@ class Room(RoomRuntimeMixin):
                 round=0,
                 stage=None,
                 waiting=False,
-                log=list(),
+                log=MessageLog(),
                 skill=dict(),
                 logic_thread=None,
                 game_over=False,
@@ -2,16 +2,18 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, List, Type
+from typing import TYPE_CHECKING, Callable, List, Optional, Type
 
-from enums import Role, PlayerStatus
+from enums import GameStage, Role, PlayerStatus
 from presets.base import WOLF_TEAM_ROLES, BaseGameConfig
 from presets.game_config_registry import resolve_game_config_class
 from roles.nine_tailed_fox import NineTailedFox
 from roles.wolf_beauty import WolfBeauty
 from models.runtime.daytime import DaytimeFlowMixin
 from models.runtime.sheriff import SheriffFlowMixin
-from models.runtime.tools import VoteTimer, BadgeTransferTimer
+from models.runtime.players import NOT_DEAD
+from models.runtime.tools import VoteTimer, BadgeTransferTimer, DeferredWithdrawTimer, StageBarrier
+from utils import async_sleep
 from . import logger
 
 if TYPE_CHECKING:
@@ -22,8 +24,11 @@ class RoomRuntimeMixin(SheriffFlowMixin, DaytimeFlowMixin):
     """Mixin containing gameplay logic that lives outside room.py."""
 
     def __post_init__(self):
-        self._vote_timer = VoteTimer()
-        self._badge_timer = BadgeTransferTimer()
+        # 计时器到期的回调作为房间命令执行，不与玩家操作交错
+        self._vote_timer = VoteTimer(self.actor)
+        self._badge_timer = BadgeTransferTimer(self.actor)
+        self._withdraw_timer = DeferredWithdrawTimer(self.actor)
+        self._stage_barrier = StageBarrier()
         super_post = getattr(super(), "__post_init__", None)
         if callable(super_post):
             super_post()
@@ -56,6 +61,32 @@ class RoomRuntimeMixin(SheriffFlowMixin, DaytimeFlowMixin):
     async def wait_for_player(self):
         return await self._ensure_game_config().wait_for_player()
 
+    async def wait_until(self, predicate: Callable[[], bool], timeout: Optional[float] = None) -> bool:
+        """Sleep until ``predicate()`` holds after a room change, or ``timeout`` expires.
+
+        Resumes only once the room's pending commands have run, so the flow
+        never sees a batch of player actions half applied.
+        """
+        result = await self._stage_barrier.wait_for(predicate, timeout)
+        await self.actor.idle()
+        return result
+
+    def stage_open(self, stage: GameStage) -> bool:
+        """Whether ``stage``'s roles may act now: it is the current stage, or opened alongside it (concurrent night)."""
+        return self.stage == stage or stage in self.open_stages
+
+    def release_waiting(self):
+        """A player finished acting: end the night wait, unless a concurrent stage still has players to act."""
+        if self.open_stages and any(u.role_instance and u.role_instance.should_act()
+                                    for u in self.players.values()):
+            return
+        self.waiting = False
+
+    async def pause(self, seconds: float):
+        """Scripted flow pause (天黑请闭眼, 请出现 / 请闭眼 ...), scaled by the room's pacing and timed as 'scripted'."""
+        with self.timeline.activity('scripted'):
+            await async_sleep(self.pacing.pause(seconds))
+
     async def check_game_end(self):
         return await self._ensure_game_config().check_game_end()
 
@@ -63,17 +94,14 @@ class RoomRuntimeMixin(SheriffFlowMixin, DaytimeFlowMixin):
         return await self._ensure_game_config().end_game(reason)
 
     def list_alive_players(self):
-        return [u for u in self.players.values() if u.status == PlayerStatus.ALIVE]
+        return [self.players[nick] for nick in self.player_table.select(statuses=(PlayerStatus.ALIVE,))]
 
     def list_pending_kill_players(self):
         """返回本夜被标记为待死亡（被狼人击中）的玩家列表"""
-        return [u for u in self.players.values() if u.status == PlayerStatus.PENDING_DEAD]
+        return [self.players[nick] for nick in self.player_table.select(statuses=(PlayerStatus.PENDING_DEAD,))]
 
     def get_active_wolves(self):
-        return [
-            u for u in self.players.values()
-            if u.role in WOLF_TEAM_ROLES and u.status != PlayerStatus.DEAD
-        ]
+        return [self.players[nick] for nick in self.player_table.select(WOLF_TEAM_ROLES, NOT_DEAD)]
 
     async def vote_kill(self, nick: str):
         player = self.players.get(nick)
@@ -95,11 +123,10 @@ class RoomRuntimeMixin(SheriffFlowMixin, DaytimeFlowMixin):
         return f"{player.seat}号"
 
     def _is_alive(self, nick: str) -> bool:
-        player = self.players.get(nick)
-        return bool(player and player.status == PlayerStatus.ALIVE)
+        return self.player_table.status_of(nick) == PlayerStatus.ALIVE
 
     def _alive_nicks(self) -> List[str]:
-        return [u.nick for u in self.list_alive_players()]
+        return self.player_table.select(statuses=(PlayerStatus.ALIVE,))
 
     def _sheriff_pending_nicks(self) -> List[str]:
         pending = getattr(self, 'death_pending', []) or []
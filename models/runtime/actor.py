@@ -0,0 +1,128 @@
+"""Per-room actor: one command queue per room, drained by a single task.
+
+Socket handlers (``player_action``, seat / config changes, leaving), the room
+countdown's timeout handlers and the sheriff / badge timers all mutate the
+same room.  Instead of running them as independent tasks that may interleave
+at any ``await``, each one is a command on ``Room.actor``: commands run one at
+a time, in submission order, and a command's own awaits never let another
+command of the same room in.  ``submit()`` awaits the command's result (or
+re-raises its exception); ``post()`` is the fire-and-forget form for deadline
+callbacks.  A burst of commands is drained as one batch; ``idle()`` lets the
+state pusher wait for the end of the batch so it goes out in a single push.
+
+The game loop itself stays a separate task: between its awaits it runs
+atomically on the event loop, and ``Room.wait_until`` resumes it only once the
+current batch is done, so it never observes a half-applied command.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+from collections import deque
+from typing import Any, Callable, Deque, Optional, Tuple
+
+from models import logger
+
+Command = Tuple[Callable[..., Any], tuple, asyncio.Future]
+
+
+class RoomActor:
+    def __init__(self) -> None:
+        self._queue: Deque[Command] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._running = False
+        self.processed = 0
+        self.batches = 0
+
+    @property
+    def pending(self) -> int:
+        """Commands queued or running."""
+        return len(self._queue) + self._running
+
+    def _bind(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # A new event loop (e.g. one asyncio.run per test): commands of the old one are dead
+            self._loop = loop
+            self._queue.clear()
+            self._task = None
+            self._running = False
+            self._idle = asyncio.Event()
+            self._idle.set()
+        return loop
+
+    def _in_command(self) -> bool:
+        return self._task is not None and asyncio.current_task() is self._task
+
+    def _enqueue(self, fn: Callable[..., Any], args: tuple) -> asyncio.Future:
+        loop = self._bind()
+        future = loop.create_future()
+        self._queue.append((fn, args, future))
+        self._idle.clear()
+        if self._task is None:
+            self._task = loop.create_task(self._drain())
+        return future
+
+    async def submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` (sync or async) as the room's next command and return its result.
+
+        Called from inside a command it runs inline, since queueing behind
+        itself would deadlock.  If the caller is cancelled before the command
+        started, the command is dropped.
+        """
+        if self._in_command():
+            return await _call(fn, args)
+        return await self._enqueue(fn, args)
+
+    def post(self, fn: Callable[..., Any], *args: Any) -> None:
+        """Queue ``fn(*args)`` without waiting for it; failures are logged."""
+        self._enqueue(fn, args).add_done_callback(_log_failure)
+
+    async def idle(self) -> None:
+        """Wait until every queued command has run (returns at once if none is pending)."""
+        if self._loop is not asyncio.get_running_loop() or self._in_command():
+            return
+        await self._idle.wait()
+
+    async def _drain(self) -> None:
+        self.batches += 1
+        try:
+            while self._queue:
+                fn, args, future = self._queue.popleft()
+                if future.cancelled():
+                    continue
+                self._running = True
+                try:
+                    result = await _call(fn, args)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+                finally:
+                    self._running = False
+                    self.processed += 1
+        finally:
+            self._task = None
+            for _, _, future in self._queue:
+                future.cancel()
+            self._queue.clear()
+            self._idle.set()
+
+
+async def _call(fn: Callable[..., Any], args: tuple) -> Any:
+    result = fn(*args)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def _log_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception():
+        logger.warning(f'room command failed: {future.exception()!r}')
@@ -0,0 +1,111 @@
+"""Game clock and the virtual-time event loop used for headless simulation.
+
+Every delay in the game is measured on the running event loop's clock:
+``async_sleep`` pauses, ``wait_for_player`` and ``Room.wait_until`` timeouts,
+``deadline_scheduler`` (and with it ``AsyncTimer`` and the server countdowns).
+The loop is therefore the clock: run the same code on ``VirtualClockLoop`` and
+the clock jumps straight to the next timer whenever nothing is ready to run, so
+"天黑请闭眼" pauses, 20 s idle stages and 120 s speech timers cost no wall time
+while keeping their relative order.
+
+Use ``now()`` for durations and ``wall_time()`` for timestamps sent to clients.
+"""
+from __future__ import annotations
+
+import asyncio
+import selectors
+import time
+from typing import Any, Awaitable, TypeVar
+
+T = TypeVar('T')
+
+
+def now() -> float:
+    """Monotonic game time of the running loop (virtual under ``VirtualClockLoop``)."""
+    return asyncio.get_running_loop().time()
+
+
+def wall_time() -> float:
+    """Unix timestamp matching ``now()``; real time unless the loop is virtual."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return time.time()
+    if isinstance(loop, VirtualClockLoop):
+        return loop.wall_time()
+    return time.time()
+
+
+class _VirtualTimeSelector(selectors.BaseSelector):
+    """Polls real file descriptors without blocking; a timed wait advances the virtual clock instead."""
+
+    def __init__(self, loop: 'VirtualClockLoop') -> None:
+        self._selector = selectors.DefaultSelector()
+        self._loop = loop
+
+    def register(self, fileobj, events, data=None):
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._selector.modify(fileobj, events, data)
+
+    def get_map(self):
+        return self._selector.get_map()
+
+    def close(self) -> None:
+        self._selector.close()
+
+    def select(self, timeout=None):
+        ready = self._selector.select(0)
+        if ready or timeout == 0:
+            return ready
+        if timeout is None:
+            # Nothing scheduled: only I/O or another thread can wake the loop
+            return self._selector.select(None)
+        self._loop.advance(timeout)
+        return []
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop whose ``time()`` only moves when every task is waiting on a timer."""
+
+    def __init__(self) -> None:
+        self._virtual_now = 0.0
+        self._wall_origin = time.time()
+        super().__init__(_VirtualTimeSelector(self))
+
+    def time(self) -> float:
+        return self._virtual_now
+
+    def advance(self, seconds: float) -> None:
+        self._virtual_now += seconds
+
+    def wall_time(self) -> float:
+        return self._wall_origin + self._virtual_now
+
+
+def run_virtual(main: Awaitable[T]) -> T:
+    """``asyncio.run`` on a fresh ``VirtualClockLoop``."""
+    loop = VirtualClockLoop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            _cancel_all_tasks(loop)
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+
+def _cancel_all_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    tasks: Any = asyncio.all_tasks(loop)
+    if not tasks:
+        return
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
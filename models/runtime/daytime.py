@@ -580,7 +580,7 @@ class DaytimeFlowMixin:
             if player:
                 player.skill['exile_has_balloted'] = False
                 player.skill['exile_vote_pending'] = True
-        self.broadcast_msg('放逐投票进行中，请在10秒内完成选择')
+        self.broadcast_msg(f'放逐投票进行中，请在{self.pacing.decision}秒内完成选择')
 
     def record_exile_vote(self: 'Room', user: 'User', target: str) -> None:
         phase = self.day_state.get('phase')
@@ -600,7 +600,7 @@ class DaytimeFlowMixin:
         user.skill['exile_vote_pending'] = False
         self.day_state.setdefault('vote_records', {}).setdefault(target, []).append(user.nick)
         eligible = [nick for nick in self.day_state.get('eligible_voters', []) if self._is_alive(nick)]
-        if all(self.players[n].skill.get('exile_has_balloted') for n in eligible):
+        if self.player_table.all_flag('exile_has_balloted', eligible):
             self.finish_exile_vote()
 
     def finish_exile_vote(self: 'Room') -> None:
@@ -773,8 +773,8 @@ class DaytimeFlowMixin:
         self._schedule_badge_transfer_timer()
         self.broadcast_msg(f'{self._format_label(captain)}需要移交或撕毁警徽。')
 
-    def _schedule_badge_transfer_timer(self: 'Room', seconds: int = 10) -> None:
-        self._badge_timer.start(seconds, self._handle_badge_transfer_timeout)
+    def _schedule_badge_transfer_timer(self: 'Room', seconds: Optional[int] = None) -> None:
+        self._badge_timer.start(self.pacing.decision if seconds is None else seconds, self._handle_badge_transfer_timeout)
 
     async def _handle_badge_transfer_timeout(self: 'Room') -> None:
         self.day_state['badge_transfer_timer_elapsed'] = True
@@ -0,0 +1,132 @@
+"""Always-on server metrics, exposed by server.py at ``/metrics`` (Prometheus text format).
+
+Everything on the hot path is pre-allocated: handler histograms are created
+when a handler is decorated with ``timed`` (the wrapper holds its histogram, so
+a call costs two ``perf_counter()`` reads and a bisect), and emitted-event
+counters are two-int lists updated in place.  Outgoing socket.io packets are
+counted through ``CountingJSON``, the json module handed to the
+``AsyncServer``: it sees each packet's already-encoded text, so sizes cost no
+extra encoding.  Gauges (rooms by stage, timers, log sizes) are computed only
+when ``/metrics`` is scraped.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Tuple
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+LOOP_LAG_INTERVAL = 0.5  # seconds between event-loop lag samples
+
+# socket.io events the server emits; others get a counter the first time they are sent
+EMITTED_EVENTS = ('update', 'lobby', 'history', 'error', 'login_ok', 'login_error',
+                  'switch_shard', 'configure_room_modal')
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus ``le`` semantics)."""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...] = SECONDS_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot: above the largest bound
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str = '') -> List[str]:
+        sep = ',' if labels else ''
+        lines, total = [], 0
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {total}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {self.sum:.6f}')
+        lines.append(f'{name}_count{suffix} {self.count}')
+        return lines
+
+
+handler_seconds: Dict[str, Histogram] = {}
+emitted: Dict[str, List[int]] = {event: [0, 0] for event in EMITTED_EVENTS}  # event -> [packets, bytes]
+loop_lag = Histogram()
+_loop_lag_last = [0.0]
+
+
+def timed(name: str) -> Callable:
+    """Record the duration of every call of the decorated coroutine function under ``name``."""
+    hist = handler_seconds.setdefault(name, Histogram())
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                hist.observe(perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class CountingJSON:
+    """json module for ``socketio.AsyncServer(json=...)`` that counts outgoing events and their size.
+
+    socket.io encodes an event as ``[name, *args]``; acks and engine.io packets
+    are not lists starting with a name and pass through uncounted.  Output is
+    ASCII (``ensure_ascii``), so its length is the byte count.  A room broadcast
+    is encoded, and counted, once.
+    """
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs) -> str:
+        text = json.dumps(obj, *args, **kwargs)
+        if type(obj) is list and obj and type(obj[0]) is str:
+            slot = emitted.get(obj[0])
+            if slot is None:
+                slot = emitted[obj[0]] = [0, 0]
+            slot[0] += 1
+            slot[1] += len(text)
+        return text
+
+    loads = staticmethod(json.loads)
+
+
+async def monitor_loop_lag(interval: float = LOOP_LAG_INTERVAL) -> None:
+    """Background task: how late ``asyncio.sleep(interval)`` wakes up is the loop's lag."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - start - interval, 0.0)
+        loop_lag.observe(lag)
+        _loop_lag_last[0] = lag
+
+
+def render(gauges: Iterable[Tuple[str, str, float]]) -> str:
+    """Prometheus text for the counters and histograms plus ``gauges`` as (name, labels, value)."""
+    lines = ['# TYPE mv_handler_seconds histogram']
+    for name, hist in handler_seconds.items():
+        lines += hist.render('mv_handler_seconds', f'handler="{name}"')
+    lines.append('# TYPE mv_emitted_packets_total counter')
+    lines += [f'mv_emitted_packets_total{{event="{event}"}} {packets}' for event, (packets, _) in emitted.items()]
+    lines.append('# TYPE mv_emitted_bytes_total counter')
+    lines += [f'mv_emitted_bytes_total{{event="{event}"}} {size}' for event, (_, size) in emitted.items()]
+    lines.append('# TYPE mv_loop_lag_seconds histogram')
+    lines += loop_lag.render('mv_loop_lag_seconds')
+    lines.append(f'mv_loop_lag_last_seconds {_loop_lag_last[0]:.6f}')
+    typed = set()
+    for name, labels, value in gauges:
+        if name not in typed:
+            typed.add(name)
+            lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name}{{{labels}}} {value}' if labels else f'{name} {value}')
+    return '\n'.join(lines) + '\n'
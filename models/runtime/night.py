@@ -0,0 +1,128 @@
+"""Night death resolution as a pure function.
+
+By the time the night ends, the roles have marked their effects on the player
+statuses (PENDING_DEAD for the wolf kill and guard/heal conflicts,
+PENDING_POISON, PENDING_HEAL, PENDING_GUARD).  ``resolve_night`` turns those
+marks plus the dreamer's and wolf beauty's choices into final statuses, the
+ordered list of deaths and the side effects to apply.  It does not touch rooms,
+users or messages, so benchmarks and solvers can call it directly;
+``DefaultGameFlow.night_logic`` builds the inputs from the room and applies
+the outcome.
+
+Players are addressed by their index in the ``players`` sequence.
+"""
+from __future__ import annotations
+
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from enums import PlayerStatus, Role
+
+ALIVE = PlayerStatus.ALIVE
+DEAD = PlayerStatus.DEAD
+PENDING_DEAD = PlayerStatus.PENDING_DEAD
+PENDING_POISON = PlayerStatus.PENDING_POISON
+
+SHOOTER_ROLES = frozenset({Role.HUNTER, Role.WOLF_KING})
+# 九尾妖狐：其他玩家中每出局一名神职掉两条尾巴，每出局一名平民掉一条
+FOX_GOD_ROLES = frozenset({
+    Role.SEER, Role.WITCH, Role.GUARD, Role.HUNTER, Role.DREAMER, Role.IDIOT, Role.HALF_BLOOD,
+})
+FOX_VILLAGER_ROLES = frozenset({Role.CITIZEN})
+FOX_TAILS = 9
+
+# Event kinds
+NO_SHOOT = 'no_shoot'      # dream death: hunter / wolf king cannot shoot (player is told)
+POISONED = 'poisoned'      # poisoned hunter cannot shoot (silently)
+MARTYR = 'martyr'          # charmed player dies with the wolf beauty
+FOX_GONE = 'fox_gone'      # nine-tailed fox lost its last tail
+
+
+class NightPlayer(NamedTuple):
+    role: Optional[Role]
+    status: PlayerStatus
+
+
+class NightActions(NamedTuple):
+    dreamer: int = -1                        # 摄梦人（今晚指定了梦游者时）
+    dream_target: int = -1                   # 梦游者：免疫夜间伤害，摄梦人出局则一并出局
+    dream_streak: bool = False               # 连续两晚梦游同一人：梦游者出局
+    charms: Tuple[Tuple[int, int], ...] = ()  # (狼美人, 被魅惑者)
+
+
+class NightOutcome(NamedTuple):
+    statuses: List[PlayerStatus]
+    deaths: List[int]                        # in announcement order
+    events: List[Tuple[str, int]]            # (kind, player), in order
+    tails: List[Tuple[int, int]]             # (nine-tailed fox, tails remaining)
+
+
+def fox_tails(roles: Sequence[Optional[Role]], dead: Sequence[bool], fox: int) -> int:
+    """Tails left for the fox at index ``fox`` given who is (counted as) out."""
+    loss = 0
+    for i, role in enumerate(roles):
+        if dead[i] and i != fox:
+            if role in FOX_GOD_ROLES:
+                loss += 2
+            elif role in FOX_VILLAGER_ROLES:
+                loss += 1
+    return max(0, FOX_TAILS - loss)
+
+
+def resolve_night(players: Sequence[NightPlayer], actions: NightActions = NightActions()) -> NightOutcome:
+    statuses = [p.status for p in players]
+    deaths: List[int] = []
+    events: List[Tuple[str, int]] = []
+    target = actions.dream_target
+
+    for i, (role, status) in enumerate(players):
+        if status is DEAD:
+            continue
+        if i == target:
+            if actions.dream_streak:
+                statuses[i] = DEAD
+                deaths.append(i)
+                if role in SHOOTER_ROLES:
+                    events.append((NO_SHOOT, i))
+            else:
+                statuses[i] = ALIVE  # 梦游者免疫刀与毒
+            continue
+        if status is PENDING_POISON:
+            statuses[i] = DEAD
+            deaths.append(i)
+            if role is Role.HUNTER:
+                events.append((POISONED, i))
+        elif status is PENDING_DEAD:
+            statuses[i] = DEAD
+            deaths.append(i)
+        else:
+            statuses[i] = ALIVE
+
+    # 摄梦人出局，梦游者随之出局
+    if target >= 0 and statuses[actions.dreamer] is DEAD and statuses[target] is not DEAD:
+        statuses[target] = DEAD
+        deaths.append(target)
+        if players[target].role in SHOOTER_ROLES:
+            events.append((NO_SHOOT, target))
+
+    # 狼美人出局，被魅惑者殉情（deaths 在遍历中增长，殉情链依次结算）
+    if actions.charms:
+        charmed = dict(actions.charms)
+        for i in deaths:
+            victim = charmed.get(i, -1)
+            if victim >= 0 and statuses[victim] is not DEAD:
+                statuses[victim] = DEAD
+                deaths.append(victim)
+                events.append((MARTYR, victim))
+
+    tails: List[Tuple[int, int]] = []
+    for i, (role, _) in enumerate(players):
+        if role is not Role.NINE_TAILED_FOX:
+            continue
+        left = fox_tails([p.role for p in players], [s is DEAD for s in statuses], i)
+        tails.append((i, left))
+        if left == 0 and statuses[i] is not DEAD:
+            statuses[i] = DEAD
+            deaths.append(i)
+            events.append((FOX_GONE, i))
+
+    return NightOutcome(statuses, deaths, events, tails)
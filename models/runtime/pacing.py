@@ -0,0 +1,94 @@
+"""Pacing profiles: every timing of a game, from one place.
+
+``Room.pacing`` holds the room's profile (standard / fast / tournament /
+custom, chosen in the room config).  The same numbers drive the client
+countdowns (``_get_countdown_context`` in server.py), their server-side
+enforcement (the room deadline and the sheriff-vote / withdraw / badge
+timers) and the flow's own waits in ``DefaultGameFlow`` (night action window,
+idle night stages, scripted pauses), so what players see is what is enforced.
+Only timings change; rules and the order of the flow do not.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from typing import Dict, List, Tuple
+
+from enums import PacingProfile
+
+
+@dataclass(frozen=True)
+class Pacing:
+    profile: PacingProfile = PacingProfile.STANDARD
+    night: int = 20             # 夜间行动倒计时；夜间阶段（含角色已出局的阶段）固定为此时长
+    decision: int = 10          # 上警报名、退水、投票、发言顺序、警徽移交、遗言技能抉择
+    speech: int = 120           # 竞选发言、放逐发言、遗言
+    captain_speech: int = 150   # 警长的放逐发言
+    pause_scale: float = 1.0    # 脚本停顿（天黑请闭眼、请出现 / 请闭眼……）的倍率
+
+    def pause(self, seconds: float) -> float:
+        return seconds * self.pause_scale
+
+    def label(self) -> str:
+        if self.profile is PacingProfile.CUSTOM:
+            return self.profile.value
+        return f'{self.profile.value}（夜间 {self.night} 秒，发言 {self.speech} 秒）'
+
+    def as_config(self) -> dict:
+        """Room-config keys for this profile (the inverse of ``from_config``)."""
+        config = {'pacing': self.profile.value}
+        if self.profile is PacingProfile.CUSTOM:
+            config['pacing_custom'] = {name: getattr(self, name) for name in CUSTOM_LIMITS}
+        return config
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'Pacing':
+        """Profile named by ``config['pacing']``; custom values are clamped to ``CUSTOM_LIMITS``."""
+        option = config.get('pacing', PacingProfile.STANDARD.value)
+        profile = PacingProfile.mapping().get(option)
+        if profile is None:
+            raise ValueError(f'无效的节奏：{option!r}')
+        if profile is not PacingProfile.CUSTOM:
+            return PROFILES[profile]
+        custom = config.get('pacing_custom') or {}
+        values = {}
+        for name, (low, high) in CUSTOM_LIMITS.items():
+            if custom.get(name) is None:
+                continue
+            try:
+                value = type(getattr(STANDARD, name))(custom[name])
+            except (TypeError, ValueError):
+                raise ValueError(f'节奏设置无效：{name}={custom[name]!r}') from None
+            values[name] = min(max(value, low), high)
+        return replace(STANDARD, profile=PacingProfile.CUSTOM, **values)
+
+
+STANDARD = Pacing()
+PROFILES: Dict[PacingProfile, Pacing] = {
+    PacingProfile.STANDARD: STANDARD,
+    # 熟练玩家：夜间行动与投票更紧凑，发言减半，主持停顿减半
+    PacingProfile.FAST: Pacing(PacingProfile.FAST, night=12, decision=8, speech=60, captain_speech=75,
+                               pause_scale=0.5),
+    # 比赛：完整的主持流程，发言与夜间行动按比赛常用时长
+    PacingProfile.TOURNAMENT: Pacing(PacingProfile.TOURNAMENT, night=15, decision=10, speech=90,
+                                     captain_speech=105),
+}
+# 自定义节奏各项的取值范围
+CUSTOM_LIMITS: Dict[str, Tuple[float, float]] = {
+    'night': (5, 60),
+    'decision': (5, 30),
+    'speech': (20, 300),
+    'captain_speech': (20, 360),
+    'pause_scale': (0.25, 1.0),
+}
+
+
+def pacing_options() -> List[dict]:
+    """房间配置表单的节奏选项（随大厅数据下发，前端据此渲染，时长只在这里定义）。"""
+    options = [{'value': profile.value, 'label': pacing.label()} for profile, pacing in PROFILES.items()]
+    options.append({
+        'value': PacingProfile.CUSTOM.value,
+        'label': PacingProfile.CUSTOM.value,
+        'defaults': {name: getattr(STANDARD, name) for name in CUSTOM_LIMITS},
+        'limits': {name: list(limits) for name, limits in CUSTOM_LIMITS.items()},
+    })
+    return options
@@ -0,0 +1,241 @@
+"""Per-room player table: status, role, seat and flag bits as struct-of-arrays.
+
+``User.status`` / ``role`` / ``seat`` assignments and writes to the flag keys
+of ``user.skill`` (``FLAG_BITS``) are mirrored into the room's ``PlayerTable``,
+which keeps them in one integer buffer (one column block per field, one slot
+per player in join order) plus indexes by role and by status.  Membership
+queries such as "is any seer alive", "alive players" or "has every eligible
+voter balloted" are answered from the indexes instead of rescanning the
+players' dicts, and ``snapshot()`` copies the whole table with one buffer copy.
+
+``User`` remains the source of truth; ``Room.add_player`` / ``remove_player``
+keep the slots in step with ``room.players``.
+"""
+from __future__ import annotations
+
+from array import array
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Set
+
+from enums import PlayerStatus, Role
+
+if TYPE_CHECKING:
+    from models.user import User
+
+STATUSES: List[Optional[PlayerStatus]] = [None, *PlayerStatus]
+ROLES: List[Optional[Role]] = [None, *Role]
+STATUS_CODES: Dict[Optional[PlayerStatus], int] = {s: i for i, s in enumerate(STATUSES)}
+ROLE_CODES: Dict[Optional[Role], int] = {r: i for i, r in enumerate(ROLES)}
+
+# user.skill 中的布尔标记，按位存入 flags 列
+FLAG_BITS: Dict[str, int] = {key: 1 << i for i, key in enumerate((
+    'acted_this_stage',
+    'wolf_action_done',
+    'sheriff_voted',
+    'sheriff_has_balloted',
+    'exile_has_balloted',
+    'feared_this_night',
+    'can_shoot',
+    'idiot_vote_banned',
+))}
+
+NOT_DEAD = tuple(s for s in STATUSES if s != PlayerStatus.DEAD)
+
+STATUS, ROLE, SEAT, FLAGS = range(4)
+TABLE_FIELDS = {'status': STATUS, 'role': ROLE, 'seat': SEAT}
+
+
+class PlayerSkills(dict):
+    """dict used for ``user.skill`` that reports writes to the ``FLAG_BITS`` keys.
+
+    Every other key behaves exactly like a plain ``dict``.
+    """
+
+    def __init__(self, data: Optional[dict] = None, on_flag: Optional[Callable[[str, bool], None]] = None) -> None:
+        super().__init__(data or {})
+        self._on_flag = on_flag
+
+    def _flag(self, key: Any, value: Any) -> None:
+        if key in FLAG_BITS and self._on_flag:
+            self._on_flag(key, bool(value))
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        super().__setitem__(key, value)
+        self._flag(key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        super().__delitem__(key)
+        self._flag(key, False)
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        value = super().pop(key, *default)
+        self._flag(key, False)
+        return value
+
+    def popitem(self) -> tuple:
+        key, value = super().popitem()
+        self._flag(key, False)
+        return key, value
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self) -> None:
+        super().clear()
+        for key in FLAG_BITS:
+            self._flag(key, False)
+
+    def flag_bits(self) -> int:
+        return sum(bit for key, bit in FLAG_BITS.items() if self.get(key))
+
+
+class PlayerTable:
+    """Struct-of-arrays mirror of one room's players (see module docstring)."""
+
+    def __init__(self, capacity: int = 16) -> None:
+        self._capacity = capacity
+        self._buf = array('q', bytes(8 * 4 * capacity))
+        self._nicks: List[str] = []
+        self._slots: Dict[str, int] = {}
+        self._by_role: Dict[int, Set[int]] = {}
+        self._by_status: Dict[int, Set[int]] = {}
+        self._counts: Counter = Counter()  # (role code, status code) -> players
+
+    def __len__(self) -> int:
+        return len(self._nicks)
+
+    def __contains__(self, nick: str) -> bool:
+        return nick in self._slots
+
+    # ── Writes ───────────────────────────────────────────────────────────────
+
+    def add(self, user: 'User') -> None:
+        if user.nick in self._slots:
+            self.remove(user.nick)
+        slot = len(self._nicks)
+        if slot == self._capacity:
+            self._grow()
+        self._nicks.append(user.nick)
+        self._slots[user.nick] = slot
+        cap = self._capacity
+        self._buf[STATUS * cap + slot] = STATUS_CODES[user.status]
+        self._buf[ROLE * cap + slot] = ROLE_CODES[user.role]
+        self._buf[SEAT * cap + slot] = user.seat or 0
+        self._buf[FLAGS * cap + slot] = user.skill.flag_bits() if isinstance(user.skill, PlayerSkills) else 0
+        self._index(slot, +1)
+
+    def remove(self, nick: str) -> None:
+        slot = self._slots.pop(nick, None)
+        if slot is None:
+            return
+        self._index(slot, -1)
+        del self._nicks[slot]
+        # 保持加入顺序：后面的槽位整体前移
+        cap = self._capacity
+        for column in range(4):
+            start = column * cap
+            self._buf[start + slot:start + len(self._nicks)] = self._buf[start + slot + 1:start + len(self._nicks) + 1]
+        for index in (self._by_role, self._by_status):
+            for key, slots in index.items():
+                index[key] = {s - (s > slot) for s in slots}
+        for i in range(slot, len(self._nicks)):
+            self._slots[self._nicks[i]] = i
+
+    def update(self, nick: str, field: str, value: Any) -> None:
+        """Mirror a ``User`` field assignment (status / role / seat)."""
+        slot = self._slots.get(nick)
+        if slot is None:
+            return
+        column = TABLE_FIELDS[field]
+        if column == SEAT:
+            self._buf[SEAT * self._capacity + slot] = value or 0
+            return
+        self._index(slot, -1)
+        self._buf[column * self._capacity + slot] = (STATUS_CODES if column == STATUS else ROLE_CODES)[value]
+        self._index(slot, +1)
+
+    def set_flag(self, nick: str, key: str, on: bool) -> None:
+        slot = self._slots.get(nick)
+        if slot is None:
+            return
+        pos = FLAGS * self._capacity + slot
+        if on:
+            self._buf[pos] |= FLAG_BITS[key]
+        else:
+            self._buf[pos] &= ~FLAG_BITS[key]
+
+    def set_flags(self, nick: str, skills: PlayerSkills) -> None:
+        slot = self._slots.get(nick)
+        if slot is not None:
+            self._buf[FLAGS * self._capacity + slot] = skills.flag_bits()
+
+    def _grow(self) -> None:
+        old, cap = self._buf, self._capacity
+        self._capacity = cap * 2
+        self._buf = array('q', bytes(8 * 4 * self._capacity))
+        for column in range(4):
+            self._buf[column * self._capacity:column * self._capacity + cap] = old[column * cap:(column + 1) * cap]
+
+    def _index(self, slot: int, delta: int) -> None:
+        role = self._buf[ROLE * self._capacity + slot]
+        status = self._buf[STATUS * self._capacity + slot]
+        self._counts[role, status] += delta
+        for index, key in ((self._by_role, role), (self._by_status, status)):
+            slots = index.setdefault(key, set())
+            if delta > 0:
+                slots.add(slot)
+            else:
+                slots.discard(slot)
+
+    # ── Queries ──────────────────────────────────────────────────────────────
+
+    def status_of(self, nick: str) -> Optional[PlayerStatus]:
+        slot = self._slots.get(nick)
+        return None if slot is None else STATUSES[self._buf[STATUS * self._capacity + slot]]
+
+    def count(self, roles: Optional[Iterable[Role]] = None,
+              statuses: Optional[Iterable[Optional[PlayerStatus]]] = None) -> int:
+        """Players with one of ``roles`` (any role if None) and one of ``statuses`` (any if None)."""
+        if roles is None:
+            return sum(len(self._by_status.get(STATUS_CODES[s], ())) for s in statuses) if statuses is not None else len(self)
+        role_codes = [ROLE_CODES[r] for r in roles]
+        if statuses is None:
+            return sum(len(self._by_role.get(code, ())) for code in role_codes)
+        status_codes = [STATUS_CODES[s] for s in statuses]
+        return sum(self._counts[r, s] for r in role_codes for s in status_codes)
+
+    def select(self, roles: Optional[Iterable[Role]] = None,
+               statuses: Optional[Iterable[Optional[PlayerStatus]]] = None) -> List[str]:
+        """Nicks matching ``roles`` and ``statuses`` (as in ``count``), in join order."""
+        slots: Optional[Set[int]] = None
+        if roles is not None:
+            slots = set().union(*(self._by_role.get(ROLE_CODES[r], ()) for r in roles))
+        if statuses is not None:
+            by_status = set().union(*(self._by_status.get(STATUS_CODES[s], ()) for s in statuses))
+            slots = by_status if slots is None else slots & by_status
+        if slots is None:
+            return list(self._nicks)
+        return [self._nicks[slot] for slot in sorted(slots)]
+
+    def all_flag(self, key: str, nicks: Iterable[str]) -> bool:
+        """Whether every player in ``nicks`` has the ``key`` flag set."""
+        bit, base = FLAG_BITS[key], FLAGS * self._capacity
+        return all(self._buf[base + self._slots[nick]] & bit for nick in nicks)
+
+    def snapshot(self) -> 'PlayerTable':
+        """Independent copy of the table (one buffer copy plus the small indexes)."""
+        copy = PlayerTable.__new__(PlayerTable)
+        copy._capacity = self._capacity
+        copy._buf = array('q', self._buf)
+        copy._nicks = list(self._nicks)
+        copy._slots = dict(self._slots)
+        copy._by_role = {key: set(slots) for key, slots in self._by_role.items()}
+        copy._by_status = {key: set(slots) for key, slots in self._by_status.items()}
+        copy._counts = Counter(self._counts)
+        return copy
@@ -2,12 +2,9 @@
 
 from __future__ import annotations
 
-import asyncio
 import random
 from typing import TYPE_CHECKING, Dict, List, Optional
 
-from utils import async_sleep
-
 from enums import GameStage, PlayerStatus, Role, SheriffBombRule
 from presets.base import WOLF_CAMP_ROLES
 
@@ -67,7 +64,7 @@ class SheriffFlowMixin:
         state[target_bucket].append(user.nick)
 
         pool = self._sheriff_signup_pool()
-        if all(self.players[n].skill.get('sheriff_voted', False) for n in pool):
+        if self.player_table.all_flag('sheriff_voted', pool):
             up_list = state['up']
             msg = '上警的玩家有：' + ('、'.join(self._format_label(n) for n in up_list) if up_list else '无人')
             self.broadcast_msg(msg)
@@ -441,24 +438,16 @@ class SheriffFlowMixin:
         self.sheriff_state = state
         self.current_speaker = None
         remain = '、'.join(self._format_label(nick) for nick in up)
-        self.broadcast_msg(f'上一日狼人自曝，保留上警玩家：{remain}。10 秒内可退水。')
+        self.broadcast_msg(f'上一日狼人自曝，保留上警玩家：{remain}。{self.pacing.decision} 秒内可退水。')
         self._start_deferred_withdraw_timer()
 
-    def _start_deferred_withdraw_timer(self: 'Room', seconds: int = 10) -> None:
-        self._cancel_deferred_withdraw_timer()
-        task = asyncio.create_task(self._deferred_withdraw_timer(seconds))
-        self.skill['deferred_withdraw_task'] = task
+    def _start_deferred_withdraw_timer(self: 'Room', seconds: Optional[int] = None) -> None:
+        self._withdraw_timer.start(self.pacing.decision if seconds is None else seconds, self._handle_deferred_withdraw_timeout)
 
     def _cancel_deferred_withdraw_timer(self: 'Room') -> None:
-        task = self.skill.pop('deferred_withdraw_task', None)
-        if task:
-            task.cancel()
-
-    async def _deferred_withdraw_timer(self: 'Room', seconds: int) -> None:
-        try:
-            await async_sleep(seconds)
-        except asyncio.CancelledError:
-            return
+        self._withdraw_timer.cancel()
+
+    async def _handle_deferred_withdraw_timeout(self: 'Room') -> None:
         if self.sheriff_state.get('phase') == 'deferred_withdraw':
             self.complete_deferred_withdraw()
 
@@ -510,13 +499,13 @@ class SheriffFlowMixin:
                 u.nick for u in self.list_alive_players()
                 if u.nick not in candidates and self._can_player_vote(u.nick)
             ]
-            prompt = '请非PK玩家在10秒内完成PK投票'
+            prompt = f'请非PK玩家在{self.pacing.decision}秒内完成PK投票'
         else:
             eligible = [
                 nick for nick in state.get('down', [])
                 if self._is_alive(nick) and self._can_player_vote(nick)
             ]
-            prompt = '不上警玩家请在10秒内完成投票'
+            prompt = f'不上警玩家请在{self.pacing.decision}秒内完成投票'
 
         state['eligible_voters'] = eligible
         state['vote_records'] = {}
@@ -583,7 +572,7 @@ class SheriffFlowMixin:
         state.setdefault('vote_records', {}).setdefault(target, []).append(user.nick)
 
         eligible = [nick for nick in state.get('eligible_voters', []) if self._is_alive(nick)]
-        if all(self.players[n].skill.get('sheriff_has_balloted') for n in eligible):
+        if self.player_table.all_flag('sheriff_has_balloted', eligible):
             self.finish_sheriff_vote()
 
     def finish_sheriff_vote(self: 'Room') -> None:
@@ -633,8 +622,8 @@ class SheriffFlowMixin:
                 self.broadcast_msg('PK 投票仍然平票，无人当选警长，警徽流失')
                 self.finish_sheriff_phase(None)
 
-    def _start_sheriff_vote_timer(self: 'Room', seconds: int = 10) -> None:
-        self._vote_timer.start(seconds, self._handle_sheriff_vote_timeout)
+    def _start_sheriff_vote_timer(self: 'Room', seconds: Optional[int] = None) -> None:
+        self._vote_timer.start(self.pacing.decision if seconds is None else seconds, self._handle_sheriff_vote_timeout)
 
     def _cancel_sheriff_vote_timer(self: 'Room') -> None:
         self._vote_timer.cancel()
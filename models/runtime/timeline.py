@@ -0,0 +1,141 @@
+"""Per-game timeline: where a game's time goes, stage by stage.
+
+``Room.timeline`` opens a segment on every ``room.stage`` change and charges
+the time spent in it to one of four activities:
+
+  scripted – ceremony pauses (``Room.pause``: 天黑请闭眼, 请出现 / 请闭眼, ...)
+  padding  – night stages held at their fixed length after everyone acted
+  players  – waiting on players: night actions, speeches, votes (timeouts included)
+  other    – everything else (flow code, server work)
+
+It also counts player actions (time to the first / last one in each segment)
+and timeouts (night stages via ``_trigger_timeout_actions``, day countdowns).
+All times come from ``clock.now()``, so virtual-clock simulations produce the
+same timelines as real games, instantly.  At game end ``finish()`` returns one
+JSON-ready record; ``append_jsonl`` writes it to ``Config.TIMELINE_LOG``, and
+``tests/report_timeline.py`` aggregates such files per preset.
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from models.runtime import clock
+
+ACTIVITIES = ('scripted', 'padding', 'players', 'other')
+
+
+class GameTimeline:
+    def __init__(self) -> None:
+        self.active = False
+        self._segment: Optional[Dict[str, Any]] = None
+
+    def start(self, room_id: Any, preset: str, players: int, pacing: Optional[str] = None) -> None:
+        now = clock.now()
+        self.active = True
+        self._t0 = self._mark = now
+        self._activity = 'other'
+        self._game = {'room': room_id, 'preset': preset, 'pacing': pacing, 'players': players,
+                      'started_at': round(time.time(), 3)}
+        self._totals = dict.fromkeys(ACTIVITIES, 0.0)
+        self._segments: List[Dict[str, Any]] = []
+        self._segment = None
+        self._actions = self._timeouts = 0
+        self.enter(None, 0)  # 发牌阶段
+
+    def _charge(self) -> float:
+        now = clock.now()
+        spent, self._mark = now - self._mark, now
+        self._totals[self._activity] += spent
+        if self._segment is not None:
+            self._segment[self._activity] += spent
+        return now
+
+    def enter(self, stage: Optional[str], round_: int) -> None:
+        """``room.stage`` changed: close the current segment and open one for ``stage``."""
+        if not self.active:
+            return
+        now = self._charge()
+        self._close(now)
+        self._segment = {'stage': stage or 'NONE', 'round': round_, 'start': now - self._t0,
+                         **dict.fromkeys(ACTIVITIES, 0.0), 'actions': 0, 'timeouts': 0,
+                         'first_action': None, 'last_action': None}
+
+    def _close(self, now: float) -> None:
+        segment = self._segment
+        if segment is None:
+            return
+        segment['duration'] = now - self._t0 - segment['start']
+        self._segment = None
+        if segment['duration'] <= 0 and not segment['actions'] and not segment['timeouts']:
+            return  # 同一时刻内连续切换的阶段不单独记录
+        self._segments.append({key: round(value, 3) if isinstance(value, float) else value
+                               for key, value in segment.items()})
+
+    @contextmanager
+    def activity(self, kind: str) -> Iterator[None]:
+        """Charge the time spent inside the block to ``kind`` (one of ``ACTIVITIES``)."""
+        if not self.active:
+            yield
+            return
+        self._charge()
+        previous, self._activity = self._activity, kind
+        try:
+            yield
+        finally:
+            if self.active:
+                self._charge()
+                self._activity = previous
+
+    def action(self) -> None:
+        """A player acted: counts towards the current segment's first / last action times."""
+        if not self.active:
+            return
+        self._actions += 1
+        segment = self._segment
+        if segment is None:
+            return
+        offset = round(clock.now() - self._t0 - segment['start'], 3)
+        segment['actions'] += 1
+        if segment['first_action'] is None:
+            segment['first_action'] = offset
+        segment['last_action'] = offset
+
+    def timeout(self, players: int = 1) -> None:
+        """``players`` players were timed out (skipped or auto-confirmed)."""
+        if not self.active or not players:
+            return
+        self._timeouts += players
+        if self._segment is not None:
+            self._segment['timeouts'] += players
+
+    def finish(self, reason: str, rounds: int) -> Optional[Dict[str, Any]]:
+        """Close the timeline and return the game's record (None if no game was being timed)."""
+        if not self.active:
+            return None
+        now = self._charge()
+        self._close(now)
+        self.active = False
+        return {
+            **self._game,
+            'reason': reason,
+            'rounds': rounds,
+            'duration': round(now - self._t0, 3),
+            'totals': {key: round(value, 3) for key, value in self._totals.items()},
+            'actions': self._actions,
+            'timeouts': self._timeouts,
+            'segments': self._segments,
+        }
+
+
+def append_jsonl(path: str, record: Dict[str, Any]) -> None:
+    """Append ``record`` as one line, in a single O_APPEND write so concurrent writers never interleave."""
+    line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
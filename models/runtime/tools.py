@@ -1,35 +1,220 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Awaitable, Callable, Optional
+import heapq
+import itertools
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, List, Optional, Tuple
 
-from utils import async_sleep
+from models import logger
+
+if TYPE_CHECKING:
+    from models.runtime.actor import RoomActor
 
 
 AsyncCallback = Callable[[], Awaitable[None]]
 
 
-class AsyncTimer:
-    """Utility timer that executes an async callback after a delay."""
+class DeadlineHandle:
+    """A scheduled deadline; ``cancel()`` is O(1) (the heap entry is dropped lazily)."""
+
+    __slots__ = ('when', 'callback', 'args', 'cancelled', '_scheduler')
+
+    def __init__(self, when: float, callback: Callable[..., Any], args: tuple,
+                 scheduler: 'DeadlineScheduler') -> None:
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._scheduler = scheduler
+
+    def cancel(self) -> None:
+        if not self.cancelled:
+            self.cancelled = True
+            self._scheduler._on_cancel()
+
+
+class DeadlineScheduler:
+    """One deadline heap shared by every room, driven by a single loop timer.
+
+    Instead of a sleeping task per timer, deadlines are pushed on a heap and one
+    ``loop.call_at`` is armed for the earliest of them.  Callbacks are plain
+    functions run on the event loop; they schedule tasks themselves if needed.
+    Cancelled entries stay in the heap until they surface or until they make up
+    more than half of it, at which point the heap is compacted.
+    """
+
+    _SLACK = 1e-3  # loop timers may fire up to one clock tick early
+    _COMPACT_MIN = 64
 
     def __init__(self) -> None:
+        self._heap: List[Tuple[float, int, DeadlineHandle]] = []
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_when: Optional[float] = None
+        self._active = 0
+        self.scheduled_total = 0
+        self.fired_total = 0
+        self.cancelled_total = 0
+
+    def stats(self) -> dict:
+        """Counters for monitoring: live deadlines, heap size and lifetime totals."""
+        return {
+            'active': self._active,
+            'heap_size': len(self._heap),
+            'scheduled_total': self.scheduled_total,
+            'fired_total': self.fired_total,
+            'cancelled_total': self.cancelled_total,
+        }
+
+    def _bind(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # A new event loop (e.g. one asyncio.run per test): deadlines of the old one are dead
+            self._loop = loop
+            for _, _, handle in self._heap:
+                handle.cancelled = True
+            self._heap.clear()
+            self._active = 0
+            self._timer = None
+            self._timer_when = None
+        return loop
+
+    def time(self) -> float:
+        return self._bind().time()
+
+    def call_at(self, when: float, callback: Callable[..., Any], *args: Any) -> DeadlineHandle:
+        self._bind()
+        handle = DeadlineHandle(when, callback, args, self)
+        heapq.heappush(self._heap, (when, next(self._seq), handle))
+        self._active += 1
+        self.scheduled_total += 1
+        self._arm()
+        return handle
+
+    def call_later(self, delay: float, callback: Callable[..., Any], *args: Any) -> DeadlineHandle:
+        return self.call_at(self.time() + delay, callback, *args)
+
+    def _on_cancel(self) -> None:
+        self._active -= 1
+        self.cancelled_total += 1
+        stale = len(self._heap) - self._active
+        if stale > self._COMPACT_MIN and stale * 2 > len(self._heap):
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+
+    def _arm(self) -> None:
+        heap = self._heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+        if not heap:
+            return
+        when = heap[0][0]
+        if self._timer is not None and self._timer_when <= when:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._loop.call_at(when, self._fire)
+        self._timer_when = when
+
+    def _fire(self) -> None:
+        self._timer = None
+        self._timer_when = None
+        now = self._loop.time() + self._SLACK
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, _, handle = heapq.heappop(heap)
+            if handle.cancelled:
+                continue
+            handle.cancelled = True
+            self._active -= 1
+            self.fired_total += 1
+            try:
+                handle.callback(*handle.args)
+            except Exception:
+                logger.exception('deadline callback failed')
+        self._arm()
+
+
+deadline_scheduler = DeadlineScheduler()
+
+
+class AsyncTimer:
+    """Utility timer that executes an async callback after a delay.
+
+    The delay is a deadline on the shared ``deadline_scheduler``; a task is only
+    created once it expires, to run the callback.  With an ``actor`` (a room's
+    ``RoomActor``) the callback runs as one of its commands; cancelling the
+    timer before the command started drops it.
+    """
+
+    def __init__(self, actor: Optional['RoomActor'] = None) -> None:
+        self._actor = actor
+        self._handle: Optional[DeadlineHandle] = None
         self._task: Optional[asyncio.Task] = None
 
-    def start(self, seconds: int, callback: AsyncCallback) -> None:
+    def start(self, seconds: float, callback: AsyncCallback) -> None:
         self.cancel()
-        self._task = asyncio.create_task(self._run(seconds, callback))
+        self._handle = deadline_scheduler.call_later(seconds, self._expire, callback)
 
     def cancel(self) -> None:
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
         if self._task:
             self._task.cancel()
             self._task = None
 
-    async def _run(self, seconds: int, callback: AsyncCallback) -> None:
-        try:
-            await async_sleep(seconds)
-        except asyncio.CancelledError:
-            return
-        await callback()
+    @property
+    def active(self) -> bool:
+        return self._handle is not None
+
+    def _expire(self, callback: AsyncCallback) -> None:
+        self._handle = None
+        self._task = asyncio.ensure_future(self._actor.submit(callback) if self._actor else callback())
+        self._task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        if self._task is task:
+            self._task = None
+        if not task.cancelled() and task.exception():
+            logger.warning(f'timer callback failed: {task.exception()!r}')
+
+
+class StageBarrier:
+    """Lets the game loop sleep until a room predicate holds, instead of polling.
+
+    ``notify()`` is called on every room state change (see ``Room.notify_change``);
+    each waiter re-checks its predicate and goes back to sleep if it is still false.
+    """
+
+    def __init__(self) -> None:
+        self._waiters: List[asyncio.Future] = []
+
+    def notify(self) -> None:
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def wait_for(self, predicate: Callable[[], bool], timeout: Optional[float] = None) -> bool:
+        """Wait until ``predicate()`` is true; return False if ``timeout`` expires first."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while not predicate():
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                return False
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                return predicate()
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        return True
 
 
 class VoteTimer(AsyncTimer):
@@ -38,3 +223,25 @@ class VoteTimer(AsyncTimer):
 
 class BadgeTransferTimer(AsyncTimer):
     """Timer dedicated to badge transfer windows."""
+
+
+class DeferredWithdrawTimer(AsyncTimer):
+    """Timer for the withdraw window of a sheriff election carried over from a self-exploded day."""
+
+
+class PhaseState(dict):
+    """dict used for ``day_state``/``sheriff_state`` that reports phase transitions.
+
+    Only assignments to the ``'phase'`` key invoke ``on_phase``; the rest of the
+    dict behaves exactly like a plain ``dict``.
+    """
+
+    def __init__(self, data: Optional[dict] = None, on_phase: Optional[Callable[[], None]] = None) -> None:
+        super().__init__(data or {})
+        self._on_phase = on_phase
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        changed = key == 'phase' and self.get('phase') != value
+        super().__setitem__(key, value)
+        if changed and self._on_phase:
+            self._on_phase()
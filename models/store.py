@@ -0,0 +1,417 @@
+# models/store.py
+"""SQLite persistence for rooms, reconnect tokens and room logs.
+
+``LogArchive`` is the room-log journal on its own: the file that
+``Room.spill_log`` moves old log segments to, so a room's in-memory log stays
+bounded (``MV_LOG_ARCHIVE``, on by default).  ``GameStore`` extends it with
+the rest of the game state when persistence is enabled (``MV_STATE_DB``); the
+journal then lives in the same file and doubles as the archive.
+
+Tables:
+
+* ``tokens``   – reconnect token → nick;
+* ``rooms``    – one JSON snapshot per room;
+* ``room_log`` – append-only journal of ``room.log`` entries, also the archive
+  that ``MessageLog.history`` pages spilled messages back from;
+* ``members``  – nick → room id, from the latest snapshots;
+* ``lobby``    – room list published by each worker in multi-worker mode.
+
+Room snapshots are taken while a room is in the lobby or after the game ended
+(on every seat/config change), and at a checkpoint before every night while a
+game runs (``Room.checkpoint``).  A game in progress is therefore restored at
+the start of the night it was interrupted in; messages logged after that
+checkpoint are kept in the journal.
+
+All writes go through a queue to a single writer thread that commits them in
+batches, so callers on the event loop only pay for building the row; the
+writer publishes how far each room's journal is committed, and only entries
+below that mark may leave memory.  Archive reads (history pages, reconnect
+replays) run on a reader thread.  The few other reads needed at runtime
+(multi-worker mode) are indexed point lookups.
+"""
+import asyncio
+import json
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+import enums
+from models import cluster, logger
+from models.message_log import SEGMENT, MessageLog
+from models.runtime.pacing import Pacing
+from models.system import Config
+
+_LOG_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS room_log ('
+    ' room_id TEXT NOT NULL, seq INTEGER NOT NULL, sender TEXT, content TEXT NOT NULL,'
+    ' PRIMARY KEY (room_id, seq))',
+)
+_SCHEMA = _LOG_SCHEMA + (
+    'CREATE TABLE IF NOT EXISTS tokens (token TEXT PRIMARY KEY, nick TEXT NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS rooms (id TEXT PRIMARY KEY, snapshot TEXT NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS members (nick TEXT PRIMARY KEY, room_id TEXT NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS lobby (shard INTEGER PRIMARY KEY, rooms TEXT NOT NULL, version INTEGER NOT NULL)',
+)
+
+_ROOM_FIELDS = ('round', 'started', 'game_over', 'skill', 'death_pending', 'sheriff_badge_destroyed',
+                'sheriff_state', 'day_state', 'mw_shield_blocks_hunter', 'mw_double_knife_breaks_shield')
+_BATCH = 256
+
+
+def _encode(value: Any) -> Any:
+    """Convert room state into JSON-compatible data; enums and non-str dict keys are tagged."""
+    if isinstance(value, Enum):
+        return {'__enum__': type(value).__name__, 'name': value.name}
+    if isinstance(value, dict):
+        if all(isinstance(k, str) for k in value):
+            return {k: _encode(v) for k, v in value.items()}
+        return {'__items__': [[_encode(k), _encode(v)] for k, v in value.items()]}
+    if isinstance(value, (list, tuple, set)):
+        return [_encode(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return None  # tasks, timers and other runtime objects are not persisted
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, dict):
+        if '__enum__' in value:
+            return getattr(enums, value['__enum__'])[value['name']]
+        if '__items__' in value:
+            return {_decode(k): _decode(v) for k, v in value['__items__']}
+        return {k: _decode(v) for k, v in value.items()}
+    return value
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(_encode(value), ensure_ascii=False)
+
+
+def _loads(text: str) -> Any:
+    return _decode(json.loads(text))
+
+
+def snapshot_room(room) -> dict:
+    """Everything needed to rebuild ``room`` and its players (except the log)."""
+    data = {name: getattr(room, name) for name in _ROOM_FIELDS}
+    data.update(
+        id=room.id,
+        roles=room.roles,
+        witch_rule=room.witch_rule,
+        guard_rule=room.guard_rule,
+        sheriff_bomb_rule=room.sheriff_bomb_rule,
+        pacing=room.pacing.as_config(),
+        concurrent_night=room.concurrent_night,
+        players=[{
+            'nick': u.nick,
+            'seat': u.seat,
+            'role': u.role,
+            'status': u.status,
+            'skill': u.skill,
+        } for u in room.players.values()],
+    )
+    return data
+
+
+class LogArchive:
+    """Journal of room logs (``room_log``); ``Room.spill_log`` pages old segments out to it."""
+
+    _SCHEMA = _LOG_SCHEMA
+
+    def __init__(self, path: str, fresh: bool = False):
+        self.path = path
+        self._queue: 'queue.Queue[Optional[tuple]]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._log_marks: Dict[str, Tuple[int, int]] = {}   # room id → (log generation, entries queued)
+        self._committed: Dict[str, Tuple[int, int]] = {}   # room id → (log generation, entries committed)
+        self._reader: Optional[sqlite3.Connection] = None
+        self._log_reader: Optional[sqlite3.Connection] = None
+        self._read_pool: Optional[ThreadPoolExecutor] = None
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')  # workers of a multi-worker deployment share the file
+        with conn:
+            for stmt in self._SCHEMA:
+                conn.execute(stmt)
+            if fresh:
+                # Without persistence no room outlives the process: the previous run's logs are dead
+                conn.execute('DELETE FROM room_log')
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    # ── Writer thread ────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer, name='game-store', daemon=True)
+            self._thread.start()
+
+    def flush(self) -> None:
+        """Block until every queued write has been committed (or failed)."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer and reader threads."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._read_pool is not None:
+            self._read_pool.shutdown()
+            self._read_pool = None
+        for conn in (self._reader, self._log_reader):
+            if conn is not None:
+                conn.close()
+        self._reader = self._log_reader = None
+
+    def _put(self, sql: str, params: Any = (), many: bool = False, mark: Optional[tuple] = None) -> None:
+        """Queue a write; ``mark`` (room id, log generation, entries) is published once it is committed."""
+        self._queue.put((sql, params, many, mark))
+
+    def _writer(self) -> None:
+        conn = self._connect()
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < _BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            marks = []
+            try:
+                with conn:
+                    for item in batch:
+                        if item is None:
+                            running = False
+                            continue
+                        sql, params, many, mark = item
+                        if many:
+                            conn.executemany(sql, params() if callable(params) else params)
+                        else:
+                            conn.execute(sql, params)
+                        if mark:
+                            marks.append(mark)
+            except sqlite3.Error as e:
+                # Nothing of the batch is committed: its log entries stay in memory
+                logger.error(f'持久化写入失败：{e}')
+            else:
+                for room_id, generation, written in marks:
+                    if room_id in self._log_marks:  # not dropped meanwhile
+                        self._committed[room_id] = (generation, written)
+            for _ in batch:
+                self._queue.task_done()
+        conn.close()
+
+    # ── Journal ──────────────────────────────────────────────────────────────
+
+    def sync_log(self, room) -> None:
+        """Journal the entries of ``room.log`` not handed to the writer yet."""
+        room_id = str(room.id)
+        log = room.log
+        generation, written = self._log_marks.get(room_id, (log.generation, log.first_seq))
+        if generation != log.generation:
+            self._put('DELETE FROM room_log WHERE room_id = ?', (room_id,))
+            written = log.first_seq
+        if len(log) > written:
+            entries = log[written:]
+            self._put('INSERT OR REPLACE INTO room_log (room_id, seq, sender, content) VALUES (?, ?, ?, ?)',
+                      lambda: [(room_id, seq, sender, _dumps(content))
+                               for seq, (sender, content) in enumerate(entries, written)],
+                      many=True, mark=(room_id, log.generation, len(log)))
+        self._log_marks[room_id] = (log.generation, len(log))
+
+    def log_mark(self, room) -> int:
+        """How many of ``room.log``'s entries are committed to the journal (only these may be spilled)."""
+        generation, written = self._committed.get(str(room.id), (None, 0))
+        return written if generation == room.log.generation else 0
+
+    def drop_log(self, room_id) -> None:
+        room_id = str(room_id)
+        self._log_marks.pop(room_id, None)
+        self._committed.pop(room_id, None)
+        self._put('DELETE FROM room_log WHERE room_id = ?', (room_id,))
+
+    async def read_log(self, room_id: str, before: int, limit: int, nick: str) -> list:
+        """Journaled ``(seq, sender, content)`` before ``before`` that ``nick`` may see, newest first.
+
+        The query runs on the reader thread, off the event loop.
+        """
+        if self._read_pool is None:
+            self._read_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='log-archive')
+        return await asyncio.get_running_loop().run_in_executor(
+            self._read_pool, self._read_log, room_id, before, limit, nick)
+
+    def _read_log(self, room_id: str, before: int, limit: int, nick: str) -> list:
+        if self._log_reader is None:
+            self._log_reader = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        rows = self._log_reader.execute(
+            'SELECT seq, sender, content FROM room_log WHERE room_id = ? AND seq < ?'
+            ' AND sender IN (?, ?) ORDER BY seq DESC LIMIT ?',
+            (room_id, before, Config.SYS_NICK, nick, limit)).fetchall()
+        return [(seq, sender, _loads(content)) for seq, sender, content in rows]
+
+
+class GameStore(LogArchive):
+    _SCHEMA = _SCHEMA
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._snapshot_keys: Dict[str, tuple] = {}
+
+    # ── Game state ───────────────────────────────────────────────────────────
+    def save_token(self, token: str, nick: str) -> None:
+        self._put('INSERT OR REPLACE INTO tokens (token, nick) VALUES (?, ?)', (token, nick))
+
+    def drop_token(self, token: str) -> None:
+        self._put('DELETE FROM tokens WHERE token = ?', (token,))
+
+    def save_room(self, room) -> None:
+        room_id = str(room.id)
+        self._put('INSERT OR REPLACE INTO rooms (id, snapshot) VALUES (?, ?)',
+                  (room_id, _dumps(snapshot_room(room))))
+        self._put('DELETE FROM members WHERE room_id = ?', (room_id,))
+        self._put('INSERT OR REPLACE INTO members (nick, room_id) VALUES (?, ?)',
+                  [(nick, room_id) for nick in room.players], many=True)
+
+    def drop_room(self, room_id) -> None:
+        room_id = str(room_id)
+        self.drop_log(room_id)
+        self._snapshot_keys.pop(room_id, None)
+        self._put('DELETE FROM rooms WHERE id = ?', (room_id,))
+        self._put('DELETE FROM members WHERE room_id = ?', (room_id,))
+
+    def publish_lobby(self, shard: int, lines: list) -> None:
+        self._put('INSERT OR REPLACE INTO lobby (shard, rooms, version) VALUES '
+                  '(?, ?, COALESCE((SELECT version FROM lobby WHERE shard = ?), 0) + 1)',
+                  (shard, json.dumps(lines, ensure_ascii=False), shard))
+
+    # ── Lookups (multi-worker mode) ──────────────────────────────────────────
+
+    def _read(self, sql: str, params: tuple = ()) -> list:
+        if self._reader is None:
+            self._reader = self._connect()
+        return self._reader.execute(sql, params).fetchall()
+
+    def nick_for_token(self, token: str) -> Optional[str]:
+        rows = self._read('SELECT nick FROM tokens WHERE token = ?', (token,))
+        return rows[0][0] if rows else None
+
+    def nick_in_use(self, nick: str) -> bool:
+        return bool(self._read('SELECT 1 FROM tokens WHERE nick = ? LIMIT 1', (nick,)))
+
+    def room_of(self, nick: str) -> Optional[str]:
+        rows = self._read('SELECT room_id FROM members WHERE nick = ?', (nick,))
+        return rows[0][0] if rows else None
+
+    def lobby_version(self, exclude: int) -> int:
+        return self._read('SELECT COALESCE(SUM(version), 0) FROM lobby WHERE shard != ?', (exclude,))[0][0]
+
+    def read_lobby(self, exclude: int) -> list:
+        """Room list lines published by every other worker."""
+        lines = []
+        for (rooms,) in self._read('SELECT rooms FROM lobby WHERE shard != ?', (exclude,)):
+            lines.extend(json.loads(rooms))
+        return lines
+
+    def sync_room(self, room) -> None:
+        """Journal new log entries and, outside a running game, snapshot seat/config changes."""
+        self.sync_log(room)
+        if not room.started or room.game_over:
+            key = (room.seat_state_version, room.started, room.game_over, len(room.players))
+            room_id = str(room.id)
+            if self._snapshot_keys.get(room_id) != key:
+                self._snapshot_keys[room_id] = key
+                self.save_room(room)
+
+    # ── Restore ──────────────────────────────────────────────────────────────
+
+    def load(self, keep: int = 0) -> Tuple[Dict[str, str], List[Tuple[dict, int, list]]]:
+        """Read tokens and ``(room snapshot, first log seq, log entries)``, rooms ordered by id.
+
+        With ``keep`` only the journal's tail (at least ``keep`` entries, whole segments) is read.
+        """
+        conn = sqlite3.connect(self.path)
+        try:
+            tokens = dict(conn.execute('SELECT token, nick FROM tokens'))
+            rooms = []
+            for room_id, snapshot in conn.execute('SELECT id, snapshot FROM rooms').fetchall():
+                first = 0
+                if keep:
+                    (end,) = conn.execute('SELECT COALESCE(MAX(seq) + 1, 0) FROM room_log WHERE room_id = ?',
+                                          (room_id,)).fetchone()
+                    first = max(0, end - keep) // SEGMENT * SEGMENT
+                entries = [(sender, _loads(content)) for sender, content in conn.execute(
+                    'SELECT sender, content FROM room_log WHERE room_id = ? AND seq >= ? ORDER BY seq',
+                    (room_id, first))]
+                rooms.append((_loads(snapshot), first, entries))
+        finally:
+            conn.close()
+        rooms.sort(key=lambda pair: pair[0]['id'])
+        return tokens, rooms
+
+    def restore(self) -> Tuple[Dict[str, str], list]:
+        """Rebuild ``Global.users`` and ``Global.rooms`` from disk; return (tokens, rooms)."""
+        from models.room import Room, role_classes
+        from models.system import Global
+        from models.user import User
+
+        tokens, stored_rooms = self.load(keep=Config.LOG_MEMORY_ENTRIES)
+        # Each worker restores only the rooms it owns; users outside them are adopted on reconnect
+        stored_rooms = [room for room in stored_rooms if cluster.is_local(room[0]['id'])]
+        # Only players of restored rooms come back; a lobby login does not outlive the process
+        members = {p['nick'] for data, _, _ in stored_rooms for p in data['players']}
+        stale = [token for token, nick in tokens.items() if nick not in members]
+        tokens = {token: nick for token, nick in tokens.items() if nick in members}
+        if stale and not cluster.enabled():
+            # Other workers' tokens stay in the shared store for adoption; a single process owns them all
+            self._put('DELETE FROM tokens WHERE token = ?', [(token,) for token in stale], many=True)
+        by_nick = {nick: token for token, nick in tokens.items()}
+        for nick, token in by_nick.items():
+            if nick not in Global.users:
+                Global.users[nick] = User(nick=nick, sid=None, reconnect_token=token)
+
+        rooms = []
+        for data, first_seq, entries in stored_rooms:
+            players = [p for p in data['players'] if p['nick'] in Global.users
+                       and Global.users[p['nick']].room is None]
+            if not players:
+                self.drop_room(data['id'])
+                continue
+            log = MessageLog(first_seq)
+            for sender, content in entries:
+                log.append(sender, content)
+            room = Room(
+                id=data['id'],
+                roles=data['roles'],
+                witch_rule=data['witch_rule'],
+                guard_rule=data['guard_rule'],
+                sheriff_bomb_rule=data['sheriff_bomb_rule'],
+                pacing=Pacing.from_config(data.get('pacing') or {}),
+                concurrent_night=data.get('concurrent_night', False),
+                log=log,
+                **{name: data[name] for name in _ROOM_FIELDS},
+            )
+            room.roles_pool = list(room.roles)
+            for p in players:
+                user = Global.users[p['nick']]
+                user.room = room
+                user.seat = p['seat']
+                user.role = p['role']
+                user.status = p['status']
+                user.skill = p['skill']
+                user.role_instance = role_classes[user.role](user) if user.role else None
+                user.message_cursor = log.tail_cursor(user.nick)
+                room.players[user.nick] = user
+                room.player_table.add(user)
+            Global.add_room(room)
+            self._log_marks[str(room.id)] = self._committed[str(room.id)] = (log.generation, len(log))
+            rooms.append(room)
+        logger.info(f'已从 {self.path} 恢复 {len(rooms)} 个房间、{len(tokens)} 个登录凭证')
+        return tokens, rooms
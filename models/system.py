@@ -1,38 +1,123 @@
-from typing import Dict, TYPE_CHECKING
+import os
+from typing import Dict, List, Optional, Set, TYPE_CHECKING
 
 from utils import rand_int
 
 if TYPE_CHECKING:
     from .room import Room
+    from .store import GameStore, LogArchive
 
 
 class Config:
     SYS_NICK = '📢'
+    STATE_DB = os.environ.get('MV_STATE_DB', '')  # SQLite 持久化文件（如 moon_verdict.db），置空则不做持久化
+    TIMELINE_LOG = os.environ.get('MV_TIMELINE_LOG', '')  # 每局结束时把各阶段耗时追加写入该 JSONL 文件，置空不记录
+    LOG_MEMORY_ENTRIES = int(os.environ.get('MV_LOG_MEMORY', '1000'))  # 每个房间内存中至少保留的日志条数（更早的按段移入日志归档）
+    LOG_ARCHIVE = os.environ.get('MV_LOG_ARCHIVE', 'room_logs.db')  # 未开启持久化时的日志归档文件，置空则日志全部留在内存
+    # 多进程分片（见 models/cluster.py），由 `server.py --workers N` 为每个子进程设置
+    SHARD_COUNT = int(os.environ.get('MV_SHARDS', '1'))
+    SHARD_INDEX = int(os.environ.get('MV_SHARD_INDEX', '0'))
+    SHARD_BASE_PORT = int(os.environ.get('MV_SHARD_BASE_PORT', os.environ.get('PORT', '8080')))
+    SHARD_URLS = [url.rstrip('/') for url in os.environ.get('MV_SHARD_URLS', '').split(',') if url]
+    MAX_ROOMS = int(os.environ.get('MV_MAX_ROOMS', '500'))  # 本进程最多同时存在的房间数，0 表示不限
+
+
+# 房间在大厅中的状态（Global.rooms_by_status 的键）
+ROOM_OPEN = 'open'        # 等待玩家加入
+ROOM_FULL = 'full'        # 人数已满，尚未开局
+ROOM_STARTED = 'started'  # 对局进行中
+ROOM_STATUSES = (ROOM_OPEN, ROOM_FULL, ROOM_STARTED)
 
 
 class Global:
     users = dict()
     rooms: Dict[str, 'Room'] = dict()
+    rooms_version = 0  # 房间创建/关闭时递增（大厅房间列表缓存据此失效）
+    rooms_by_status: Dict[str, Set[str]] = {status: set() for status in ROOM_STATUSES}
+    _room_status: Dict[str, str] = dict()
+    _next_room_id = rand_int()  # 单调递增，关闭的房间号不会被重新分配
+    store: Optional['GameStore'] = None
+    _log_archive: Optional['LogArchive'] = None  # 未开启持久化时单独的日志归档（开启时由 store 兼任）
 
     @classmethod
     def reg_room(cls, room: 'Room') -> 'Room':
         if room.id is not None:
             raise AssertionError
+        if Config.MAX_ROOMS and len(cls.rooms) >= Config.MAX_ROOMS:
+            raise ValueError('服务器房间已满，请稍后再试')
 
-        latest_room: list = list(cls.rooms.keys())[-1:]
-        if not latest_room:
-            alloc_room_id = rand_int()
-        else:
-            alloc_room_id = cls.rooms[latest_room[0]].id + 1
+        alloc_room_id = cls._next_room_id
+        # 多进程分片时，本进程只分配归自己所有的房间号（房间号 % 分片数 == 本进程编号）
+        alloc_room_id += (Config.SHARD_INDEX - alloc_room_id) % Config.SHARD_COUNT
+        while str(alloc_room_id) in cls.rooms:
+            alloc_room_id += Config.SHARD_COUNT
 
         room.id = alloc_room_id
-        cls.rooms[str(room.id)] = room
+        cls.add_room(room)
         return room
 
+    @classmethod
+    def add_room(cls, room: 'Room'):
+        """登记已有房间号的房间（新建或从 store 恢复），并把分配器推进到该房间号之后。"""
+        cls.rooms[str(room.id)] = room
+        cls._next_room_id = max(cls._next_room_id, room.id + 1)
+        cls.rooms_version += 1
+        cls.index_room(room)
+
+    @classmethod
+    def index_room(cls, room: 'Room'):
+        """房间的人数或开局状态变化后调用，维护按状态的房间索引。"""
+        room_id = str(room.id)
+        if cls.rooms.get(room_id) is not room:
+            return
+        status = room.lobby_status()
+        old = cls._room_status.get(room_id)
+        if old == status:
+            return
+        if old:
+            cls.rooms_by_status[old].discard(room_id)
+        cls.rooms_by_status[status].add(room_id)
+        cls._room_status[room_id] = status
+
+    @classmethod
+    def room_status(cls, room_id) -> Optional[str]:
+        return cls._room_status.get(str(room_id))
+
+    @classmethod
+    def list_rooms(cls, status: str) -> List['Room']:
+        """某一状态的房间，按房间号排序。"""
+        rooms = (cls.rooms.get(room_id) for room_id in cls.rooms_by_status[status])
+        return sorted((room for room in rooms if room), key=lambda r: r.id)
+
     @classmethod
     def remove_room(cls, room_id):
         if str(room_id) in cls.rooms:
             del cls.rooms[str(room_id)]
+            status = cls._room_status.pop(str(room_id), None)
+            if status:
+                cls.rooms_by_status[status].discard(str(room_id))
+            cls.rooms_version += 1
+            if cls.store:
+                cls.store.drop_room(room_id)
+            elif cls._log_archive:
+                cls._log_archive.drop_log(room_id)
+
+    @classmethod
+    def log_archive(cls) -> Optional['LogArchive']:
+        """房间日志的归档：持久化开启时即 store，否则首次需要时打开 Config.LOG_ARCHIVE。"""
+        if cls.store:
+            return cls.store
+        if cls._log_archive is None and Config.LOG_ARCHIVE:
+            from .store import LogArchive
+            cls._log_archive = LogArchive(Config.LOG_ARCHIVE, fresh=True)
+            cls._log_archive.start()
+        return cls._log_archive
+
+    @classmethod
+    def close_log_archive(cls):
+        if cls._log_archive:
+            cls._log_archive.close()
+            cls._log_archive = None
 
     @classmethod
     def get_room(cls, room_id):
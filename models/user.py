@@ -2,7 +2,9 @@
 from dataclasses import dataclass, field
 from typing import Optional, TYPE_CHECKING, Any
 
-from enums import Role, PlayerStatus, LogCtrl
+from enums import Role, PlayerStatus
+from models.message_log import LogCursor
+from models.runtime.players import TABLE_FIELDS, PlayerSkills
 from models.system import Config, Global
 from . import logger
 
@@ -24,8 +26,10 @@ class User:
     status: Optional[PlayerStatus] = None
     seat: Optional[int] = None
 
-    message_cursor: int = 0     # next index in room.log to deliver to this user
+    message_cursor: LogCursor = field(default_factory=LogCursor)  # read position in room.log channels
     input_blocking: bool = False
+    state_version: int = 0                      # version of the last 'state'/'state_patch' sent
+    sent_state: Optional[dict] = field(default=None, repr=False)  # None = next push is a full snapshot
 
     def __post_init__(self):
         if self.skill is None:
@@ -47,6 +51,23 @@ class User:
                 'exile_has_balloted': False,
             }
 
+    def __setattr__(self, name, value):
+        if name == 'skill' and value is not None and not isinstance(value, PlayerSkills):
+            value = PlayerSkills(value, on_flag=self._skill_flag)
+        super().__setattr__(name, value)
+        room = self.__dict__.get('room')
+        if room is None:
+            return
+        if name in TABLE_FIELDS:
+            room.player_table.update(self.nick, name, value)
+        elif name == 'skill' and value is not None:
+            room.player_table.set_flags(self.nick, value)
+
+    def _skill_flag(self, key: str, on: bool):
+        room = self.room
+        if room is not None:
+            room.player_table.set_flag(self.nick, key, on)
+
     def send_msg(self, text: str):
         if self.room:
             self.room.send_msg(text, nick=self.nick)
@@ -57,22 +78,7 @@ class User:
         """Return log entries since message_cursor that this user should see, then advance cursor."""
         if not self.room:
             return []
-        msgs = []
-        log = self.room.log
-        for sender, content in log[self.message_cursor:]:
-            if sender == self.nick:
-                # Private message for this player
-                msgs.append({'type': 'private', 'text': str(content)})
-            elif sender == Config.SYS_NICK:
-                # Public broadcast
-                if isinstance(content, dict):
-                    msgs.append({'type': 'public', 'text': content.get('text', ''), 'tts': bool(content.get('tts'))})
-                else:
-                    msgs.append({'type': 'public', 'text': str(content), 'tts': False})
-            elif sender is None and content == LogCtrl.RemoveInput:
-                msgs.append({'type': 'cancel_input'})
-            # else: private message addressed to another user – skip
-        self.message_cursor = len(log)
+        msgs, self.message_cursor = self.room.log.read(self.nick, self.message_cursor)
         return msgs
 
     def skip(self, reason: Optional[str] = None):
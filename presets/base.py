@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-import asyncio
 import random
 from typing import List, TYPE_CHECKING, Optional
 
 from enums import GameStage, LogCtrl, PlayerStatus, Role
 from models import logger
+from models.runtime import clock, night, timeline
+from models.system import Config
 from roles.wolf_beauty import WolfBeauty
 from utils import async_sleep
 
@@ -33,6 +34,15 @@ NIGHT_WAIT_STAGES = {
     GameStage.MECHANICAL_WOLF_ACT,
     GameStage.MAGIC_MIRROR_GIRL,
 }
+# 并行夜间模式下与狼人同时进行的阶段：结果只在夜晚结算时生效，与狼刀及其他夜间行动互不依赖。
+# 女巫（需知道刀口）、守卫（守护立即改写目标状态，须在狼刀落定之后，同守同救才能成立）、
+# 狼美人（狼人之后）、猎人 / 狼王（开枪状态取决于女巫用药）、机械狼（学习先于行动）
+# 以及各版型的狼前阶段仍按原顺序依次进行。
+INDEPENDENT_NIGHT_STAGES = {
+    GameStage.SEER,
+    GameStage.DREAMER,
+    GameStage.MAGIC_MIRROR_GIRL,
+}
 
 
 class BaseGameConfig:
@@ -64,11 +74,12 @@ class DefaultGameFlow(BaseGameConfig):
         room = self.room
         while not room.game_over:
             if not room.started:
-                await async_sleep(1)
+                await room.wait_until(lambda: room.started or room.game_over)
                 continue
+            room.checkpoint()
             await self.night_logic()
             await self.check_game_end()
-            await async_sleep(1)
+            await room.pause(1)
         room.logic_thread = None
 
     async def night_logic(self):
@@ -77,7 +88,7 @@ class DefaultGameFlow(BaseGameConfig):
         room.round += 1
         room.broadcast_msg(f"============ 第 {room.round} 晚 ============")
         room.broadcast_msg('天黑请闭眼', tts=True)
-        await async_sleep(3)
+        await room.pause(3)
 
         await self.run_pre_wolf_phase()
         await self.run_wolf_stage()
@@ -87,74 +98,13 @@ class DefaultGameFlow(BaseGameConfig):
         if dreamer:
             dreamer.role_instance.apply_logic(room)
 
-        dead_this_night = []
-        for u in room.players.values():
-            if u.status == PlayerStatus.DEAD:
-                continue
-            immunity = u.skill.get('dream_immunity', False)
-            u.skill['dream_immunity'] = False
-            dream_cause = u.skill.pop('dream_forced_death', None)
-
-            if dream_cause:
-                u.status = PlayerStatus.DEAD
-                dead_this_night.append(u.nick)
-                if u.role in (Role.HUNTER, Role.WOLF_KING):
-                    u.skill['can_shoot'] = False
-                    u.send_msg('你无法开枪。')
-                u.skill.pop('dreamer_nick', None)
-                continue
-
-            if u.status == PlayerStatus.PENDING_POISON:
-                if not immunity:
-                    u.status = PlayerStatus.DEAD
-                    dead_this_night.append(u.nick)
-                    if u.role == Role.HUNTER:
-                        u.skill['can_shoot'] = False
-                else:
-                    u.status = PlayerStatus.ALIVE
-
-            elif u.status == PlayerStatus.PENDING_DEAD:
-                if immunity:
-                    u.status = PlayerStatus.ALIVE
-                else:
-                    u.status = PlayerStatus.DEAD
-                    dead_this_night.append(u.nick)
-
-            elif u.status in (PlayerStatus.PENDING_HEAL, PlayerStatus.PENDING_GUARD):
-                u.status = PlayerStatus.ALIVE
-            else:
-                u.status = PlayerStatus.ALIVE
-
-        dreamers = [user for user in room.players.values() if user.role == Role.DREAMER]
-        if dreamers:
-            for dreamer_player in dreamers:
-                for candidate in room.players.values():
-                    if candidate.skill.get('dreamer_nick') != dreamer_player.nick:
-                        continue
-                    if dreamer_player.status == PlayerStatus.DEAD and candidate.status != PlayerStatus.DEAD:
-                        candidate.status = PlayerStatus.DEAD
-                        dead_this_night.append(candidate.nick)
-                        if candidate.role in (Role.HUNTER, Role.WOLF_KING):
-                            candidate.skill['can_shoot'] = False
-                            candidate.send_msg('你无法开枪。')
-                    candidate.skill.pop('dreamer_nick', None)
-
-        # 处理狼美人殉情：如果狼美人在今晚死亡
-        for nick in dead_this_night:
-            player = room.players.get(nick)
-            if player and player.role == Role.WOLF_BEAUTY:
-                charmed_nick = WolfBeauty.handle_wolf_beauty_death(room, player)
-                if charmed_nick and charmed_nick not in dead_this_night:
-                    dead_this_night.append(charmed_nick)
-
-        room.death_pending = dead_this_night
-        room.update_nine_tailed_state()
+        self.resolve_night_deaths()
         
         # 清除梦魇的恐惧效果
         self._clear_nightmare_fear_effects()
         
         room.broadcast_msg('天亮了', tts=True)
-        await async_sleep(2)
+        await room.pause(2)
         needs_sheriff_phase = False
         if not room.sheriff_badge_destroyed:
             if room.round == 1:
@@ -170,15 +120,53 @@ class DefaultGameFlow(BaseGameConfig):
             else:
                 room.broadcast_msg('上警的玩家请举手', tts=True)
                 room.init_sheriff_phase()
-            while room.sheriff_state.get('phase') != 'done':
-                await async_sleep(0.5)
+            with room.timeline.activity('players'):
+                await room.wait_until(lambda: room.sheriff_state.get('phase') == 'done' or room.game_over)
         else:
             room.prepare_day_phase()
 
-        while not room.day_state:
-            await async_sleep(0.2)
-        while room.day_state.get('phase') != 'done':
-            await async_sleep(0.5)
+        with room.timeline.activity('players'):
+            await room.wait_until(lambda: room.day_state.get('phase') == 'done' or room.game_over)
+
+    def resolve_night_deaths(self):
+        """Turn the night's pending statuses into deaths via night.resolve_night and apply the side effects."""
+        room = self.room
+        order = list(room.players.values())
+        index = {u.nick: i for i, u in enumerate(order)}
+
+        dreamer = dream_target = -1
+        dream_streak = False
+        charms = []
+        for i, u in enumerate(order):
+            if u.status != PlayerStatus.DEAD and u.skill.get('dream_immunity') and u.skill.get('dreamer_nick') in index:
+                dreamer, dream_target = index[u.skill['dreamer_nick']], i
+                dream_streak = bool(u.skill.get('dream_forced_death'))
+            if u.role == Role.WOLF_BEAUTY and u.skill.get('charm_target') in index:
+                charms.append((i, index[u.skill['charm_target']]))
+            u.skill['dream_immunity'] = False
+            u.skill.pop('dream_forced_death', None)
+            u.skill.pop('dreamer_nick', None)
+
+        outcome = night.resolve_night(
+            [night.NightPlayer(u.role, u.status) for u in order],
+            night.NightActions(dreamer, dream_target, dream_streak, tuple(charms)),
+        )
+        for u, status in zip(order, outcome.statuses):
+            u.status = status
+        for kind, i in outcome.events:
+            u = order[i]
+            if kind == night.NO_SHOOT:
+                u.skill['can_shoot'] = False
+                u.send_msg('你无法开枪。')
+            elif kind == night.POISONED:
+                u.skill['can_shoot'] = False
+            elif kind == night.MARTYR:
+                WolfBeauty.mark_martyr(room, u)
+            elif kind == night.FOX_GONE:
+                u.role_instance.announce_tail_death()
+        for i, tails in outcome.tails:
+            order[i].skill['tails_remaining'] = tails
+        room.death_pending = [order[i].nick for i in outcome.deaths]
 
     async def run_pre_wolf_phase(self):
         await self._run_nightmare_stage_if_needed()
@@ -210,16 +198,16 @@ class DefaultGameFlow(BaseGameConfig):
             user.skill['acted_this_stage'] = False
 
         room.broadcast_msg('梦魇请睁眼', tts=True)
-        await async_sleep(1)
+        await room.pause(1)
 
         if self.has_active_role([Role.NIGHTMARE]):
             await self.wait_for_player()
         else:
-            await async_sleep(5)
+            await room.pause(5)
 
-        await async_sleep(1)
+        await room.pause(1)
         room.broadcast_msg('梦魇请闭眼', tts=True)
-        await async_sleep(2)
+        await room.pause(2)
 
     async def _run_half_blood_stage_if_needed(self):
         room = self.room
@@ -231,27 +219,32 @@ class DefaultGameFlow(BaseGameConfig):
             if user.role in WOLF_TEAM_ROLES:
                 user.skill['wolf_action_done'] = False
         room.broadcast_msg('混血儿请出现', tts=True)
-        await async_sleep(1)
+        await room.pause(1)
 
         if self.has_active_role([Role.HALF_BLOOD]):
             room.waiting = True
             await self.wait_for_player()
             self.ensure_half_blood_choices()
         else:
-            await async_sleep(5)
+            await room.pause(5)
 
-        await async_sleep(1)
+        await room.pause(1)
         room.broadcast_msg('混血儿请闭眼', tts=True)
-        await async_sleep(2)
+        await room.pause(2)
 
     async def run_wolf_stage(self):
         room = self.room
+        concurrent = self.concurrent_stages()
+        concurrent_names = '、'.join(stage.value for stage, _ in concurrent)
+        room.open_stages = frozenset(stage for stage, _ in concurrent)
         room.stage = GameStage.WOLF
         for user in room.players.values():
             user.skill['acted_this_stage'] = False
             if user.role in WOLF_TEAM_ROLES:
                 user.skill['wolf_action_done'] = False
         room.broadcast_msg('狼人请出现', tts=True)
+        if concurrent:
+            room.broadcast_msg(f'{concurrent_names}请出现', tts=True)
 
         wolf_players = room.get_active_wolves()
         if wolf_players:
@@ -273,7 +266,7 @@ class DefaultGameFlow(BaseGameConfig):
             for u in wolf_players:
                 room.send_msg(wolf_info, nick=u.nick)
 
-        await async_sleep(2)
+        await room.pause(2)
 
         # 检查是否被梦魇恐惧导致狼队空刀
         wolf_forced_empty = room.skill.get('wolf_forced_empty_knife', False)
@@ -285,12 +278,19 @@ class DefaultGameFlow(BaseGameConfig):
 
         if wolf_players:
             room.waiting = True
-            if wolf_forced_empty:
+            if wolf_forced_empty and not concurrent:
                 await self.wait_for_player(auto_release=True, silent_timeout=True)
             else:
-                await self.wait_for_player()
+                # 并行阶段共用狼人阶段的倒计时，所有睁眼玩家行动完毕才结束等待
+                await self.wait_for_player(silent_timeout=wolf_forced_empty)
+        elif concurrent:
+            # 没有狼人行动时，仍需等待并行阶段的玩家行动完毕
+            room.waiting = True
+            room.release_waiting()
+            await self.wait_for_player()
         else:
-            await async_sleep(1)
+            await room.pause(1)
+        room.open_stages = frozenset()
 
         wolf_votes = room.skill.get('wolf_votes', {})
         if wolf_players and wolf_votes and not wolf_forced_empty:
@@ -315,13 +315,24 @@ class DefaultGameFlow(BaseGameConfig):
                 if u.role in WOLF_TEAM_ROLES:
                     room.send_msg("今夜，狼队空刀。", nick=u.nick)
 
-        await async_sleep(3)
+        await room.pause(3)
         room.broadcast_msg('狼人请闭眼', tts=True)
-        await async_sleep(2)
+        if concurrent:
+            room.broadcast_msg(f'{concurrent_names}请闭眼', tts=True)
+        await room.pause(2)
 
     async def run_post_wolf_stages(self):
+        concurrent = {stage for stage, _ in self.concurrent_stages()}
         for stage, role_list in self.night_role_order():
-            await self.run_role_stage(stage, role_list)
+            if stage not in concurrent:
+                await self.run_role_stage(stage, role_list)
+
+    def concurrent_stages(self) -> List[tuple]:
+        """并行夜间模式下与狼人同时进行的阶段（night_role_order 中已配置的独立阶段）。"""
+        if not self.room.concurrent_night:
+            return []
+        return [(stage, role_list) for stage, role_list in self.night_role_order()
+                if stage in INDEPENDENT_NIGHT_STAGES and self.has_configured_role(role_list)]
 
     def night_role_order(self) -> List[tuple]:
         return [
@@ -349,35 +360,31 @@ class DefaultGameFlow(BaseGameConfig):
                 user.skill.pop('hunter_msg_sent', None)
 
         room.broadcast_msg(f'{stage.value}请出现', tts=True)
-        await async_sleep(1)
+        await room.pause(1)
 
         if self.has_active_role(role_list):
             room.waiting = True
             await self.wait_for_player()
         else:
-            await async_sleep(self.stage_idle_delay(stage))
+            # 角色已出局：照常等待，避免从阶段长短推断身份
+            with room.timeline.activity('padding'):
+                await async_sleep(self.stage_idle_delay(stage))
 
-        await async_sleep(1)
+        await room.pause(1)
         room.broadcast_msg(f'{stage.value}请闭眼', tts=True)
-        await async_sleep(2)
+        await room.pause(2)
         return True
 
     def stage_idle_delay(self, stage: GameStage) -> float:
-        return 20
+        return self.room.pacing.night
 
     def has_active_role(self, roles: List[Role]) -> bool:
-        room = self.room
-        alive_statuses = {PlayerStatus.ALIVE, PlayerStatus.PENDING_GUARD, PlayerStatus.PENDING_HEAL, PlayerStatus.PENDING_DEAD}
-        return any(
-            user.role in roles and user.status in alive_statuses
-            for user in room.players.values()
-        )
+        alive_statuses = (PlayerStatus.ALIVE, PlayerStatus.PENDING_GUARD, PlayerStatus.PENDING_HEAL, PlayerStatus.PENDING_DEAD)
+        return self.room.player_table.count(roles, alive_statuses) > 0
 
     def has_configured_role(self, roles: List[Role]) -> bool:
         room = self.room
-        return any(role in room.roles for role in roles) or any(
-            user.role in roles for user in room.players.values()
-        )
+        return any(role in room.roles for role in roles) or room.player_table.count(roles) > 0
 
     def _clear_nightmare_fear_effects(self):
         """清除所有玩家的梦魇恐惧状态"""
@@ -401,30 +408,31 @@ class DefaultGameFlow(BaseGameConfig):
 
     async def wait_for_player(self, *, min_duration: Optional[float] = None, auto_release: bool = False, silent_timeout: bool = False):
         room = self.room
-        timeout = 20
-        loop = asyncio.get_running_loop()
-        start = loop.time()
+        timeout = room.pacing.night
+        start = clock.now()
         stage = room.stage
         if min_duration is None:
             min_duration = timeout if stage in NIGHT_WAIT_STAGES else 0
 
-        while True:
-            elapsed = loop.time() - start
-            if room.waiting and auto_release and elapsed >= min_duration:
-                room.waiting = False
-
-            if not room.waiting and elapsed >= min_duration:
-                break
-
-            if elapsed >= timeout:
-                if room.waiting and not silent_timeout:
-                    room.broadcast_msg("行动超时，系统自动跳过", tts=True)
-                # 超时时先触发每个未行动玩家的确认/跳过逻辑
-                self._trigger_timeout_actions(stage)
-                room.waiting = False
-                break
-
-            await async_sleep(0.1)
+        # 由 player_action / 狼队全部行动等处清除 room.waiting 时唤醒，无需轮询
+        if auto_release and min_duration <= timeout:
+            # 到达最短时长后自动放行
+            with room.timeline.activity('players'):
+                await room.wait_until(lambda: not room.waiting, min_duration)
+            room.waiting = False
+        with room.timeline.activity('players'):
+            released = await room.wait_until(lambda: not room.waiting, timeout - (clock.now() - start))
+
+        if not released:
+            if not silent_timeout:
+                room.broadcast_msg("行动超时，系统自动跳过", tts=True)
+            # 超时时先触发每个未行动玩家的确认/跳过逻辑
+            room.timeline.timeout(self._trigger_timeout_actions(stage))
+            room.waiting = False
+        else:
+            # 夜晚阶段保持固定时长，避免从阶段长短推断身份
+            with room.timeline.activity('padding'):
+                await async_sleep(min(min_duration, timeout) - (clock.now() - start))
 
         for user in room.players.values():
             try:
@@ -433,10 +441,10 @@ class DefaultGameFlow(BaseGameConfig):
                     task.cancel()
             except Exception:
                 pass
-        room.log.append((None, LogCtrl.RemoveInput))
+        room.send_ctrl(LogCtrl.RemoveInput)
 
-    def _trigger_timeout_actions(self, stage: GameStage):
-        """超时时触发每个未行动玩家的确认或跳过逻辑"""
+    def _trigger_timeout_actions(self, stage: GameStage) -> int:
+        """超时时触发每个未行动玩家的确认或跳过逻辑；返回本阶段应行动而超时的玩家数"""
         room = self.room
         pending_keys = [
             'wolf_choice',
@@ -450,11 +458,13 @@ class DefaultGameFlow(BaseGameConfig):
             'mw_first_knife',
             'pending_act_target',
         ]
+        timed_out = 0
         for user in room.players.values():
             if user.skill.get('acted_this_stage', False):
                 continue
             if not user.role_instance:
                 continue
+            timed_out += bool(user.role_instance.should_act())
             has_pending = any(user.skill.get(k) for k in pending_keys)
             if user.role_instance.needs_global_confirm and hasattr(user.role_instance, 'confirm'):
                 if has_pending:
@@ -472,14 +482,15 @@ class DefaultGameFlow(BaseGameConfig):
                     user.skip(reason='timeout')
                 except Exception:
                     pass
+        return timed_out
 
     async def check_game_end(self):
         room = self.room
         alive = room.list_alive_players()
 
-        initial_god_present = any(p.role in GOD_ROLES for p in room.players.values())
-        initial_villager_present = any(p.role in VILLAGER_ROLES for p in room.players.values())
-        initial_third_present = any(p.role in THIRD_PARTY_ROLES for p in room.players.values())
+        initial_god_present = room.player_table.count(GOD_ROLES) > 0
+        initial_villager_present = room.player_table.count(VILLAGER_ROLES) > 0
+        initial_third_present = room.player_table.count(THIRD_PARTY_ROLES) > 0
 
         wolves: List['User'] = []
         goods: List['User'] = []
@@ -539,8 +550,11 @@ class DefaultGameFlow(BaseGameConfig):
         room.game_over = True
         room.started = False
         room.stage = None
+        record = room.timeline.finish(reason, room.round)
+        if record and Config.TIMELINE_LOG:
+            timeline.append_jsonl(Config.TIMELINE_LOG, record)
         room.broadcast_msg(f"游戏结束，{reason}。", tts=True)
-        await async_sleep(2)
+        await room.pause(2)
         for nick, user in room.players.items():
             room.broadcast_msg(f"{nick}：{user.role_instance.name if user.role_instance else '无'}", tts=True)
             user.role = None
@@ -69,9 +69,9 @@ class MechanicalWolfMirrorGameConfig(DefaultGameFlow):
         room = self.room
         alive = room.list_alive_players()
 
-        initial_god_present = any(p.role in GOD_ROLES for p in room.players.values())
-        initial_villager_present = any(p.role in VILLAGER_ROLES for p in room.players.values())
-        initial_third_present = any(p.role in THIRD_PARTY_ROLES for p in room.players.values())
+        initial_god_present = room.player_table.count(GOD_ROLES) > 0
+        initial_villager_present = room.player_table.count(VILLAGER_ROLES) > 0
+        initial_third_present = room.player_table.count(THIRD_PARTY_ROLES) > 0
 
         wolves: list = []
         goods: list = []
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from collections import Counter, OrderedDict
-from typing import Dict, List, Sequence, Tuple, Type
+from typing import Dict, List, Optional, Sequence, Tuple, Type
 
 from enums import Role
 
@@ -88,6 +88,12 @@ def resolve_game_config_class(roles: Sequence[Role]) -> Type[BaseGameConfig]:
     return GeneralGameConfig
 
 
+def preset_key_for(roles: Sequence[Role]) -> Optional[str]:
+    """Key of the registered preset with exactly these roles, if any."""
+    role_counter = Counter(roles)
+    return next((desc['key'] for desc in _SPECIAL_CONFIGS if desc['role_counter'] == role_counter), None)
+
+
 def get_special_preset_templates() -> Dict[str, Dict[str, object]]:
     return {desc['key']: desc['room_template'] for desc in _SPECIAL_CONFIGS}
 
@@ -21,7 +21,7 @@ def player_action(func):
         # - 'PENDING': 临时选择，不结束等待，等待玩家点击确认
         if rv in [None, True, 'CONFIRMED']:
             self.user.skill['countdown_skip_timeout'] = True
-            self.user.room.waiting = False
+            self.user.room.release_waiting()
         if isinstance(rv, str) and rv not in ['PENDING', 'CONFIRMED']:
             self.user.send_msg(text=rv)
         return rv
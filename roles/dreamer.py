@@ -16,11 +16,11 @@ class Dreamer(RoleBase):
         room = self.user.room
         if self.is_feared():
             return False
-        return self.user.status != PlayerStatus.DEAD and room.stage == GameStage.DREAMER and not self.user.skill.get('acted_this_stage', False)
+        return self.user.status != PlayerStatus.DEAD and room.stage_open(GameStage.DREAMER) and not self.user.skill.get('acted_this_stage', False)
 
     def get_actions(self) -> List:
         room = self.user.room
-        if not room or room.stage != GameStage.DREAMER:
+        if not room or not room.stage_open(GameStage.DREAMER):
             return []
 
         if self.notify_fear_block():
@@ -16,11 +16,11 @@ class Guard(RoleBase):
         room = self.user.room
         if self.is_feared():
             return False
-        return self.user.status != PlayerStatus.DEAD and room.stage == GameStage.GUARD and not self.user.skill.get('acted_this_stage', False)
+        return self.user.status != PlayerStatus.DEAD and room.stage_open(GameStage.GUARD) and not self.user.skill.get('acted_this_stage', False)
 
     def get_actions(self) -> List:
         room = self.user.room
-        if not room or room.stage != GameStage.GUARD:
+        if not room or not room.stage_open(GameStage.GUARD):
             return []
 
         if self.notify_fear_block():
@@ -123,7 +123,7 @@ class Guard(RoleBase):
         self.user.skill.pop('guard_stage_ready', None)
         self.user.skill['acted_this_stage'] = True
         if self.user.room:
-            self.user.room.waiting = False
+            self.user.room.release_waiting()
 
     def _is_consecutive_protect(self, target_nick: Optional[str]) -> bool:
         room = self.user.room
@@ -20,13 +20,13 @@ class MagicMirrorGirl(RoleBase):
             return False
         return (
             self.user.status != PlayerStatus.DEAD
-            and room.stage == GameStage.MAGIC_MIRROR_GIRL
+            and room.stage_open(GameStage.MAGIC_MIRROR_GIRL)
             and not self.user.skill.get('acted_this_stage', False)
         )
 
     def get_actions(self) -> List:
         room = self.user.room
-        if not room or room.stage != GameStage.MAGIC_MIRROR_GIRL:
+        if not room or not room.stage_open(GameStage.MAGIC_MIRROR_GIRL):
             return []
         if self.notify_fear_block():
             return []
@@ -98,4 +98,4 @@ class MagicMirrorGirl(RoleBase):
         self.user.skill['acted_this_stage'] = True
         self.user.send_msg('今夜，你放弃查验。')
         if self.user.room:
-            self.user.room.waiting = False
+            self.user.room.release_waiting()
@@ -595,7 +595,7 @@ class MechanicalWolf(RoleBase):
         self.user.skill['acted_this_stage'] = True
         self.user.send_msg('今夜，你放弃行动。')
         if self.user.room:
-            self.user.room.waiting = False
+            self.user.room.release_waiting()
 
     # ------------------------------------------------------------------ #
     # Hunter-like passive: shoot when eliminated (if learned hunter)
@@ -219,7 +219,7 @@ class Nightmare(Wolf):
                 self.user.skill['nightmare_action_notified'] = True
             self.user.skill['acted_this_stage'] = True
             self.user.skill.pop('nightmare_stage_ready', None)
-            self.user.room.waiting = False
+            self.user.room.release_waiting()
             return True
         # 其他情况（刷新等）返回 PENDING，不结束等待
         return 'PENDING'
@@ -3,6 +3,7 @@ from typing import List
 from stub import actions
 
 from enums import GameStage, PlayerStatus, Role
+from models.runtime.night import FOX_GOD_ROLES, FOX_TAILS, FOX_VILLAGER_ROLES
 from .base import RoleBase, player_action
 
 
@@ -11,16 +12,8 @@ class NineTailedFox(RoleBase):
     team = '神阵营'
     can_act_at_night = True
 
-    GOD_ROLES = {
-        Role.SEER,
-        Role.WITCH,
-        Role.GUARD,
-        Role.HUNTER,
-        Role.DREAMER,
-        Role.IDIOT,
-        Role.HALF_BLOOD,
-    }
-    VILLAGER_ROLES = {Role.CITIZEN}
+    GOD_ROLES = FOX_GOD_ROLES
+    VILLAGER_ROLES = FOX_VILLAGER_ROLES
 
     def __init__(self, user):
         super().__init__(user)
@@ -79,22 +72,19 @@ class NineTailedFox(RoleBase):
         statuses = {PlayerStatus.DEAD}
         if include_pending:
             statuses.update({PlayerStatus.PENDING_DEAD, PlayerStatus.PENDING_POISON})
-        tail_loss = 0
-        for player in room.players.values():
-            if player.nick == self.user.nick:
-                continue
-            if player.role in self.GOD_ROLES and player.status in statuses:
-                tail_loss += 2
-            elif player.role in self.VILLAGER_ROLES and player.status in statuses:
-                tail_loss += 1
-        tails = max(0, 9 - tail_loss)
+        table = room.player_table
+        loss = 2 * table.count(self.GOD_ROLES, statuses) + table.count(self.VILLAGER_ROLES, statuses)
+        tails = max(0, FOX_TAILS - loss)
         self.user.skill['tails_remaining'] = tails
         if not register_death or tails > 0 or self.user.status == PlayerStatus.DEAD:
             return
         self.user.status = PlayerStatus.DEAD
-        seat = self.user.seat if self.user.seat is not None else '?'
-        room.broadcast_msg(f'{seat}号{self.user.nick}失去所有尾巴，悄然离场。')
+        self.announce_tail_death()
         if room.stage != GameStage.Day:
             pending = getattr(room, 'death_pending', [])
             if self.user.nick not in pending:
-                pending.append(self.user.nick)
\ No newline at end of file
+                pending.append(self.user.nick)
+
+    def announce_tail_death(self):
+        seat = self.user.seat if self.user.seat is not None else '?'
+        self.user.room.broadcast_msg(f'{seat}号{self.user.nick}失去所有尾巴，悄然离场。')
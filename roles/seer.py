@@ -16,11 +16,11 @@ class Seer(RoleBase):
         room = self.user.room
         if self.is_feared():
             return False
-        return self.user.status != PlayerStatus.DEAD and room.stage == GameStage.SEER and not self.user.skill.get('acted_this_stage', False)
+        return self.user.status != PlayerStatus.DEAD and room.stage_open(GameStage.SEER) and not self.user.skill.get('acted_this_stage', False)
 
     def get_actions(self) -> List:
         room = self.user.room
-        if not room or room.stage != GameStage.SEER:
+        if not room or not room.stage_open(GameStage.SEER):
             return []
 
         if self.notify_fear_block():
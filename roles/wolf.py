@@ -168,7 +168,7 @@ class Wolf(RoleBase):
             ]
         all_acted = all(u.skill.get('wolf_action_done', False) for u in wolves)
         if all_acted:
-            room.waiting = False
+            room.release_waiting()
 
     @player_action
     def skip(self):
@@ -198,7 +198,7 @@ class WolfBeauty(Wolf):
                 self.user.skill['wolf_beauty_action_notified'] = True
             self.user.skill['acted_this_stage'] = True
             self.user.skill.pop('wolf_beauty_stage_ready', None)
-            self.user.room.waiting = False
+            self.user.room.release_waiting()
             return True
         # 其他情况（刷新等）返回 PENDING，不结束等待
         return 'PENDING'
@@ -235,15 +235,17 @@ class WolfBeauty(Wolf):
 
         # 被魅惑者殉情
         target.status = PlayerStatus.DEAD
-        # 殉情者不能发动技能
+        cls.mark_martyr(room, target)
+        return target.nick
+
+    @classmethod
+    def mark_martyr(cls, room, target):
+        """殉情者不能发动技能，并公告殉情"""
         target.skill['can_shoot'] = False
         target.skill['charmed_death'] = True
-
         seat = target.seat if target.seat is not None else '?'
         room.broadcast_msg(f'{seat}号玩家被狼美人魅惑，殉情出局。')
 
-        return target.nick
-
     @classmethod
     def clear_charm_effects(cls, room):
         """清除所有玩家的魅惑状态（新的一晚开始时调用）"""
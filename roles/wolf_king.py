@@ -54,7 +54,7 @@ class WolfKing(Wolf):
                 status_msg = "可以开枪" if can_shoot else "不可以开枪"
                 self.user.send_msg(f'🔫 你的开枪状态：{status_msg}')
                 self.user.skill['wolfking_msg_sent'] = True
-            return [self._build_confirm_action('确认枪状态（20秒内）')]
+            return [self._build_confirm_action(f'确认枪状态（{room.pacing.night}秒内）')]
         return []
 
     @player_action
@@ -5,6 +5,7 @@ import re
 import secrets
 import sys
 import json
+import subprocess
 from copy import copy
 from typing import Optional, Tuple
 from logging import getLogger, basicConfig
@@ -13,12 +14,18 @@ import socketio
 import uvicorn
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 
 from enums import WitchRule, GuardRule, SheriffBombRule, Role, GameStage, PlayerStatus
 from models.room import Room
 from models.user import User
-from models.system import Global
+from models.system import Global, Config
+from models.message_log import LogCursor
+from models.runtime.pacing import Pacing, pacing_options
+from models.runtime.tools import deadline_scheduler
+from models.runtime import clock, metrics
+from models.store import GameStore
+from models import cluster
 from models.lobby import (
     ROOM_CREATION_SECTIONS, GAME_RESOURCE_LINKS, GUIDE_LINKS,
     DEV_LINKS, FEEDBACK_LINK, build_room_info_lines, resolve_room_config,
@@ -35,9 +42,46 @@ logger.setLevel('DEBUG')
 
 # ── Socket.IO + FastAPI setup ────────────────────────────────────────────────
 
-sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*', ping_timeout=60, ping_interval=25)
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*', ping_timeout=60, ping_interval=25,
+                           json=metrics.CountingJSON)  # 统计发出的事件数与字节数（/metrics）
 _fastapi = FastAPI()
-app = socketio.ASGIApp(sio, _fastapi)
+_loop_monitor: Optional[asyncio.Task] = None  # event-loop lag sampler for /metrics
+
+
+async def _restore_state():
+    """打开持久化存储，恢复登录凭证与房间；进行中的对局从中断的那一晚重新开始。"""
+    global _loop_monitor
+    _loop_monitor = asyncio.create_task(metrics.monitor_loop_lag())
+    if not Config.STATE_DB:
+        return
+    store = GameStore(Config.STATE_DB)
+    tokens, rooms = store.restore()
+    store.start()
+    Global.store = store
+    _token_to_nick.update(tokens)
+    if cluster.enabled():
+        global _lobby_watcher
+        store.publish_lobby(Config.SHARD_INDEX, build_room_info_lines())
+        _lobby_watcher = asyncio.create_task(_watch_remote_lobby())
+    for room in rooms:
+        if room.started and not room.game_over:
+            room.broadcast_msg(f'服务器已重启，对局从第 {room.round + 1} 晚重新开始', tts=True)
+            room.logic_thread = asyncio.create_task(room.game_loop())
+            _ensure_room_pusher(room)
+
+
+async def _close_store():
+    if _loop_monitor:
+        _loop_monitor.cancel()
+    if _lobby_watcher:
+        _lobby_watcher.cancel()
+    if Global.store:
+        Global.store.close()
+        Global.store = None
+    Global.close_log_archive()
+
+
+app = socketio.ASGIApp(sio, _fastapi, on_startup=_restore_state, on_shutdown=_close_store)
 
 _fastapi.mount('/static', StaticFiles(directory='static'), name='static')
 
@@ -46,6 +90,34 @@ async def index():
     return FileResponse('static/index.html')
 
 
+@_fastapi.get('/metrics')
+async def metrics_endpoint():
+    """Prometheus text: handler durations, emitted events, loop lag and room/timer gauges."""
+    return PlainTextResponse(metrics.render(_metrics_gauges()))
+
+
+def _metrics_gauges():
+    stages = dict.fromkeys([stage.name for stage in GameStage] + ['none'], 0)
+    log_sizes = []
+    countdowns = 0
+    for room in Global.rooms.values():
+        stages[room.stage.name if room.stage else 'none'] += 1
+        log_sizes.append(len(room.log) - room.log.first_seq)
+        countdowns += room.countdown is not None
+    for stage, count in stages.items():
+        yield 'mv_rooms', f'stage="{stage}"', count
+    for status, ids in Global.rooms_by_status.items():
+        yield 'mv_rooms_by_status', f'status="{status}"', len(ids)
+    yield 'mv_users', '', len(Global.users)
+    yield 'mv_connections', '', len(_sid_to_nick)
+    yield 'mv_room_pushers', '', len(_room_pushers)
+    yield 'mv_room_countdowns', '', countdowns
+    for key, value in deadline_scheduler.stats().items():
+        yield 'mv_deadlines', f'stat="{key}"', value
+    yield 'mv_room_log_entries', 'stat="total"', sum(log_sizes)
+    yield 'mv_room_log_entries', 'stat="max"', max(log_sizes, default=0)
+
+
 # ── Token → User mapping for reconnection ────────────────────────────────────
 
 _token_to_nick: dict[str, str] = {}   # token → nick
@@ -76,6 +148,11 @@ def _room_config_text(room: Room) -> str:
         shield = '机械盾抵挡猎枪' if getattr(room, 'mw_shield_blocks_hunter', False) else '机械盾不挡猎枪'
         knife = '双刀可破盾' if getattr(room, 'mw_double_knife_breaks_shield', False) else '双刀不可破盾'
         rules += f'｜机械狼：{shield}｜{knife}'
+    if room.concurrent_night:
+        rules += '｜夜间：并行行动'
+    pacing = room.pacing
+    rules += (f'｜节奏：{pacing.profile.value}（夜间 {pacing.night} 秒，投票 {pacing.decision} 秒，'
+              f'发言 {pacing.speech} 秒）')
     return f"共 {total} 人 | {'、'.join(parts)} | {rules}"
 
 
@@ -96,34 +173,57 @@ def _room_config_dict(room: Room) -> dict:
         'sheriff_bomb_rule': room.sheriff_bomb_rule.value,
         'mw_shield_blocks_hunter': getattr(room, 'mw_shield_blocks_hunter', False),
         'mw_double_knife_breaks_shield': getattr(room, 'mw_double_knife_breaks_shield', False),
+        **room.pacing.as_config(),
+        'concurrent_night': room.concurrent_night,
     }
 
 
+_room_pushers: dict[str, asyncio.Task] = {}   # room id → pusher task
+# Changes within this window after a wake-up go out in the same push (0: just the current tick)
+PUSH_COALESCE_SECONDS = float(os.environ.get('MV_PUSH_COALESCE_MS', '0')) / 1000
+
+
 async def _room_push_loop(room: Room):
-    """Push state to all players whenever the game advances (stage change or new log entries)."""
-    last_log_len = 0
-    last_stage = None
+    """Push state to all players whenever the room reports a change.
+
+    Woken by ``Room.notify_change()`` (log appends, stage / phase transitions,
+    seat bumps).  The push waits for the room's command batch (``room.actor``)
+    to drain, so a burst of actions and the changes made before the pusher gets
+    scheduled are coalesced into a single push.  A change of the room's lobby
+    status (open / full / started) also refreshes the lobby.
+    """
+    changed = room.change_event()
+    lobby_status = Global.room_status(room.id)
     try:
-        while not room.game_over:
-            await asyncio.sleep(0.5)
-            new_len = len(room.log)
-            new_stage = room.stage
-            if new_len != last_log_len or new_stage != last_stage:
-                last_log_len = new_len
-                last_stage = new_stage
-                if room.players:
-                    await push_room_state_all(room)
+        while room.players and Global.get_room(room.id) is room:
+            await changed.wait()
+            changed.clear()
+            await room.actor.idle()
+            # Yield (or wait out the coalescing window) so mutations issued in the same burst land in this push
+            await asyncio.sleep(PUSH_COALESCE_SECONDS)
+            if room.players:
+                await push_room_state_all(room)
+            if Global.room_status(room.id) != lobby_status:
+                lobby_status = Global.room_status(room.id)
+                await broadcast_lobby()
     except Exception:
         logger.exception('_room_push_loop 出现异常')
     finally:
-        if room.players:
-            await push_room_state_all(room)
+        _room_pushers.pop(str(room.id), None)
+
+
+def _ensure_room_pusher(room: Room):
+    """Start the room's pusher task unless one is already running."""
+    task = _room_pushers.get(str(room.id))
+    if task and not task.done():
+        return
+    _room_pushers[str(room.id)] = asyncio.create_task(_room_push_loop(room))
 
 
 async def _run_start_game(room: Room):
     """Fire-and-forget wrapper: run start_game then push state to all players."""
+    _ensure_room_pusher(room)
     await room.start_game()
-    asyncio.create_task(_room_push_loop(room))
     await push_room_state_all(room)
 
 
@@ -138,6 +238,7 @@ async def _reset_room_for_new_game(room: Room):
     quitters = [u for u in list(room.players.values())
                 if u.skill.get('play_again_response') == '不参加']
 
+    _cancel_room_countdown(room)
     for user in list(room.players.values()):
         _cancel_countdown(user, suppress_timeout=True)
 
@@ -146,7 +247,7 @@ async def _reset_room_for_new_game(room: Room):
     room.round = 0
     room.stage = None
     room.waiting = False
-    room.log = []
+    room.log.clear()
     room.skill = {}
     room.death_pending = []
     room.current_speaker = None
@@ -162,17 +263,14 @@ async def _reset_room_for_new_game(room: Room):
         user.role_instance = None
         user.status = None
         user.skill = {}
-        user.message_cursor = 0
+        user.message_cursor = LogCursor()
 
     for user in quitters:
-        room.players.pop(user.nick, None)
-        user.room = None
-        user.seat = None
+        # remove_player 同时更新大厅的房间状态索引，最后一人离开时关闭房间
+        room.remove_player(user)
         await push_state(user)
 
     if not room.players:
-        from models.system import Global as _G
-        _G.remove_room(room.id)
         return
 
     room._mark_seat_state_dirty()
@@ -180,11 +278,37 @@ async def _reset_room_for_new_game(room: Room):
     room.broadcast_msg(f'新局准备就绪！共 {len(room.players)} 名玩家，房主是 {room.get_host().nick}')
     room.broadcast_msg(f'房间配置：{_room_config_text(room)}')
     for user in room.players.values():
-        user.message_cursor = 0
+        user.message_cursor = LogCursor()
 
     await push_room_state_all(room)
 
 
+def _action_memo(room: Room) -> dict:
+    """Per-room memo for action-list parts shared by every player, valid for one ``state_version``."""
+    cache = room._payload_cache
+    if cache.get('actions_version') != room.state_version:
+        cache['actions_version'] = room.state_version
+        cache['actions'] = {}
+    return cache['actions']
+
+
+def _shared_action(room: Room, key: str, build):
+    memo = _action_memo(room)
+    if key not in memo:
+        memo[key] = build()
+    return memo[key]
+
+
+def _ballot_action(room: Room, name: str, nicks: list, help_text: str) -> dict:
+    btns = []
+    for nick in nicks:
+        p = room.players.get(nick)
+        seat = p.seat if p and p.seat is not None else '?'
+        btns.append({'label': f"{seat}. {nick}", 'value': f"{seat}. {nick}"})
+    btns.append({'label': '弃票', 'value': '弃票', 'color': 'secondary'})
+    return _stub_actions(name=name, buttons=btns, help_text=help_text)
+
+
 def _compute_actions(user: User, room: Optional[Room]) -> list:
     """Mirror of main.py's per-loop action building, returning stub dicts."""
     ops = []
@@ -237,10 +361,10 @@ def _compute_actions(user: User, room: Optional[Room]) -> list:
             phase = sheriff_state.get('phase')
             if phase == 'signup' and not user.skill.get('sheriff_voted'):
                 ops += [_stub_actions(name='sheriff_vote', buttons=['上警', '不上警'],
-                           help_text='请选择是否上警（10秒内未选则视为不上警）')]
+                           help_text=f'请选择是否上警（{room.pacing.decision}秒内未选则视为不上警）')]
 
-            active_cands = (room.get_active_sheriff_candidates()
-                            if hasattr(room, 'get_active_sheriff_candidates') else [])
+            active_cands = _shared_action(room, 'active_cands', lambda: (
+                room.get_active_sheriff_candidates() if hasattr(room, 'get_active_sheriff_candidates') else []))
             if (phase in ('speech', 'await_vote', 'pk_speech', 'await_pk_vote') and
                     user.nick in active_cands and
                     not user.skill.get('sheriff_withdrawn')):
@@ -249,13 +373,8 @@ def _compute_actions(user: User, room: Optional[Room]) -> list:
             if (phase in ('vote', 'pk_vote') and
                     user.nick in sheriff_state.get('eligible_voters', []) and
                     not user.skill.get('sheriff_has_balloted')):
-                btns = []
-                for nick in active_cands:
-                    p = room.players.get(nick)
-                    seat = p.seat if p and p.seat is not None else '?'
-                    btns.append({'label': f"{seat}. {nick}", 'value': f"{seat}. {nick}"})
-                btns.append({'label': '弃票', 'value': '弃票', 'color': 'secondary'})
-                ops += [_stub_actions(name='sheriff_ballot', buttons=btns, help_text='请选择支持的警长候选人')]
+                ops += [_shared_action(room, 'sheriff_ballot', lambda: _ballot_action(
+                    room, 'sheriff_ballot', active_cands, '请选择支持的警长候选人'))]
 
         # Last words
         if room.stage == GameStage.LAST_WORDS and day_state.get('current_last_word') == user.nick:
@@ -273,7 +392,7 @@ def _compute_actions(user: User, room: Optional[Room]) -> list:
                     else:
                         btns = [{'label': '发动技能（不可用）', 'value': 'disabled_last_skill',
                                  'disabled': True, 'color': 'secondary'}, '放弃']
-                ops += [_stub_actions(name='last_word_skill', buttons=btns, help_text='发表遗言前是否发动技能？（10秒）')]
+                ops += [_stub_actions(name='last_word_skill', buttons=btns, help_text=f'发表遗言前是否发动技能？（{room.pacing.decision}秒）')]
             elif day_state.get('last_words_allow_speech', True) and not user.skill.get('last_words_done'):
                 ops += [_stub_actions(name='last_word_done', buttons=['遗言结束'], help_text='发表完遗言后点击')]
 
@@ -286,7 +405,7 @@ def _compute_actions(user: User, room: Optional[Room]) -> list:
 
         # Idiot badge
         if user.skill.get('idiot_badge_transfer_required'):
-            candidates = [u for u in room.list_alive_players() if u.nick != user.nick]
+            candidates = [u for u in _shared_action(room, 'alive', room.list_alive_players) if u.nick != user.nick]
             btns = [{'label': f'交给{p.seat}号{p.nick}', 'value': p.nick} for p in candidates]
             if not btns:
                 btns.append({'label': '无人可交出，空缺', 'value': 'forfeit', 'color': 'warning'})
@@ -296,10 +415,10 @@ def _compute_actions(user: User, room: Optional[Room]) -> list:
         if (room.stage == GameStage.BADGE_TRANSFER and
                 room.skill.get('sheriff_captain') == user.nick and
                 not user.skill.get('badge_action_taken')):
-            alive = [u for u in room.list_alive_players() if u.nick != user.nick]
+            alive = [u for u in _shared_action(room, 'alive', room.list_alive_players) if u.nick != user.nick]
             btns = [{'label': f'交给{p.seat}号{p.nick}', 'value': f'transfer:{p.nick}'} for p in alive]
             btns.append({'label': '撕毁警徽', 'value': 'destroy', 'color': 'danger'})
-            ops += [_stub_actions(name='sheriff_badge_action', buttons=btns, help_text='请选择移交对象或撕毁警徽（10秒）')]
+            ops += [_stub_actions(name='sheriff_badge_action', buttons=btns, help_text=f'请选择移交对象或撕毁警徽（{room.pacing.decision}秒）')]
 
         # Wolf self-bomb
         if room.can_wolf_self_bomb(user):
@@ -316,13 +435,8 @@ def _compute_actions(user: User, room: Optional[Room]) -> list:
         # Exile vote
         if room.stage in (GameStage.EXILE_VOTE, GameStage.EXILE_PK_VOTE):
             if user.skill.get('exile_vote_pending'):
-                btns = []
-                for nick in day_state.get('vote_candidates', []):
-                    p = room.players.get(nick)
-                    seat = p.seat if p and p.seat is not None else '?'
-                    btns.append({'label': f"{seat}. {nick}", 'value': f"{seat}. {nick}"})
-                btns.append({'label': '弃票', 'value': '弃票', 'color': 'secondary'})
-                ops += [_stub_actions(name='exile_vote', buttons=btns, help_text='请选择要放逐的玩家')]
+                ops += [_shared_action(room, 'exile_vote', lambda: _ballot_action(
+                    room, 'exile_vote', day_state.get('vote_candidates', []), '请选择要放逐的玩家'))]
 
     # ── Room control ──────────────────────────────────────────────────────────
     if not room.started:
@@ -331,14 +445,10 @@ def _compute_actions(user: User, room: Optional[Room]) -> list:
         ops += [_stub_actions(name='room_control', buttons=ctrl, help_text='房间操作')]
 
     # Night confirm button
-    NIGHT_STAGES = {GameStage.HALF_BLOOD, GameStage.NIGHTMARE, GameStage.WOLF,
-                    GameStage.WOLF_BEAUTY, GameStage.SEER, GameStage.WITCH,
-                    GameStage.GUARD, GameStage.HUNTER, GameStage.WOLF_KING, GameStage.DREAMER,
-                    GameStage.MECHANICAL_WOLF_LEARN, GameStage.MECHANICAL_WOLF_ACT,
-                    GameStage.MAGIC_MIRROR_GIRL}
-    if (room.stage in NIGHT_STAGES and user.role_instance and
+    if (room.stage in CONFIRM_BUTTON_STAGES and user.role_instance and
             user.role_instance.can_act_at_night and user.role_instance.needs_global_confirm):
-        ops += [_stub_actions(name='confirm_action', buttons=['确认'], help_text='确认当前选择（20秒内）')]
+        ops += [_stub_actions(name='confirm_action', buttons=['确认'],
+                              help_text=f'确认当前选择（{room.pacing.night}秒内）')]
 
     return ops
 
@@ -347,63 +457,232 @@ def _build_seat_snapshot(room: Room) -> dict:
     return room.get_seat_snapshot()
 
 
-async def push_state(user: User):
-    """Push pending messages and current UI state to a single user."""
+def _room_static_state(room: Room) -> dict:
+    """Room-wide state parts that only change with seats, players or configuration.
+
+    Cached on the room per ``seat_state_version`` (bumped by every seat, player
+    and config change), so the Counter/sort work runs once rather than per player.
+    """
+    cache = room._payload_cache
+    if cache.get('version') != room.seat_state_version:
+        host = room.get_host()
+        cache['version'] = room.seat_state_version
+        cache['state'] = {
+            'room_desc': room.desc(),
+            'room_config': _room_config_text(room),
+            'seat_panel': _build_seat_snapshot(room),
+            'host_nick': host.nick if host else None,
+        }
+    return cache['state']
+
+
+def _room_shared_state(room: Room) -> dict:
+    """Room-wide part of the 'state' payload, identical for every player in the room."""
+    return {
+        'in_room': True,
+        'room_id': room.id,
+        **_room_static_state(room),
+        'started': room.started,
+        'game_over': room.game_over,
+        'stage': room.stage.name if room.stage else None,
+        'countdown': _room_countdown(room),
+    }
+
+
+HISTORY_PAGE = 100  # get_history 每页最多条数
+
+_LOBBY_STATE = {
+    'in_room': False, 'room_id': None, 'room_desc': None, 'room_config': None,
+    'started': False, 'game_over': False, 'stage': None, 'seat_panel': None,
+    'host_nick': None, 'countdown': None,
+}
+
+
+@metrics.timed('push_state')
+async def push_state(user: User, shared: Optional[dict] = None, messages: Optional[list] = None):
+    """Push pending messages and current UI state to a single user as one 'update' frame.
+
+    ``shared`` is the room-wide part from ``_room_shared_state``; callers pushing
+    to a whole room build it once and pass it in.  ``messages`` are sent ahead
+    of the pending ones (the reconnect replay).
+    """
     if not user.sid:
         return
     room = user.room
+    await _sync_lobby_membership(user)
 
-    msgs = user.get_pending_messages()
+    frame = {}
+    msgs = (messages or []) + user.get_pending_messages()
     if msgs:
-        await sio.emit('messages', msgs, to=user.sid)
+        frame['messages'] = msgs
 
-    seat_snap = _build_seat_snapshot(room) if room else None
-    stage_name = room.stage.name if room and room.stage else None
+    if room and shared is None:
+        shared = _room_shared_state(room)
     actions = _compute_actions(user, room)
 
-    countdown_ctx = _get_countdown_context(room) if room else (None, None, None)
-    ckey, csecs, clabel = countdown_ctx
-
-    if room and room.stage and not room.game_over:
-        _maybe_start_countdown(user, room)
-
-    await sio.emit('state', {
-        'in_room': room is not None,
-        'room_id': room.id if room else None,
-        'room_desc': room.desc() if room else None,
-        'room_config': _room_config_text(room) if room else None,
-        'started': room.started if room else False,
-        'game_over': room.game_over if room else False,
+    frame.update(_state_delta(user, {
+        **(shared if room else _LOBBY_STATE),
         'seat': user.seat,
-        'stage': stage_name,
         'actions': actions,
-        'seat_panel': seat_snap,
-        'host_nick': room.get_host().nick if room and room.get_host() else None,
         'is_host': (user is room.get_host()) if room else False,
         'role_name': user.role_instance.name if user.role_instance else None,
-        'countdown': {'key': ckey, 'seconds': csecs, 'label': clabel} if ckey else None,
-    }, to=user.sid)
+    }))
+    if frame:
+        frame['server_time'] = clock.wall_time()
+        await sio.emit('update', frame, to=user.sid)
 
 
+def _state_patch(old: dict, new: dict) -> list:
+    """JSON-patch (RFC 6902) ops turning ``old`` into ``new``, one op per top-level key."""
+    ops = []
+    for key, value in new.items():
+        if key not in old:
+            ops.append({'op': 'add', 'path': f'/{key}', 'value': value})
+        elif old[key] is not value and old[key] != value:
+            ops.append({'op': 'replace', 'path': f'/{key}', 'value': value})
+    for key in old:
+        if key not in new:
+            ops.append({'op': 'remove', 'path': f'/{key}'})
+    return ops
+
+
+def _state_delta(user: User, state: dict) -> dict:
+    """The state part of an 'update' frame: a full snapshot or a patch against the last one sent.
+
+    A full ``state`` goes out when nothing has been sent on this connection yet
+    (``user.sent_state is None``); afterwards only changed keys travel in a
+    ``patch`` carrying ``base``/``version``. Unchanged states add nothing.
+    """
+    prev = user.sent_state
+    if prev is None:
+        user.state_version += 1
+        user.sent_state = state
+        return {'state': {**state, 'version': user.state_version}}
+    ops = _state_patch(prev, state)
+    if not ops:
+        return {}
+    base = user.state_version
+    user.state_version += 1
+    user.sent_state = state
+    return {'patch': {'base': base, 'version': user.state_version, 'ops': ops}}
+
+
+@metrics.timed('push_room_state_all')
 async def push_room_state_all(room: Room):
-    """Push state to every connected player in a room."""
-    for user in list(room.players.values()):
-        await push_state(user)
+    """Push state to every connected player in a room, concurrently."""
+    # Everything up to now is about to be delivered; the pusher need not fire again
+    room.change_event().clear()
+    if Global.store:
+        Global.store.sync_room(room)
+    shared = _room_shared_state(room)
+    results = await asyncio.gather(
+        *(push_state(user, shared) for user in list(room.players.values()) if user.room is room),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning(f'push_state 失败: {result!r}')
+    room.spill_log()
+
+
+LOBBY_ROOM = 'lobby'            # socket.io room of every connection not in a game room
+LOBBY_DEBOUNCE_SECONDS = 0.2    # a burst of room changes within this window sends one lobby update
+_lobby_sids: set = set()
+_lobby_cache: dict = {'rooms': None, 'payload': None}
+_lobby_flush = None             # pending debounced broadcast (DeadlineHandle)
+_lobby_publish = False
+
+
+def _lobby_payload() -> dict:
+    """The lobby payload, rebuilt only when a room line changed (lines are cached in models/lobby.py)."""
+    rooms = build_room_info_lines()
+    if cluster.enabled() and Global.store:
+        # 其他进程的房间来自共享存储
+        rooms = sorted(rooms + Global.store.read_lobby(exclude=Config.SHARD_INDEX),
+                       key=lambda line: int(line['room_id']))
+    if rooms != _lobby_cache['rooms']:
+        _lobby_cache['rooms'] = rooms
+        _lobby_cache['payload'] = {
+            'rooms': rooms,
+            'creation_sections': ROOM_CREATION_SECTIONS,
+            'game_resource_links': GAME_RESOURCE_LINKS,
+            'guide_links': GUIDE_LINKS,
+            'dev_links': DEV_LINKS,
+            'feedback_link': FEEDBACK_LINK,
+            'pacing_options': pacing_options(),
+        }
+    return _lobby_cache['payload']
+
+
+async def _sync_lobby_membership(user: User):
+    """Keep ``user``'s connection in the 'lobby' socket.io room exactly while they are not in a room."""
+    sid = user.sid
+    in_lobby = user.room is None
+    if not sid or (sid in _lobby_sids) == in_lobby:
+        return
+    try:
+        if in_lobby:
+            await sio.enter_room(sid, LOBBY_ROOM)
+            _lobby_sids.add(sid)
+        else:
+            _lobby_sids.discard(sid)
+            await sio.leave_room(sid, LOBBY_ROOM)
+    except ValueError:
+        _lobby_sids.discard(sid)  # 连接已断开
 
 
-async def broadcast_lobby():
-    """Push an updated room list to all users currently in the lobby (no room)."""
-    lobby_payload = {
-        'rooms': build_room_info_lines(),
-        'creation_sections': ROOM_CREATION_SECTIONS,
-        'game_resource_links': GAME_RESOURCE_LINKS,
-        'guide_links': GUIDE_LINKS,
-        'dev_links': DEV_LINKS,
-        'feedback_link': FEEDBACK_LINK,
-    }
-    for user in list(Global.users.values()):
-        if not user.room and user.sid:
-            await sio.emit('lobby', lobby_payload, to=user.sid)
+async def broadcast_lobby(publish: bool = True):
+    """Schedule an updated room list for everyone in the lobby; calls within
+    ``LOBBY_DEBOUNCE_SECONDS`` are merged into one emit to the 'lobby' room."""
+    global _lobby_flush, _lobby_publish
+    _lobby_publish = _lobby_publish or publish
+    if _lobby_flush is None or _lobby_flush.cancelled:
+        _lobby_flush = deadline_scheduler.call_later(
+            LOBBY_DEBOUNCE_SECONDS, lambda: asyncio.ensure_future(_flush_lobby()))
+
+
+async def _flush_lobby():
+    global _lobby_flush, _lobby_publish
+    _lobby_flush = None
+    publish, _lobby_publish = _lobby_publish, False
+    if publish and cluster.enabled() and Global.store:
+        Global.store.publish_lobby(Config.SHARD_INDEX, build_room_info_lines())
+    await sio.emit('lobby', _lobby_payload(), to=LOBBY_ROOM)
+
+
+# ── Multi-worker mode (models/cluster.py) ─────────────────────────────────────
+
+_lobby_watcher: Optional[asyncio.Task] = None
+LOBBY_POLL_SECONDS = 2.0
+
+
+async def _watch_remote_lobby():
+    """Re-broadcast the local lobby whenever another worker publishes a new room list."""
+    seen = None
+    while True:
+        try:
+            version = Global.store.lobby_version(exclude=Config.SHARD_INDEX)
+            if seen is not None and version != seen:
+                await broadcast_lobby(publish=False)
+            seen = version
+        except Exception as e:
+            logger.warning(f'读取其他进程的大厅失败: {e!r}')
+        await asyncio.sleep(LOBBY_POLL_SECONDS)
+
+
+def _adopt_user(token: str) -> Optional[User]:
+    """A token issued by another worker: create the local copy of its user."""
+    nick = Global.store.nick_for_token(token) if Global.store else None
+    if not nick or nick in Global.users:
+        return None
+    _token_to_nick[token] = nick
+    return User.alloc(nick, None, token)
+
+
+async def _switch_shard(user: User, room_id: str):
+    """Send the client to the worker that owns ``room_id``."""
+    await sio.emit('switch_shard', {**cluster.shard_address(cluster.shard_of(room_id)),
+                                    'room_id': room_id, 'token': user.reconnect_token}, to=user.sid)
 
 
 def _get_countdown_context(room: Optional[Room]) -> Tuple[Optional[str], Optional[int], Optional[str]]:
@@ -412,6 +691,7 @@ def _get_countdown_context(room: Optional[Room]) -> Tuple[Optional[str], Optiona
         return None, None, None
 
     stage = room.stage
+    pacing = room.pacing
     night_labels = {
         GameStage.NIGHTMARE: '梦魇行动',
         GameStage.HALF_BLOOD: '混血儿认亲',
@@ -430,7 +710,8 @@ def _get_countdown_context(room: Optional[Room]) -> Tuple[Optional[str], Optiona
     }
     if stage in night_labels:
         key = f"{stage.name}_round{room.round}"
-        return key, 20, f"{night_labels[stage]}倒计时"
+        label = '夜间行动' if room.open_stages else night_labels[stage]  # 并行夜间模式共用一个倒计时
+        return key, pacing.night, f"{label}倒计时"
 
     sheriff_state = getattr(room, 'sheriff_state', {}) or {}
     day_state = getattr(room, 'day_state', {}) or {}
@@ -438,17 +719,17 @@ def _get_countdown_context(room: Optional[Room]) -> Tuple[Optional[str], Optiona
     if stage == GameStage.SHERIFF:
         phase = sheriff_state.get('phase')
         if phase == 'signup':
-            return f"sheriff_signup_r{room.round}", 10, '上警报名倒计时'
+            return f"sheriff_signup_r{room.round}", pacing.decision, '上警报名倒计时'
         if phase == 'deferred_withdraw':
-            return f"sheriff_deferred_r{room.round}", 10, '退水决定倒计时'
+            return f"sheriff_deferred_r{room.round}", pacing.decision, '退水决定倒计时'
         if phase == 'vote':
-            return f"sheriff_vote_r{room.round}", 10, '警长投票倒计时'
+            return f"sheriff_vote_r{room.round}", pacing.decision, '警长投票倒计时'
         if phase == 'pk_vote':
-            return f"sheriff_pk_vote_r{room.round}", 10, '警长PK投票倒计时'
+            return f"sheriff_pk_vote_r{room.round}", pacing.decision, '警长PK投票倒计时'
         if day_state.get('phase') == 'await_sheriff_order':
             captain = room.skill.get('sheriff_captain') if hasattr(room, 'skill') else None
             anchor = captain or 'system'
-            return f"sheriff_order_r{room.round}_{anchor}", 10, '发言顺序倒计时'
+            return f"sheriff_order_r{room.round}_{anchor}", pacing.decision, '发言顺序倒计时'
 
     if stage == GameStage.LAST_WORDS:
         current = day_state.get('current_last_word')
@@ -456,10 +737,10 @@ def _get_countdown_context(room: Optional[Room]) -> Tuple[Optional[str], Optiona
             player = room.players.get(current)
             if player:
                 if not player.skill.get('last_words_skill_resolved'):
-                    return f"lastwords_skill_r{room.round}_{current}", 10, f"{current}技能抉择倒计时"
+                    return f"lastwords_skill_r{room.round}_{current}", pacing.decision, f"{current}技能抉择倒计时"
                 allow = day_state.get('last_words_allow_speech', True)
                 if allow and not player.skill.get('last_words_done'):
-                    return f"lastwords_speech_r{room.round}_{current}", 120, f"{current}遗言倒计时"
+                    return f"lastwords_speech_r{room.round}_{current}", pacing.speech, f"{current}遗言倒计时"
 
     if stage == GameStage.SPEECH:
         speaker = getattr(room, 'current_speaker', None)
@@ -467,14 +748,14 @@ def _get_countdown_context(room: Optional[Room]) -> Tuple[Optional[str], Optiona
             is_pk = sheriff_state.get('phase') == 'pk_speech'
             label = f"{speaker}{'警长PK发言' if is_pk else '警长竞选发言'}倒计时"
             key = f"sheriff_{'pk_' if is_pk else ''}speech_r{room.round}_{speaker}"
-            return key, 120, label
+            return key, pacing.speech, label
 
     if stage in (GameStage.EXILE_SPEECH, GameStage.EXILE_PK_SPEECH):
         speaker = getattr(room, 'current_speaker', None)
         if speaker:
-            secs = 120
+            secs = pacing.speech
             if stage == GameStage.EXILE_SPEECH and room.skill.get('sheriff_captain') == speaker:
-                secs = 150
+                secs = pacing.captain_speech
             label_prefix = '放逐PK发言' if stage == GameStage.EXILE_PK_SPEECH else '放逐发言'
             key = f"{stage.name.lower()}_r{room.round}_{speaker}"
             return key, secs, f"{speaker}{label_prefix}倒计时"
@@ -482,18 +763,18 @@ def _get_countdown_context(room: Optional[Room]) -> Tuple[Optional[str], Optiona
     if stage == GameStage.BADGE_TRANSFER:
         captain = room.skill.get('sheriff_captain') if hasattr(room, 'skill') else None
         anchor = captain or day_state.get('pending_execution') or 'badge'
-        return f"badge_transfer_r{room.round}_{anchor}", 10, '警徽移交倒计时'
+        return f"badge_transfer_r{room.round}_{anchor}", pacing.decision, '警徽移交倒计时'
 
     if stage == GameStage.EXILE_VOTE:
-        return f"exile_vote_r{room.round}", 10, '放逐投票倒计时'
+        return f"exile_vote_r{room.round}", pacing.decision, '放逐投票倒计时'
 
     if stage == GameStage.EXILE_PK_VOTE:
-        return f"exile_pk_vote_r{room.round}", 10, '放逐PK投票倒计时'
+        return f"exile_pk_vote_r{room.round}", pacing.decision, '放逐PK投票倒计时'
 
     return None, None, None
 
 
-# ── Countdown task (per-user) ─────────────────────────────────────────────────
+# ── Countdown (one deadline per room) ─────────────────────────────────────────
 
 NIGHT_STAGES = {GameStage.HALF_BLOOD, GameStage.NIGHTMARE, GameStage.WOLF,
                 GameStage.WOLF_BEAUTY, GameStage.SEER, GameStage.WITCH,
@@ -501,6 +782,7 @@ NIGHT_STAGES = {GameStage.HALF_BLOOD, GameStage.NIGHTMARE, GameStage.WOLF,
                 GameStage.NINE_TAILED_FOX,
                 GameStage.MECHANICAL_WOLF_LEARN, GameStage.MECHANICAL_WOLF_ACT,
                 GameStage.MAGIC_MIRROR_GIRL}
+CONFIRM_BUTTON_STAGES = NIGHT_STAGES - {GameStage.NINE_TAILED_FOX}  # 九尾妖狐阶段不显示确认按钮
 DAY_TIMER_STAGES = {GameStage.SHERIFF, GameStage.LAST_WORDS, GameStage.EXILE_VOTE,
                     GameStage.EXILE_PK_VOTE, GameStage.BADGE_TRANSFER,
                     GameStage.EXILE_SPEECH, GameStage.EXILE_PK_SPEECH, GameStage.SPEECH}
@@ -511,182 +793,182 @@ NO_WAIT_ENFORCEMENT_STAGES = {
 }
 
 
-async def _countdown(user: User, seconds: int):
-    try:
-        for i in range(seconds, 0, -1):
-            if user.sid:
-                await sio.emit('countdown_tick', {'seconds': i}, to=user.sid)
-            await asyncio.sleep(1)
-
-        skip = user.skill.pop('countdown_skip_timeout', False)
-        if skip:
-            return
+def _room_countdown(room: Room) -> Optional[dict]:
+    """Return the room's running countdown for clients, arming a new deadline when it changed.
+
+    One deadline per room replaces the per-user countdown tasks: clients get the
+    absolute ``expires_at`` and tick locally, and the timeout handlers of every
+    player fire from ``deadline_scheduler`` when it passes.
+    """
+    ckey, csecs, clabel = (_get_countdown_context(room) if room.stage and not room.game_over
+                           else (None, None, None))
+    if room.countdown and room.countdown['key'] == ckey:
+        return room.countdown
+    _cancel_room_countdown(room)
+    if not ckey:
+        return None
+    for user in room.players.values():
+        user.skill.pop('countdown_skip_timeout', None)
+    room.countdown = {'key': ckey, 'seconds': csecs, 'label': clabel,
+                      'expires_at': round(clock.wall_time() + csecs, 3)}
+    room._countdown_handle = deadline_scheduler.call_later(csecs, room.actor.post,
+                                                           _on_room_countdown_expired, room, ckey)
+    return room.countdown
 
-        stage = getattr(user.room, 'stage', None) if user.room else None
-        room_waiting = getattr(user.room, 'waiting', False) if user.room else False
-        allow_without_waiting = stage in NO_WAIT_ENFORCEMENT_STAGES
-        if not allow_without_waiting and not room_waiting:
-            return
 
-        try:
-            if stage == GameStage.SHERIFF:
-                s = getattr(user.room, 'sheriff_state', {})
-                phase = s.get('phase')
-                if phase == 'signup' and not user.skill.get('sheriff_voted'):
-                    user.room.record_sheriff_choice(user, '不上警')
-                elif phase in ('vote', 'pk_vote') and user.skill.get('sheriff_vote_pending'):
-                    user.room.force_sheriff_abstain(user, reason='timeout')
-                elif phase == 'deferred_withdraw':
-                    user.room.complete_deferred_withdraw()
-                elif (user.room.day_state.get('phase') == 'await_sheriff_order' and
-                      user.nick == user.room.skill.get('sheriff_captain')):
-                    user.room.force_sheriff_order_random()
-
-            elif stage == GameStage.LAST_WORDS:
-                ds = getattr(user.room, 'day_state', {})
-                if ds.get('current_last_word') == user.nick:
-                    if not user.skill.get('last_words_skill_resolved'):
-                        user.room.handle_last_word_skill_choice(user, '放弃')
-                    elif ds.get('last_words_allow_speech', True) and not user.skill.get('last_words_done'):
-                        user.room.complete_last_word_speech(user)
-
-            elif stage == GameStage.BADGE_TRANSFER:
-                if (user.nick == user.room.skill.get('sheriff_captain') and
-                        not user.skill.get('badge_action_taken')):
-                    user.room.handle_sheriff_badge_action(user, 'destroy')
-
-            elif stage in (GameStage.EXILE_VOTE, GameStage.EXILE_PK_VOTE):
-                if user.skill.get('exile_vote_pending'):
-                    user.room.record_exile_vote(user, '弃票')
-
-            elif stage == GameStage.SPEECH:
-                if getattr(user.room, 'current_speaker', None) == user.nick:
-                    user.room.advance_sheriff_speech(user.nick)
-
-            elif stage in (GameStage.EXILE_SPEECH, GameStage.EXILE_PK_SPEECH):
-                if getattr(user.room, 'current_speaker', None) == user.nick:
-                    user.room.advance_exile_speech()
-
-            else:
-                pending_keys = ['wolf_choice', 'pending_charm', 'pending_protect',
-                                'pending_dream_target', 'pending_target',
-                                'pending_half_blood_target', 'pending_fear',
-                                'pending_learn', 'pending_act_target', 'mw_first_knife']
-                has_pending = any(user.skill.get(k) for k in pending_keys)
-                if (user.role_instance and user.role_instance.needs_global_confirm and
-                        hasattr(user.role_instance, 'confirm')):
-                    if has_pending:
-                        user.role_instance.confirm()
-                    else:
-                        user.skip(reason='timeout')
-                else:
-                    user.skip(reason='timeout')
-
-            if user.room:
-                await push_room_state_all(user.room)
-        except Exception as e:
-            logger.warning(f'countdown timeout handler error: {e}')
-    finally:
-        user.skill.pop('countdown_task', None)
-        user.skill.pop('countdown_stage', None)
-        if user.sid:
-            await sio.emit('countdown_clear', {}, to=user.sid)
+def _cancel_room_countdown(room: Room):
+    if room._countdown_handle:
+        room._countdown_handle.cancel()
+    room._countdown_handle = None
+    room.countdown = None
 
 
 def _cancel_countdown(user: User, suppress_timeout: bool = False):
+    """Exempt ``user`` from the timeout handlers of the room's current countdown."""
     if suppress_timeout:
         user.skill['countdown_skip_timeout'] = True
-    task: Optional[asyncio.Task] = user.skill.pop('countdown_task', None)
-    user.skill.pop('countdown_stage', None)
-    if task and not task.done():
-        task.cancel()
-
 
-def _maybe_start_countdown(user: User, room: Room):
-    """Start a per-user countdown task if the current game state warrants one."""
-    sheriff_state = getattr(room, 'sheriff_state', {}) or {}
-    day_state = getattr(room, 'day_state', {}) or {}
-    COUNTDOWN_STAGES = NIGHT_STAGES | DAY_TIMER_STAGES
 
-    if room.stage not in COUNTDOWN_STAGES:
+def _on_room_countdown_expired(room: Room, key: str):
+    if not room.countdown or room.countdown['key'] != key:
         return
+    # Forget the deadline so that, if the state does not move on, the next push re-arms it
+    room._countdown_handle = None
+    room.countdown = None
+    timed_out = 0
+    for user in list(room.players.values()):
+        if user.skill.pop('countdown_skip_timeout', False):
+            continue
+        if user.room is room and _countdown_seconds(user, room):
+            _apply_countdown_timeout(user, room)
+            timed_out += 1
+    room.timeline.timeout(timed_out)
+    asyncio.ensure_future(push_room_state_all(room))
 
-    existing = user.skill.get('countdown_task')
-    if existing:
-        existing_stage = user.skill.get('countdown_stage')
-        done = hasattr(existing, 'done') and existing.done()
-        # Cancel if stage changed, task is done, or it's a speech stage and this user is no longer the speaker
-        stale_speaker = (
-            existing_stage in {GameStage.SPEECH, GameStage.EXILE_SPEECH, GameStage.EXILE_PK_SPEECH}
-            and existing_stage == room.stage
-            and getattr(room, 'current_speaker', None) != user.nick
-        )
-        if done or (existing_stage is not None and existing_stage != room.stage) or stale_speaker:
-            _cancel_countdown(user, suppress_timeout=True)
 
-    if user.skill.get('countdown_task'):
+def _apply_countdown_timeout(user: User, room: Room):
+    stage = room.stage
+    if stage not in NO_WAIT_ENFORCEMENT_STAGES and not room.waiting:
         return
 
-    should_start = False
-    secs = None
+    try:
+        if stage == GameStage.SHERIFF:
+            phase = room.sheriff_state.get('phase')
+            if phase == 'signup' and not user.skill.get('sheriff_voted'):
+                room.record_sheriff_choice(user, '不上警')
+            elif phase in ('vote', 'pk_vote') and user.skill.get('sheriff_vote_pending'):
+                room.force_sheriff_abstain(user, reason='timeout')
+            elif phase == 'deferred_withdraw':
+                room.complete_deferred_withdraw()
+            elif (room.day_state.get('phase') == 'await_sheriff_order' and
+                  user.nick == room.skill.get('sheriff_captain')):
+                room.force_sheriff_order_random()
+
+        elif stage == GameStage.LAST_WORDS:
+            ds = room.day_state
+            if ds.get('current_last_word') == user.nick:
+                if not user.skill.get('last_words_skill_resolved'):
+                    room.handle_last_word_skill_choice(user, '放弃')
+                elif ds.get('last_words_allow_speech', True) and not user.skill.get('last_words_done'):
+                    room.complete_last_word_speech(user)
+
+        elif stage == GameStage.BADGE_TRANSFER:
+            if (user.nick == room.skill.get('sheriff_captain') and
+                    not user.skill.get('badge_action_taken')):
+                room.handle_sheriff_badge_action(user, 'destroy')
+
+        elif stage in (GameStage.EXILE_VOTE, GameStage.EXILE_PK_VOTE):
+            if user.skill.get('exile_vote_pending'):
+                room.record_exile_vote(user, '弃票')
+
+        elif stage == GameStage.SPEECH:
+            if getattr(room, 'current_speaker', None) == user.nick:
+                room.advance_sheriff_speech(user.nick)
+
+        elif stage in (GameStage.EXILE_SPEECH, GameStage.EXILE_PK_SPEECH):
+            if getattr(room, 'current_speaker', None) == user.nick:
+                room.advance_exile_speech()
+
+        else:
+            pending_keys = ['wolf_choice', 'pending_charm', 'pending_protect',
+                            'pending_dream_target', 'pending_target',
+                            'pending_half_blood_target', 'pending_fear',
+                            'pending_learn', 'pending_act_target', 'mw_first_knife']
+            has_pending = any(user.skill.get(k) for k in pending_keys)
+            if (user.role_instance and user.role_instance.needs_global_confirm and
+                    hasattr(user.role_instance, 'confirm')):
+                if has_pending:
+                    user.role_instance.confirm()
+                else:
+                    user.skip(reason='timeout')
+            else:
+                user.skip(reason='timeout')
+    except Exception as e:
+        logger.warning(f'countdown timeout handler error: {e}')
+
+
+def _countdown_seconds(user: User, room: Room) -> Optional[int]:
+    """Length of the countdown ``user`` is subject to right now, or None if it does not concern them."""
+    sheriff_state = getattr(room, 'sheriff_state', {}) or {}
+    day_state = getattr(room, 'day_state', {}) or {}
+    pacing = room.pacing
+
+    if room.stage not in NIGHT_STAGES | DAY_TIMER_STAGES:
+        return None
 
     if room.stage == GameStage.SHERIFF:
         phase = sheriff_state.get('phase')
         if phase == 'signup' and not user.skill.get('sheriff_voted'):
-            should_start, secs = True, 10
-        elif phase in ('vote', 'pk_vote') and user.skill.get('sheriff_vote_pending'):
-            should_start, secs = True, 10
-        elif phase == 'deferred_withdraw':
+            return pacing.decision
+        if phase in ('vote', 'pk_vote') and user.skill.get('sheriff_vote_pending'):
+            return pacing.decision
+        if phase == 'deferred_withdraw':
             cands = (room.get_active_sheriff_candidates()
                      if hasattr(room, 'get_active_sheriff_candidates') else [])
             if user.nick in cands and not user.skill.get('sheriff_withdrawn'):
-                should_start, secs = True, 10
+                return pacing.decision
         elif (day_state.get('phase') == 'await_sheriff_order' and
               room.skill.get('sheriff_captain') == user.nick):
-            should_start, secs = True, 10
+            return pacing.decision
 
     elif room.stage == GameStage.LAST_WORDS:
         if day_state.get('current_last_word') == user.nick:
             allow = day_state.get('last_words_allow_speech', True)
             if not user.skill.get('last_words_skill_resolved'):
-                should_start, secs = True, 10
-            elif allow and not user.skill.get('last_words_done'):
-                should_start, secs = True, 120
+                return pacing.decision
+            if allow and not user.skill.get('last_words_done'):
+                return pacing.speech
 
     elif room.stage == GameStage.BADGE_TRANSFER:
         if (room.skill.get('sheriff_captain') == user.nick and
                 not user.skill.get('badge_action_taken')):
-            should_start, secs = True, 10
+            return pacing.decision
 
     elif room.stage in (GameStage.EXILE_VOTE, GameStage.EXILE_PK_VOTE):
         if user.skill.get('exile_vote_pending'):
-            should_start, secs = True, 10
+            return pacing.decision
 
     elif room.stage == GameStage.SPEECH:
         if getattr(room, 'current_speaker', None) == user.nick:
-            should_start, secs = True, 120
+            return pacing.speech
 
     elif room.stage in (GameStage.EXILE_SPEECH, GameStage.EXILE_PK_SPEECH):
         if getattr(room, 'current_speaker', None) == user.nick:
-            should_start = True
-            secs = 150 if (room.stage == GameStage.EXILE_SPEECH and
-                           room.skill.get('sheriff_captain') == user.nick) else 120
+            return pacing.captain_speech if (room.stage == GameStage.EXILE_SPEECH and
+                                             room.skill.get('sheriff_captain') == user.nick) else pacing.speech
 
     elif user.role_instance and user.role_instance.can_act_at_night:
-        should_start, secs = True, 20
+        return pacing.night
 
-    if should_start and secs:
-        if user.skill.get('countdown_skip_timeout') is not True:
-            user.skill['countdown_skip_timeout'] = False
-        task = asyncio.create_task(_countdown(user, secs))
-        user.skill['countdown_task'] = task
-        user.skill['countdown_stage'] = room.stage
+    return None
 
 
 # ── Action dispatch ───────────────────────────────────────────────────────────
 
 async def _dispatch_action(user: User, room: Room, data: dict):
     """Process a player action dict and mutate game state."""
+    if room and room.started:
+        room.timeline.action()
     # Play again: host triggers
     if data.get('play_again') == '再来一局' and room and room.game_over and user is room.get_host():
         if not room.skill.get('play_again_pending'):
@@ -838,39 +1120,96 @@ async def _dispatch_action(user: User, room: Room, data: dict):
 # ── Socket.IO event handlers ──────────────────────────────────────────────────
 
 @sio.on('connect')
+@metrics.timed('on_connect')
 async def on_connect(sid, environ, auth):
     token = (auth or {}).get('token', '')
     nick = _token_to_nick.get(token)
+    adopted = None
+    if cluster.enabled() and not (nick and nick in Global.users):
+        adopted = _adopt_user(token)
+        nick = adopted and adopted.nick
     if nick and nick in Global.users:
         user = Global.users[nick]
         # Unbind old sid if still registered
         if user.sid and user.sid != sid:
             _sid_to_nick.pop(user.sid, None)
         user.sid = sid
+        user.sent_state = None  # 新连接：先发完整快照
         _sid_to_nick[sid] = nick
         logger.info(f'用户 "{nick}" 重连 sid={sid}')
-        await push_state(user)
-        # Restart countdown if needed
-        if user.room:
-            _maybe_start_countdown(user, user.room)
+        if adopted:
+            await sio.emit('login_ok', {'token': token, 'nick': nick}, to=sid)
+            room_id = Global.store.room_of(nick)
+            if room_id and not cluster.is_local(room_id):
+                await _switch_shard(user, room_id)
+                return
+            await sio.emit('lobby', _lobby_payload(), to=sid)
+        await push_state(user, messages=await _catch_up(user, (auth or {}).get('resume')))
     else:
         # New connection – wait for 'login' event
         logger.info(f'新连接 sid={sid}')
 
 
+async def _catch_up(user: User, resume: Optional[dict]) -> list:
+    """The room messages this connection has not seen (sent with its first 'update').
+
+    ``resume`` is ``{'room': id, 'seq': n}`` with the last message seq the tab
+    received in that room; without it (a fresh tab, or another room) the whole
+    transcript is replayed.
+    """
+    room = user.room
+    if not room:
+        return []
+    after = -1
+    if isinstance(resume, dict) and str(resume.get('room')) == str(room.id) and isinstance(resume.get('seq'), int):
+        after = resume['seq']
+    return await room.catch_up(user, after)
+
+
 @sio.on('disconnect')
 async def on_disconnect(sid):
     nick = _sid_to_nick.pop(sid, None)
+    _lobby_sids.discard(sid)
     if nick and nick in Global.users:
         user = Global.users[nick]
         user.sid = None
+        user.sent_state = None
         logger.info(f'用户 "{nick}" 断开连接')
+        if cluster.enabled() and not user.room:
+            # 不在本进程房间内的用户可能已转到其他进程，重连时再从存储中取回
+            Global.users.pop(nick, None)
+            _token_to_nick.pop(user.reconnect_token, None)
+
+
+@sio.on('resync_state')
+async def on_resync_state(sid, data):
+    """客户端补丁版本不连续时请求完整快照。"""
+    user = _user_by_sid(sid)
+    if not user:
+        return
+    user.sent_state = None
+    await push_state(user)
+
+
+@sio.on('get_history')
+async def on_get_history(sid, data):
+    """分页拉取房间内更早的消息（晚加入或重连的玩家按需向前翻页）。"""
+    user = _user_by_sid(sid)
+    if not user or not user.room:
+        return
+    before = data.get('before')
+    limit = min(max(int(data.get('limit') or HISTORY_PAGE), 1), HISTORY_PAGE)
+    msgs, more = await user.room.history(user.nick, before if isinstance(before, int) else None, limit)
+    await sio.emit('history', {'messages': msgs, 'more': more}, to=sid)
 
 
 @sio.on('login')
+@metrics.timed('on_login')
 async def on_login(sid, data):
     nick = (data.get('nick') or '').strip()
     err = User.validate_nick(nick)
+    if not err and cluster.enabled() and Global.store and Global.store.nick_in_use(nick):
+        err = '昵称已被使用'
     if err:
         await sio.emit('login_error', {'message': err}, to=sid)
         return
@@ -878,15 +1217,11 @@ async def on_login(sid, data):
     user = User.alloc(nick, sid, token)
     _token_to_nick[token] = nick
     _sid_to_nick[sid] = nick
+    if Global.store:
+        Global.store.save_token(token, nick)
     await sio.emit('login_ok', {'token': token, 'nick': nick}, to=sid)
-    await sio.emit('lobby', {
-        'rooms': build_room_info_lines(),
-        'creation_sections': ROOM_CREATION_SECTIONS,
-        'game_resource_links': GAME_RESOURCE_LINKS,
-        'guide_links': GUIDE_LINKS,
-        'dev_links': DEV_LINKS,
-        'feedback_link': FEEDBACK_LINK,
-    }, to=sid)
+    await sio.emit('lobby', _lobby_payload(), to=sid)
+    await _sync_lobby_membership(user)
 
 
 @sio.on('get_lobby')
@@ -894,17 +1229,11 @@ async def on_get_lobby(sid, data):
     user = _user_by_sid(sid)
     if not user:
         return
-    await sio.emit('lobby', {
-        'rooms': build_room_info_lines(),
-        'creation_sections': ROOM_CREATION_SECTIONS,
-        'game_resource_links': GAME_RESOURCE_LINKS,
-        'guide_links': GUIDE_LINKS,
-        'dev_links': DEV_LINKS,
-        'feedback_link': FEEDBACK_LINK,
-    }, to=sid)
+    await sio.emit('lobby', _lobby_payload(), to=sid)
 
 
 @sio.on('create_room')
+@metrics.timed('on_create_room')
 async def on_create_room(sid, data):
     user = _user_by_sid(sid)
     if not user or user.room:
@@ -921,23 +1250,36 @@ async def on_create_room(sid, data):
         await sio.emit('error', {'message': '角色配置为空'}, to=sid)
         return
 
-    room = Room.alloc(config)
+    try:
+        room = Room.alloc(config)
+    except ValueError as e:  # 达到 Config.MAX_ROOMS，或节奏设置无效
+        await sio.emit('error', {'message': str(e)}, to=sid)
+        return
+    room.preset = preset
     room.add_player(user)
     user.send_msg(f'房间配置：{_room_config_text(room)}')
-    await push_state(user)
+    await push_room_state_all(room)
     await broadcast_lobby()
 
 
 @sio.on('join_room')
+@metrics.timed('on_join_room')
 async def on_join_room(sid, data):
     user = _user_by_sid(sid)
     if not user or user.room:
         return
     room_id = str(data.get('room_id', '')).strip()
+    if cluster.enabled() and room_id.isdigit() and not cluster.is_local(room_id):
+        await _switch_shard(user, room_id)
+        return
     room = Room.get(room_id)
     if not room:
         await sio.emit('error', {'message': '房间不存在或已关闭'}, to=sid)
         return
+    err = Room.validate_room_join(room_id)
+    if err:
+        await sio.emit('error', {'message': err}, to=sid)
+        return
     try:
         room.add_player(user)
     except (ValueError, AssertionError) as e:
@@ -953,7 +1295,12 @@ async def on_select_seat(sid, data):
     user = _user_by_sid(sid)
     if not user or not user.room:
         return
-    room = user.room
+    await user.room.actor.submit(_select_seat, sid, user, user.room, data)
+
+
+async def _select_seat(sid, user: User, room: Room, data: dict):
+    if user.room is not room:
+        return
     if room.started:
         await sio.emit('error', {'message': '游戏已开始，座位不可更换'}, to=sid)
         return
@@ -979,16 +1326,24 @@ async def on_select_seat(sid, data):
 async def on_configure_room(sid, data):
     """Host updates room config before game start."""
     user = _user_by_sid(sid)
-    if not user or not user.room or user is not user.room.get_host():
+    if not user or not user.room:
         return
-    room = user.room
-    if room.started:
+    await user.room.actor.submit(_configure_room, sid, user, user.room, data)
+
+
+async def _configure_room(sid, user: User, room: Room, data: dict):
+    if user is not room.get_host() or room.started:
         return
     config = data.get('config', {})
     roles = build_roles_from_config(config)
     if not roles:
         await sio.emit('error', {'message': '角色配置为空'}, to=sid)
         return
+    try:
+        pacing = Pacing.from_config(config)
+    except ValueError as e:
+        await sio.emit('error', {'message': str(e)}, to=sid)
+        return
     room.roles = list(roles)
     room.roles_pool = list(roles)
     room.witch_rule = WitchRule.from_option(
@@ -997,6 +1352,8 @@ async def on_configure_room(sid, data):
         config.get('guard_rule', DEFAULT_ROOM_RULES['guard_rule']))
     room.sheriff_bomb_rule = SheriffBombRule.from_option(
         config.get('sheriff_bomb_rule', DEFAULT_ROOM_RULES['sheriff_bomb_rule']))
+    room.pacing = pacing
+    room.concurrent_night = bool(config.get('concurrent_night', False))
     if Role.MECHANICAL_WOLF in room.roles:
         room.mw_shield_blocks_hunter = bool(config.get('mw_shield_blocks_hunter', False))
         room.mw_double_knife_breaks_shield = bool(config.get('mw_double_knife_breaks_shield', False))
@@ -1009,6 +1366,7 @@ async def on_configure_room(sid, data):
 
 
 @sio.on('player_action')
+@metrics.timed('on_player_action')
 async def on_player_action(sid, data):
     user = _user_by_sid(sid)
     if not user:
@@ -1030,16 +1388,16 @@ async def on_player_action(sid, data):
             await push_state(user)
         return
 
-    await _dispatch_action(user, room if room else None, data)
-
-    # Start per-user countdown if appropriate
-    if room and room.stage and not room.game_over:
-        _maybe_start_countdown(user, room)
-
-    if room:
-        await push_room_state_all(room)
-    else:
+    if not room:
+        await _dispatch_action(user, None, data)
         await push_state(user)
+        return
+    try:
+        await room.actor.submit(_dispatch_action, user, room, data)
+    finally:
+        # Only the last command of a batch pushes; the state it sends covers the whole batch
+        if not room.actor.pending:
+            await push_room_state_all(room)
 
 
 @sio.on('leave_room')
@@ -1048,15 +1406,21 @@ async def on_leave_room(sid, data):
     if not user or not user.room:
         return
     room = user.room
+    await room.actor.submit(_leave_room, user, room)
+    await push_state(user)
+    if room.players:
+        await push_room_state_all(room)
+    await broadcast_lobby()
+
+
+def _leave_room(user: User, room: Room):
+    if user.room is not room:
+        return
     _cancel_countdown(user, suppress_timeout=True)
     try:
         room.remove_player(user)
     except Exception:
         pass
-    await push_state(user)
-    if room.players:
-        await push_room_state_all(room)
-    await broadcast_lobby()
 
 
 @sio.on('logout')
@@ -1066,14 +1430,41 @@ async def on_logout(sid, data):
         return
     _cancel_countdown(user, suppress_timeout=True)
     _token_to_nick.pop(user.reconnect_token, None)
+    if Global.store:
+        Global.store.drop_token(user.reconnect_token)
     _sid_to_nick.pop(sid, None)
     User.free(user)
 
 
 # ── Entry point ───────────────────────────────────────────────────────────────
 
+def _run_workers(count: int, base_port: int):
+    """Start ``count`` worker processes on consecutive ports; rooms are sharded over them by id."""
+    if not Config.STATE_DB:
+        raise SystemExit('多进程模式需要共享存储（MV_STATE_DB）')
+    GameStore(Config.STATE_DB).close()  # 先建表，避免各进程同时建表
+    procs = []
+    for index in range(count):
+        env = dict(os.environ, MV_SHARDS=str(count), MV_SHARD_INDEX=str(index),
+                   MV_SHARD_BASE_PORT=str(base_port), PORT=str(base_port + index), WORKERS='1',
+                   DISABLE_NGROK='1')  # 公网地址通过 MV_SHARD_URLS 配置
+        procs.append(subprocess.Popen([sys.executable, __file__], env=env))
+    try:
+        for proc in procs:
+            proc.wait()
+    except KeyboardInterrupt:
+        for proc in procs:
+            proc.terminate()
+
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', '8080'))
+    workers = int(os.environ.get('WORKERS', '1'))
+    if '--workers' in sys.argv:
+        workers = int(sys.argv[sys.argv.index('--workers') + 1])
+    if workers > 1:
+        _run_workers(workers, port)
+        sys.exit(0)
     ip = get_interface_ip()
 
     # Optional ngrok
@@ -6,13 +6,38 @@ let myNick = '';
 let inRoom = false;
 let lobbyData = null;         // last lobby payload
 let lastCountdownKey = null;  // prevent restarting the same countdown
+let serverClockOffset = 0;    // server clock minus local clock, in ms
 let countdownTimer = null;
 let currentRoomConfig = '';   // latest room config text for '查看配置'
 let _reconfigureMode = false; // true when custom modal is in reconfigure-room mode
+let currentState = null;      // last full state, kept up to date by 'update' patches
+let stateVersion = 0;         // version of currentState, used to detect missed patches
+let resyncPending = false;    // a full snapshot has been requested and not yet received
+let oldestSeq = null;         // seq of the oldest room message shown; older pages come from 'get_history'
+let historyMore = true;       // the server may still have older messages
+let lastSeq = null;           // seq of the newest room message received, sent back on reconnect
 
 // ── Socket.IO ────────────────────────────────────────────────────────────────
-const token = localStorage.getItem('mv_token') || '';
-const socket = io({ auth: { token }, reconnection: true, reconnectionDelay: 1000 });
+// Multi-worker mode: 'switch_shard' hands the token (and the room to join) to another
+// worker via the URL, since localStorage is not shared across ports.
+const urlParams = new URLSearchParams(location.search);
+if (urlParams.get('token')) {
+  localStorage.setItem('mv_token', urlParams.get('token'));
+}
+let pendingJoin = urlParams.get('join') || null;
+if (location.search) {
+  history.replaceState(null, '', location.pathname);
+}
+// auth is re-evaluated on every (re)connect: the server then sends exactly the messages after lastSeq
+const socket = io({
+  auth: (cb) => cb({
+    token: localStorage.getItem('mv_token') || '',
+    resume: (currentState && currentState.in_room && lastSeq !== null)
+      ? { room: currentState.room_id, seq: lastSeq } : null,
+  }),
+  reconnection: true,
+  reconnectionDelay: 1000,
+});
 
 socket.on('connect', () => {
   console.log('connected', socket.id);
@@ -33,6 +58,17 @@ socket.on('login_ok', (data) => {
   localStorage.setItem('mv_token', data.token);
   showScreen('lobby-screen');
   setStatus(`你好，${myNick}`);
+  if (pendingJoin) {
+    socket.emit('join_room', { room_id: pendingJoin });
+    pendingJoin = null;
+  }
+});
+
+socket.on('switch_shard', (data) => {
+  const base = data.url || `${location.protocol}//${location.hostname}:${data.port}`;
+  const query = new URLSearchParams({ token: data.token, join: data.room_id });
+  setStatus('正在前往房间所在服务器…');
+  location.href = `${base}/?${query}`;
 });
 
 socket.on('login_error', (data) => {
@@ -119,7 +155,41 @@ function makeLinkSection(title, links) {
 }
 
 // ── Game state ────────────────────────────────────────────────────────────────
-socket.on('state', (state) => {
+// One 'update' frame per push: new messages first, then the state snapshot or patch
+socket.on('update', (frame) => {
+  if (frame.messages) frame.messages.forEach(appendMessage);
+  syncServerClock(frame.server_time);
+  if (frame.state) {
+    currentState = frame.state;
+    stateVersion = frame.state.version;
+    resyncPending = false;
+    applyState(currentState);
+  } else if (frame.patch) {
+    applyPatch(frame.patch);
+  }
+});
+
+function applyPatch(patch) {
+  if (!currentState || patch.base !== stateVersion) {
+    // Missed a patch (or never got a snapshot): ask for a full one
+    if (!resyncPending) {
+      resyncPending = true;
+      socket.emit('resync_state', {});
+    }
+    return;
+  }
+  const next = Object.assign({}, currentState);
+  patch.ops.forEach(op => {
+    const key = op.path.slice(1);
+    if (op.op === 'remove') delete next[key];
+    else next[key] = op.value;
+  });
+  currentState = next;
+  stateVersion = patch.version;
+  applyState(next);
+}
+
+function applyState(state) {
   if (state.in_room) {
     if (!inRoom) {
       inRoom = true;
@@ -130,27 +200,27 @@ socket.on('state', (state) => {
   } else {
     if (inRoom) {
       inRoom = false;
+      // The next room starts a fresh transcript (its messages may arrive in the same frame that enters it)
+      lastSeq = null;
+      oldestSeq = null;
+      historyMore = true;
       stopCountdown();
       showScreen('lobby-screen');
     }
     refreshLobby();
   }
-});
-
-socket.on('messages', (msgs) => {
-  msgs.forEach(appendMessage);
-});
-
-socket.on('countdown_tick', (data) => {
-  // Only use server tick for display if the client-side countdown hasn't started yet
-  if (!countdownTimer) {
-    updateCountdownDisplay(data.seconds);
-  }
-});
+}
 
-socket.on('countdown_clear', () => {
-  stopCountdown();
-  document.getElementById('countdown-bar').textContent = '—';
+socket.on('history', (page) => {
+  const box = document.getElementById('msg-box');
+  const first = box.firstChild;
+  page.messages.forEach(msg => {
+    const div = renderMessage(msg, false);
+    if (div) box.insertBefore(div, first);
+  });
+  if (page.messages.length) oldestSeq = page.messages[0].seq;
+  historyMore = page.more;
+  updateHistoryButton();
 });
 
 socket.on('error', (data) => {
@@ -186,15 +256,18 @@ function renderRoomState(state) {
   renderSeatPanel(state);
   renderActions(state.actions || []);
 
-  // Countdown from state
-  if (state.countdown && state.countdown.key && state.countdown.key !== lastCountdownKey) {
-    lastCountdownKey = state.countdown.key;
-    startClientCountdown(state.countdown.seconds, state.countdown.label);
-  } else if (!state.countdown) {
+  // Countdown from state: the server sends an absolute deadline, ticks are rendered locally
+  const cd = state.countdown;
+  const cdKey = cd && cd.key ? `${cd.key}@${cd.expires_at}` : null;
+  if (cdKey && cdKey !== lastCountdownKey) {
+    lastCountdownKey = cdKey;
+    startClientCountdown(cd.expires_at, cd.label);
+  } else if (!cd) {
     // No countdown active
     if (lastCountdownKey) {
       lastCountdownKey = null;
       stopCountdown();
+      document.getElementById('countdown-bar').textContent = '—';
     }
   }
 }
@@ -277,6 +350,21 @@ function renderActions(actions) {
 function appendMessage(msg) {
   const box = document.getElementById('msg-box');
   if (!box) return;
+  if (msg.seq !== undefined) {
+    if (lastSeq !== null && msg.seq <= lastSeq) return; // already shown before a reconnect
+    lastSeq = msg.seq;
+    if (oldestSeq === null) {
+      oldestSeq = msg.seq;
+      updateHistoryButton();
+    }
+  }
+  const div = renderMessage(msg, true);
+  if (!div) return;
+  box.appendChild(div);
+  box.scrollTop = box.scrollHeight;
+}
+
+function renderMessage(msg, speak) {
   const div = document.createElement('div');
   if (msg.type === 'private') {
     div.className = 'msg-private';
@@ -284,7 +372,7 @@ function appendMessage(msg) {
   } else if (msg.type === 'public') {
     div.className = 'msg-public';
     div.textContent = msg.text;
-    if (msg.tts && 'speechSynthesis' in window) {
+    if (speak && msg.tts && 'speechSynthesis' in window) {
       try {
         const utter = new SpeechSynthesisUtterance(msg.text);
         utter.rate = 1.2;
@@ -292,29 +380,39 @@ function appendMessage(msg) {
         window.speechSynthesis.speak(utter);
       } catch (_) {}
     }
-  } else if (msg.type === 'cancel_input') {
-    return; // no display needed, actions panel already updates
   } else {
-    return;
+    return null; // cancel_input: no display needed, actions panel already updates
   }
-  box.appendChild(div);
-  box.scrollTop = box.scrollHeight;
+  return div;
+}
+
+function updateHistoryButton() {
+  const btn = document.getElementById('history-btn');
+  if (btn) btn.style.display = (historyMore && oldestSeq !== 0) ? '' : 'none';
+}
+
+function loadHistory() {
+  socket.emit('get_history', { before: oldestSeq });
 }
 
 // ── Countdown ─────────────────────────────────────────────────────────────────
-function startClientCountdown(seconds, label) {
+function syncServerClock(serverTime) {
+  if (serverTime) serverClockOffset = serverTime * 1000 - Date.now();
+}
+
+function startClientCountdown(expiresAt, label) {
   stopCountdown();
-  let remaining = seconds;
-  updateCountdownDisplay(remaining, label);
-  countdownTimer = setInterval(() => {
-    remaining -= 1;
+  const tick = () => {
+    const remaining = Math.ceil((expiresAt * 1000 - (Date.now() + serverClockOffset)) / 1000);
     if (remaining <= 0) {
       stopCountdown();
       document.getElementById('countdown-bar').textContent = label ? `${label}：已结束` : '已结束';
     } else {
       updateCountdownDisplay(remaining, label);
     }
-  }, 1000);
+  };
+  countdownTimer = setInterval(tick, 500);
+  tick();
 }
 
 function updateCountdownDisplay(seconds, label) {
@@ -385,6 +483,13 @@ function showReconfigureModal(config) {
   if (config.witch_rule) document.getElementById('c-witch-rule').value = config.witch_rule;
   if (config.guard_rule) document.getElementById('c-guard-rule').value = config.guard_rule;
   if (config.sheriff_bomb_rule) document.getElementById('c-bomb-rule').value = config.sheriff_bomb_rule;
+  document.getElementById('c-concurrent-night').value = config.concurrent_night ? 'true' : 'false';
+  document.getElementById('c-pacing').value = config.pacing || '标准';
+  const pacingCustom = config.pacing_custom || {};
+  Object.entries(PACING_CUSTOM_INPUTS).forEach(([name, id]) => {
+    if (pacingCustom[name]) document.getElementById(id).value = pacingCustom[name];
+  });
+  togglePacingCustom(config.pacing);
   const hasMw = (config.god_wolf || []).includes('机械狼');
   toggleMwRules(hasMw);
   document.getElementById('c-mw-shield-rule').value = config.mw_shield_blocks_hunter ? 'true' : 'false';
@@ -468,6 +573,23 @@ function populateCustomModal(data) {
     });
   }
 
+  // Pacing profiles and their timings come from the server (models/runtime/pacing.py)
+  const pacingSel = document.getElementById('c-pacing');
+  if (!pacingSel.options.length) {
+    (data.pacing_options || []).forEach(opt => {
+      const o = document.createElement('option');
+      o.value = opt.value; o.textContent = opt.label;
+      pacingSel.appendChild(o);
+      if (opt.defaults) {
+        Object.entries(PACING_CUSTOM_INPUTS).forEach(([name, id]) => {
+          const input = document.getElementById(id);
+          input.value = opt.defaults[name];
+          [input.min, input.max] = opt.limits[name];
+        });
+      }
+    });
+  }
+
   // God-role checkboxes (hardcoded common roles)
   const godWolfDiv = document.getElementById('c-god-wolf-opts');
   if (!godWolfDiv.children.length) {
@@ -490,6 +612,17 @@ function toggleMwRules(checked) {
   document.getElementById('c-mw-rules').style.display = checked ? 'block' : 'none';
 }
 
+const PACING_CUSTOM_INPUTS = {
+  night:          'c-pacing-night',
+  decision:       'c-pacing-decision',
+  speech:         'c-pacing-speech',
+  captain_speech: 'c-pacing-captain-speech',
+};
+
+function togglePacingCustom(value) {
+  document.getElementById('c-pacing-custom').style.display = value === '自定义' ? 'block' : 'none';
+}
+
 function submitCustomRoom() {
   const config = {
     wolf_num:      parseInt(document.getElementById('c-wolf').value) || 0,
@@ -501,7 +634,17 @@ function submitCustomRoom() {
     sheriff_bomb_rule: document.getElementById('c-bomb-rule').value,
     mw_shield_blocks_hunter:      document.getElementById('c-mw-shield-rule').value === 'true',
     mw_double_knife_breaks_shield: document.getElementById('c-mw-double-knife-rule').value === 'true',
+    concurrent_night: document.getElementById('c-concurrent-night').value === 'true',
+    pacing:        document.getElementById('c-pacing').value,
   };
+  if (config.pacing === '自定义') {
+    // Empty fields are left out: the server falls back to the standard timings
+    config.pacing_custom = {};
+    Object.entries(PACING_CUSTOM_INPUTS).forEach(([name, id]) => {
+      const value = parseInt(document.getElementById(id).value);
+      if (!Number.isNaN(value)) config.pacing_custom[name] = value;
+    });
+  }
   const isReconfigure = _reconfigureMode;
   hideCustomModal();
   if (isReconfigure) {
@@ -579,4 +722,4 @@ function showToast(msg, duration) {
 
 // ── Auto-reconnect: if we had a token, reconnection is handled in 'connect' handler.
 // If the page was refreshed while already in a room, the server will push state and
-// we'll navigate to the room screen automatically via the 'state' event.
+// we'll navigate to the room screen automatically via the 'update' event.
@@ -0,0 +1,130 @@
+"""
+Pacing report – aggregates per-game timelines (MV_TIMELINE_LOG JSONL) per preset and pacing profile.
+
+Every finished game appends one record to the file named by MV_TIMELINE_LOG
+(see models/runtime/timeline.py): per-stage segments with the time spent in
+scripted pauses, fixed-length padding, waiting on players and everything else,
+plus action and timeout counts.  This report answers "where does a game's
+wall-clock time go" per preset: the share of each activity, games per hour,
+and per stage the average time per game, time to the first / last action and
+the timeout rate.
+
+Usage (from project root):
+    MV_TIMELINE_LOG=timeline.jsonl python server.py          # record real games
+    python -m tests.simulate_balance --games 50 --timeline timeline.jsonl   # or bot games
+    python -m tests.report_timeline timeline.jsonl
+    python -m tests.report_timeline timeline.jsonl --preset preset_standard_12 --json pacing.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.runtime.timeline import ACTIVITIES
+
+
+def load(paths: List[str]) -> List[dict]:
+    records = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def group_key(record: dict) -> str:
+    """Games are compared per preset and pacing profile."""
+    pacing = record.get('pacing')
+    return f"{record['preset']} [{pacing}]" if pacing else record['preset']
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return round(sum(values) / len(values), 1) if values else None
+
+
+def summarize(records: List[dict]) -> dict:
+    """Pacing summary of one preset's games."""
+    games = len(records)
+    duration = sum(r['duration'] for r in records)
+    totals = {kind: sum(r['totals'][kind] for r in records) for kind in ACTIVITIES}
+    stages: Dict[str, dict] = defaultdict(lambda: {'seconds': 0.0, 'count': 0, 'timeouts': 0, 'actions': 0,
+                                                   **{kind: 0.0 for kind in ACTIVITIES},
+                                                   'first_action': [], 'last_action': []})
+    for record in records:
+        for segment in record['segments']:
+            stage = stages[segment['stage']]
+            stage['seconds'] += segment['duration']
+            stage['count'] += 1
+            stage['timeouts'] += segment['timeouts']
+            stage['actions'] += segment['actions']
+            for kind in ACTIVITIES:
+                stage[kind] += segment[kind]
+            if segment['first_action'] is not None:
+                stage['first_action'].append(segment['first_action'])
+                stage['last_action'].append(segment['last_action'])
+    return {
+        'games': games,
+        'avg_minutes': round(duration / games / 60, 2) if games else None,
+        'games_per_hour': round(3600 * games / duration, 2) if duration else None,
+        'avg_rounds': _mean([r['rounds'] for r in records]),
+        'share': {kind: round(100 * totals[kind] / duration, 1) if duration else 0 for kind in ACTIVITIES},
+        'timeouts_per_game': round(sum(r['timeouts'] for r in records) / games, 2) if games else None,
+        'actions_per_game': round(sum(r['actions'] for r in records) / games, 1) if games else None,
+        'stages': {
+            name: {
+                'seconds_per_game': round(stage['seconds'] / games, 1),
+                'seconds_per_visit': round(stage['seconds'] / stage['count'], 1),
+                **{f'{kind}_per_game': round(stage[kind] / games, 1) for kind in ACTIVITIES},
+                'first_action': _mean(stage['first_action']),
+                'last_action': _mean(stage['last_action']),
+                'timeouts_per_visit': round(stage['timeouts'] / stage['count'], 2),
+            }
+            for name, stage in sorted(stages.items(), key=lambda item: -item[1]['seconds'])
+        },
+    }
+
+
+def print_summary(preset: str, summary: dict) -> None:
+    print(f"\n=== {preset}: {summary['games']} games, {summary['avg_minutes']} min avg, "
+          f"{summary['games_per_hour']} games/h, {summary['avg_rounds']} rounds avg ===")
+    share = summary['share']
+    print('time share: ' + '  '.join(f'{kind} {share[kind]}%' for kind in ACTIVITIES))
+    print(f"per game: {summary['actions_per_game']} actions, {summary['timeouts_per_game']} timeouts")
+    print(f"{'stage':<16}{'s/game':>8}{'s/visit':>9}{'scripted':>10}{'padding':>9}{'players':>9}"
+          f"{'first':>7}{'last':>7}{'timeouts':>10}")
+    for name, stage in summary['stages'].items():
+        print(f"{name:<16}{stage['seconds_per_game']:>8}{stage['seconds_per_visit']:>9}"
+              f"{stage['scripted_per_game']:>10}{stage['padding_per_game']:>9}{stage['players_per_game']:>9}"
+              f"{str(stage['first_action']):>7}{str(stage['last_action']):>7}{stage['timeouts_per_visit']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Aggregate MV_TIMELINE_LOG game timelines per preset',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument('paths', nargs='+', help='timeline JSONL files')
+    parser.add_argument('--preset', action='append', help='only these presets')
+    parser.add_argument('--json', help='write the summaries to this file')
+    args = parser.parse_args()
+
+    by_preset: Dict[str, List[dict]] = defaultdict(list)
+    for record in load(args.paths):
+        if not args.preset or record['preset'] in args.preset:
+            by_preset[group_key(record)].append(record)
+    summaries = {preset: summarize(records) for preset, records in sorted(by_preset.items())}
+    for preset, summary in summaries.items():
+        print_summary(preset, summary)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summaries, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
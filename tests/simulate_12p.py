@@ -9,6 +9,9 @@ Usage (run from project root):
     python -m tests.simulate_12p --preset preset_dev_3 --auto    # auto-play to GAME OVER
     python -m tests.simulate_12p --preset preset_standard_12 --auto
 
+With --auto the game runs on a virtual clock (models/runtime/clock.py): every
+pause and timer keeps its in-game length but costs no wall time.
+
 Available presets:
     preset_dev_3  preset_dev_6  preset_dev_7
     preset_standard_12  preset_half_blood_mix  preset_white_wolf_guard
@@ -25,23 +28,7 @@ import os
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, ROOT)
 
-# ── Patches applied before importing game modules ────────────────────────────
-import utils as _utils_mod
-_original_async_sleep = _utils_mod.async_sleep
-
-async def _fast_sleep(seconds: float):
-    await asyncio.sleep(min(seconds, 0.01))
-
-# ── Game model imports ────────────────────────────────────────────────────────
-from presets.base import DefaultGameFlow as _DGF
-_original_wait_for_player = _DGF.wait_for_player
-
-async def _fast_wait_for_player(self, *, min_duration=None, auto_release=False, silent_timeout=False):
-    """In test mode, skip the min-duration guard so actions resolve instantly."""
-    return await _original_wait_for_player(
-        self, min_duration=0, auto_release=auto_release, silent_timeout=silent_timeout
-    )
-
+from models.runtime import clock
 from models.system import Global
 from models.user import User
 from models.room import Room
@@ -49,22 +36,8 @@ from models.lobby import resolve_room_config, build_roles_from_config, ROOM_PRES
 from enums import PlayerStatus, GameStage, Role
 from presets.base import WOLF_TEAM_ROLES, WOLF_CAMP_ROLES
 
-# Collect all modules that bind async_sleep locally (via `from utils import async_sleep`).
-# Patching _utils_mod.async_sleep alone doesn't reach these because each module already
-# holds its own reference to the original function in its globals.
-import presets.base as _presets_base_mod
-import models.room as _models_room_mod
-import models.runtime.tools as _models_runtime_tools_mod
-import models.runtime.sheriff as _models_runtime_sheriff_mod
-
-_ASYNC_SLEEP_MODULES = [
-    _utils_mod,
-    _presets_base_mod,
-    _models_room_mod,
-    _models_runtime_tools_mod,
-    _models_runtime_sheriff_mod,
-]
-
+WATCH_INTERVAL = 1.0        # in-game seconds between idle watcher checks
+GAME_TIME_LIMIT = 6 * 3600  # in-game seconds before giving up on a stuck game
 
 # ── Setup helpers ─────────────────────────────────────────────────────────────
 
@@ -494,8 +467,11 @@ class AutoWatcher:
     # ── Main loop ─────────────────────────────────────────────────────────────
 
     async def run(self):
+        seen = -1
         while not self.room.game_over:
-            await asyncio.sleep(0.02)
+            # React to each state change, and re-check once per in-game second otherwise
+            await self.room.wait_until(lambda: self.room.state_version != seen, WATCH_INTERVAL)
+            seen = self.room.state_version
 
             if self.room.waiting:
                 self._handle_waiting()
@@ -521,11 +497,6 @@ async def run(preset: str, num_players: int, auto: bool):
         print(f'Preset needs {needed} players – adjusting from {num_players}.')
         num_players = needed
 
-    if auto:
-        for _m in _ASYNC_SLEEP_MODULES:
-            _m.async_sleep = _fast_sleep
-        _DGF.wait_for_player = _fast_wait_for_player
-
     users = make_users(num_players)
     room = setup_room(preset, users)
     print(f'Room {room.id}: {len(room.players)} players / {len(room.roles)} roles.')
@@ -546,12 +517,12 @@ async def run(preset: str, num_players: int, auto: bool):
         print('Rerun with --auto to drive the game end-to-end.')
         return
 
-    # Wait up to 60 seconds for GAME OVER
-    elapsed = 0.0
-    while not room.game_over and elapsed < 60:
-        await asyncio.sleep(0.1)
-        elapsed += 0.1
+    # Wait up to GAME_TIME_LIMIT in-game seconds for GAME OVER
+    started = clock.now()
+    while not room.game_over and clock.now() - started < GAME_TIME_LIMIT:
+        await room.wait_until(lambda: room.game_over, 10)
         cursor = print_log(room, cursor)
+    elapsed = clock.now() - started
 
     if watcher_task:
         watcher_task.cancel()
@@ -565,9 +536,6 @@ async def run(preset: str, num_players: int, auto: bool):
               f'sheriff={room.sheriff_state.get("phase") if room.sheriff_state else "-"}, '
               f'day={room.day_state.get("phase") if room.day_state else "-"}) ===')
 
-    for _m in _ASYNC_SLEEP_MODULES:
-        _m.async_sleep = _original_async_sleep
-    _DGF.wait_for_player = _original_wait_for_player
 
 
 def main():
@@ -581,7 +549,10 @@ def main():
     parser.add_argument('--auto', action='store_true',
                         help='Auto-play all actions to GAME OVER')
     args = parser.parse_args()
-    asyncio.run(run(args.preset, args.players, args.auto))
+    if args.auto:
+        clock.run_virtual(run(args.preset, args.players, args.auto))
+    else:
+        asyncio.run(run(args.preset, args.players, args.auto))
 
 
 if __name__ == '__main__':
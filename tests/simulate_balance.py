@@ -0,0 +1,295 @@
+"""
+Monte-Carlo balance simulation – plays many bot games per preset across a process pool.
+
+Every game is driven by a NetworkWatcher from simulate_server.py (all actions go
+through server._dispatch_action) on the virtual clock, so a 12-player game costs
+about 0.1 s of CPU.  Each game is seeded from (--seed, preset, game index), so a
+run is reproducible whatever the number of workers.
+
+Per-game rows are streamed to --csv as games finish; the per-preset summary
+(camp win rates, average rounds, sheriff outcomes, per-role survival) is
+printed and written to --json.
+
+Usage (from project root):
+    python -m tests.simulate_balance --games 200
+    python -m tests.simulate_balance --preset preset_standard_12 --preset preset_nightmare --games 500 --workers 8
+    python -m tests.simulate_balance --policy wolf_team --csv games.csv --json summary.json
+    python -m tests.simulate_balance --policy mypkg.bots:CleverWatcher   # any NetworkWatcher subclass
+    python -m tests.simulate_balance --games 50 --timeline timeline.jsonl  # then: python -m tests.report_timeline timeline.jsonl
+    python -m tests.simulate_balance --games 50 --pacing 快速 --timeline timeline.jsonl   # 对局节奏：标准 / 快速 / 比赛
+    python -m tests.simulate_balance --games 50 --concurrent-night --timeline timeline.jsonl  # 并行夜间模式
+
+Policies:
+    random     – NetworkWatcher as is: every choice is random
+    wolf_team  – wolves never vote for a teammate in sheriff / exile votes
+"""
+
+import argparse
+import asyncio
+import csv
+import importlib
+import json
+import logging
+import os
+import random
+import sys
+import zlib
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tests.simulate_server import NetworkWatcher, make_users, setup_room
+from models.runtime import clock
+from models.system import Config
+from models.user import User
+from models.lobby import resolve_room_config, build_roles_from_config
+from enums import PlayerStatus
+from presets.base import WOLF_CAMP_ROLES, THIRD_PARTY_ROLES
+from presets.game_config_registry import describe_registered_presets
+
+CAMPS = ('good', 'wolf', 'third')
+WIN_REASONS = {'好人阵营获胜': 'good', '狼人阵营获胜': 'wolf', '第三方阵营获胜': 'third'}
+STALL_LIMIT = 600  # in-game seconds without any room state change before a game counts as stuck
+CSV_FIELDS = ('preset', 'seed', 'winner', 'rounds', 'sheriff_camp', 'badge_destroyed', 'alive_roles', 'dead_roles')
+
+
+# ── Policies ─────────────────────────────────────────────────────────────────
+
+class BalanceWatcher(NetworkWatcher):
+    """NetworkWatcher that also notes the first elected sheriff."""
+
+    def __init__(self, room):
+        super().__init__(room)
+        self.first_sheriff = None
+
+    async def _handle_sheriff(self):
+        if self.first_sheriff is None:
+            self.first_sheriff = self.room.skill.get('sheriff_captain')
+        await super()._handle_sheriff()
+
+
+class WolfTeamWatcher(BalanceWatcher):
+    """Wolves never vote for a teammate."""
+
+    def _pick_vote(self, user: User, options: list, kind: str) -> str:
+        if user.role in WOLF_CAMP_ROLES:
+            others = [o for o in options
+                      if getattr(self.room.players.get(o.split('. ', 1)[-1]), 'role', None) not in WOLF_CAMP_ROLES]
+            if others:
+                return random.choice(others)
+        return super()._pick_vote(user, options, kind)
+
+
+POLICIES = {
+    'random': BalanceWatcher,
+    'wolf_team': WolfTeamWatcher,
+}
+
+
+def load_policy(name: str) -> type:
+    """A name from POLICIES, or 'module:Class' naming a NetworkWatcher subclass."""
+    if name in POLICIES:
+        return POLICIES[name]
+    module, _, attr = name.partition(':')
+    policy = getattr(importlib.import_module(module), attr)
+    if not issubclass(policy, NetworkWatcher):
+        raise TypeError(f'{name} is not a NetworkWatcher subclass')
+    if not issubclass(policy, BalanceWatcher):
+        policy = type(policy.__name__, (BalanceWatcher, policy), {})
+    return policy
+
+
+# ── One game ─────────────────────────────────────────────────────────────────
+
+def _camp(user: User) -> str:
+    if user.role in WOLF_CAMP_ROLES or user.skill.get('half_blood_camp') == 'wolf':
+        return 'wolf'
+    if user.role in THIRD_PARTY_ROLES:
+        return 'third'
+    return 'good'
+
+
+async def _wait_game_over(room) -> bool:
+    while not room.game_over:
+        version = room.state_version
+        if not await room.wait_until(lambda: room.game_over or room.state_version != version, STALL_LIMIT):
+            return False
+    return True
+
+
+async def _play(preset: str, policy: type, pacing: str = None, concurrent_night: bool = False) -> dict:
+    users = make_users(len(build_roles_from_config(resolve_room_config(preset))))
+    room = setup_room(preset, users, pacing, concurrent_night)
+    watcher = policy(room)
+    watcher_task = asyncio.create_task(watcher.run())
+    await room.start_game()
+    finished = await _wait_game_over(room)
+    watcher_task.cancel()
+
+    # end_game() clears roles after its closing pause; they are still set here
+    winner = None
+    for sender, content in reversed(room.log):
+        text = content.get('text', '') if isinstance(content, dict) else str(content)
+        winner = next((camp for key, camp in WIN_REASONS.items() if key in text), None)
+        if winner:
+            break
+    sheriff = room.players.get(watcher.first_sheriff) if watcher.first_sheriff else None
+    alive, dead = Counter(), Counter()
+    for user in room.players.values():
+        if user.role:
+            (alive if user.status == PlayerStatus.ALIVE else dead)[user.role.value] += 1
+    return {
+        'winner': winner if finished else 'stuck',
+        'rounds': room.round,
+        'sheriff_camp': _camp(sheriff) if sheriff and sheriff.role else None,
+        'badge_destroyed': bool(room.sheriff_badge_destroyed),
+        'alive_roles': dict(alive),
+        'dead_roles': dict(dead),
+    }
+
+
+def game_seed(seed: int, preset: str, index: int) -> int:
+    return zlib.crc32(f'{seed}:{preset}:{index}'.encode())
+
+
+def play_batch(preset: str, seeds: list, policy_name: str, pacing: str = None,
+               concurrent_night: bool = False) -> list:
+    """Worker entry point: play one game per seed and return the result rows."""
+    policy = load_policy(policy_name)
+    rows = []
+    for seed in seeds:
+        random.seed(seed)
+        result = clock.run_virtual(_play(preset, policy, pacing, concurrent_night))
+        rows.append({'preset': preset, 'seed': seed, **result})
+    return rows
+
+
+def _init_worker(timeline_path: str = None):
+    logging.disable(logging.INFO)
+    if timeline_path:
+        Config.TIMELINE_LOG = timeline_path
+
+
+# ── Aggregation ──────────────────────────────────────────────────────────────
+
+class PresetStats:
+    def __init__(self):
+        self.games = 0
+        self.wins = Counter()
+        self.rounds = 0
+        self.sheriff = Counter()
+        self.badge_destroyed = 0
+        self.role_alive = Counter()
+        self.role_total = Counter()
+
+    def add(self, row: dict) -> None:
+        self.games += 1
+        self.wins[row['winner']] += 1
+        self.rounds += row['rounds']
+        self.sheriff[row['sheriff_camp'] or 'none'] += 1
+        self.badge_destroyed += row['badge_destroyed']
+        for role, n in row['alive_roles'].items():
+            self.role_alive[role] += n
+            self.role_total[role] += n
+        for role, n in row['dead_roles'].items():
+            self.role_total[role] += n
+
+    def summary(self) -> dict:
+        games = self.games or 1
+        return {
+            'games': self.games,
+            'win_rate': {camp: self.wins[camp] / games for camp in CAMPS},
+            'stuck': self.wins['stuck'],
+            'avg_rounds': self.rounds / games,
+            'sheriff_camp': {camp: n / games for camp, n in self.sheriff.items()},
+            'badge_destroyed': self.badge_destroyed / games,
+            'role_survival': {role: self.role_alive[role] / total for role, total in self.role_total.items()},
+        }
+
+
+def _csv_row(row: dict) -> dict:
+    out = {field: row[field] for field in CSV_FIELDS}
+    out['alive_roles'] = json.dumps(row['alive_roles'], ensure_ascii=False)
+    out['dead_roles'] = json.dumps(row['dead_roles'], ensure_ascii=False)
+    return out
+
+
+def run(presets: list, games: int, workers: int, policy: str, seed: int,
+        csv_path: str = None, json_path: str = None, batch: int = 10, timeline_path: str = None,
+        pacing: str = None, concurrent_night: bool = False) -> dict:
+    load_policy(policy)  # fail fast on a bad name
+    stats = defaultdict(PresetStats)
+    csv_file = open(csv_path, 'w', newline='', encoding='utf-8') if csv_path else None
+    writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS) if csv_file else None
+    if writer:
+        writer.writeheader()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(timeline_path,)) as pool:
+            futures = []
+            for preset in presets:
+                seeds = [game_seed(seed, preset, i) for i in range(games)]
+                for start in range(0, games, batch):
+                    futures.append(pool.submit(play_batch, preset, seeds[start:start + batch], policy,
+                                               pacing, concurrent_night))
+            done = 0
+            for future in as_completed(futures):
+                for row in future.result():
+                    stats[row['preset']].add(row)
+                    if writer:
+                        writer.writerow(_csv_row(row))
+                    done += 1
+                if csv_file:
+                    csv_file.flush()
+                print(f'\r{done}/{games * len(presets)} games', end='', file=sys.stderr, flush=True)
+            print(file=sys.stderr)
+    finally:
+        if csv_file:
+            csv_file.close()
+
+    summary = {preset: stats[preset].summary() for preset in presets}
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump({'policy': policy, 'seed': seed, 'presets': summary}, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+def print_summary(summary: dict) -> None:
+    for preset, s in summary.items():
+        wins = '  '.join(f'{camp} {rate:6.1%}' for camp, rate in s['win_rate'].items())
+        sheriff = '  '.join(f'{camp} {rate:.0%}' for camp, rate in sorted(s['sheriff_camp'].items()))
+        print(f'\n=== {preset}: {s["games"]} games, avg {s["avg_rounds"]:.2f} rounds, {s["stuck"]} stuck ===')
+        print(f'  win rate : {wins}')
+        print(f'  sheriff  : {sheriff}  (badge destroyed {s["badge_destroyed"]:.0%})')
+        print('  survival : ' + '  '.join(f'{role} {rate:.0%}' for role, rate in sorted(s['role_survival'].items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Estimate per-preset win rates with bot games on a process pool',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument('--preset', action='append',
+                        help='Preset key (repeatable); default: every registered special preset')
+    parser.add_argument('--games', type=int, default=100, help='Games per preset')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--policy', default='random')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--csv', help='Write one row per game')
+    parser.add_argument('--json', help='Write the per-preset summary')
+    parser.add_argument('--pacing', help='Room pacing profile (标准 / 快速 / 比赛); default: the preset\'s')
+    parser.add_argument('--concurrent-night', action='store_true',
+                        help='Concurrent night mode: independent night roles act alongside the wolves')
+    parser.add_argument('--timeline', help='Append every game\'s timeline (JSONL, see tests/report_timeline.py)')
+    args = parser.parse_args()
+    presets = args.preset or [desc['key'] for desc in describe_registered_presets()]
+    summary = run(presets, args.games, args.workers, args.policy, args.seed, args.csv, args.json,
+                  timeline_path=args.timeline, pacing=args.pacing, concurrent_night=args.concurrent_night)
+    print_summary(summary)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,380 @@
+"""
+Socket.IO load test – many synthetic players drive full games against a real server.py.
+
+Unlike the other simulations, this one goes through the socket layer: every bot
+is a python-socketio AsyncClient that logs in, creates or joins a room, picks a
+seat and then plays by clicking the buttons the server sends in its 'update'
+frames ('player_action'), exactly like the browser.  Timers run in real time,
+so a 12-player game takes several minutes; rooms play concurrently.
+
+By default a server.py subprocess is started on --port (persistence off,
+ngrok off) and stopped afterwards; --url targets a server that is already
+running instead (RSS is then not reported).
+
+Reported:
+  • action → update latency p50/p95/p99: from a bot's 'player_action' to the
+    'update' frame the server pushes in response (actions that change nothing
+    for the bot are not counted)
+  • update frames per second received by all bots (mean and peak second)
+  • server event-loop lag: round trip of an acknowledged 'get_lobby' probe every
+    --probe-interval seconds from an idle connection
+  • server RSS before the rooms, at peak, and the difference per room
+
+Requires the asyncio client extra (aiohttp):  pip install "python-socketio[asyncio_client]"
+
+Usage (from project root):
+    python -m tests.simulate_load --rooms 10
+    python -m tests.simulate_load --rooms 40 --preset preset_standard_12 --preset preset_dev_6 --json load.json
+    python -m tests.simulate_load --rooms 5 --url http://127.0.0.1:8080 --think 0.5:2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import Counter
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import socketio
+
+from models.lobby import resolve_room_config, build_roles_from_config
+
+# Buttons bots never click: leaving / reconfiguring the room and the post-game rematch prompts
+SKIPPED_ACTIONS = frozenset({'room_control', 'host_op', 'play_again', 'play_again_response'})
+GAME_TIMEOUT = 3600      # wall seconds before a room's game counts as stuck
+CONNECT_TIMEOUT = 10
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+
+class Metrics:
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.frames: Counter = Counter()  # wall second → update frames received
+        self.lags: List[float] = []
+        self.errors: Counter = Counter()
+
+    def frame(self) -> None:
+        self.frames[int(time.monotonic())] += 1
+
+
+def percentile(samples: List[float], p: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def read_rss(pid: int) -> Optional[int]:
+    """Resident set size of ``pid`` in bytes (Linux /proc), or None."""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+# ── Bot ───────────────────────────────────────────────────────────────────────
+
+class Bot:
+    """One synthetic player: a socket.io connection that clicks random offered buttons."""
+
+    def __init__(self, url: str, nick: str, metrics: Metrics, think: tuple) -> None:
+        self.url = url
+        self.nick = nick
+        self.metrics = metrics
+        self.think = think
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.state: Optional[dict] = None
+        self.version = 0
+        self.answered: set = set()      # (action name, button values) already clicked for the current prompt
+        self.pending: Optional[float] = None
+        self.changed = asyncio.Event()  # set on every state change
+        self.logged_in = asyncio.Event()
+        self.sio.on('update', self._on_update)
+        self.sio.on('login_ok', lambda data: self.logged_in.set())
+        self.sio.on('error', self._on_error)
+
+    async def connect(self) -> None:
+        await self.sio.connect(self.url, auth={'token': ''}, transports=['websocket'],
+                               wait_timeout=CONNECT_TIMEOUT)
+        await self.sio.emit('login', {'nick': self.nick})
+        await asyncio.wait_for(self.logged_in.wait(), CONNECT_TIMEOUT)
+
+    async def close(self) -> None:
+        await self.sio.disconnect()
+
+    def _on_error(self, data) -> None:
+        self.metrics.errors[(data or {}).get('message', '?')] += 1
+
+    def _on_update(self, frame: dict) -> None:
+        self.metrics.frame()
+        if 'state' in frame:
+            self.state, self.version = frame['state'], frame['state']['version']
+        elif 'patch' in frame:
+            patch = frame['patch']
+            if self.state is None or patch['base'] != self.version:
+                asyncio.ensure_future(self.sio.emit('resync_state', {}))
+                return
+            state = dict(self.state)
+            for op in patch['ops']:
+                key = op['path'][1:]
+                if op['op'] == 'remove':
+                    state.pop(key, None)
+                else:
+                    state[key] = op['value']
+            self.state, self.version = state, patch['version']
+        else:
+            return
+        if self.pending is not None:
+            self.metrics.latencies.append(time.monotonic() - self.pending)
+            self.pending = None
+        self.changed.set()
+
+    async def wait_for(self, predicate, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not (self.state and predicate(self.state)):
+            self.changed.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self.changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def emit_action(self, name: str, value) -> None:
+        self.pending = time.monotonic()
+        await self.sio.emit('player_action', {name: value}, callback=self._on_ack)
+
+    def _on_ack(self, *args) -> None:
+        # The server pushes before its handler returns, so an action that changed nothing
+        # for this player is acknowledged with no 'update' in between: not a latency sample
+        self.pending = None
+
+    def _prompts(self) -> Dict[tuple, list]:
+        prompts = {}
+        for action in self.state.get('actions') or []:
+            if action.get('type') != 'actions' or action['name'] in SKIPPED_ACTIONS:
+                continue
+            values = [b['value'] for b in action['buttons'] if not b.get('disabled')]
+            if values:
+                prompts[(action['name'], tuple(values))] = values
+        return prompts
+
+    async def play(self) -> bool:
+        """Answer every new prompt after a think pause until the game ends; False if it stalls."""
+        deadline = time.monotonic() + GAME_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.state.get('game_over'):
+                return True
+            prompts = self._prompts()
+            self.answered &= set(prompts)
+            fresh = [key for key in prompts if key not in self.answered]
+            if not fresh:
+                self.changed.clear()
+                try:
+                    await asyncio.wait_for(self.changed.wait(), 5)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            key = random.choice(fresh)
+            await asyncio.sleep(random.uniform(*self.think))
+            if key in self._prompts():  # still offered after thinking
+                self.answered.add(key)
+                await self.emit_action(key[0], random.choice(prompts[key]))
+        return False
+
+
+# ── One room ──────────────────────────────────────────────────────────────────
+
+async def run_room(index: int, preset: str, args, metrics: Metrics, peak: dict) -> dict:
+    size = len(build_roles_from_config(resolve_room_config(preset)))
+    bots = [Bot(args.url, f'L{index:03d}P{i:02d}', metrics, args.think) for i in range(size)]
+    started = time.monotonic()
+    result = {'room': index, 'preset': preset, 'players': size, 'finished': False}
+    try:
+        await asyncio.gather(*(bot.connect() for bot in bots))
+        host = bots[0]
+        await host.sio.emit('create_room', {'preset': preset})
+        if not await host.wait_for(lambda s: s.get('in_room'), CONNECT_TIMEOUT):
+            raise RuntimeError('create_room got no room')
+        room_id = host.state['room_id']
+        # Join one by one; each joiner moves to the highest free seat (exercises select_seat)
+        for bot in bots[1:]:
+            await bot.sio.emit('join_room', {'room_id': str(room_id)})
+            if not await bot.wait_for(lambda s: s.get('in_room') and s.get('seat'), CONNECT_TIMEOUT):
+                raise RuntimeError('join_room got no seat')
+            free = [s['seat'] for s in bot.state['seat_panel']['seats'] if not s['nick']]
+            if free and max(free) > bot.state['seat']:
+                target = max(free)
+                await bot.sio.emit('select_seat', {'seat': target})
+                await bot.wait_for(lambda s: s.get('seat') == target, CONNECT_TIMEOUT)
+        await host.emit_action('host_op', '开始游戏')
+        if not await host.wait_for(lambda s: s.get('started'), 60):
+            raise RuntimeError('game did not start')
+        peak['rooms'] += 1
+        outcomes = await asyncio.gather(*(bot.play() for bot in bots))
+        result['finished'] = all(outcomes)
+    except Exception as e:
+        result['error'] = repr(e)
+    finally:
+        result['seconds'] = round(time.monotonic() - started, 1)
+        await asyncio.gather(*(bot.close() for bot in bots), return_exceptions=True)
+    return result
+
+
+async def probe_loop(args, metrics: Metrics, peak: dict, stop: asyncio.Event) -> None:
+    """Measure server event-loop lag as the round trip of an acknowledged no-op event; sample RSS."""
+    probe = socketio.AsyncClient(reconnection=False)
+    await probe.connect(args.url, auth={'token': ''}, transports=['websocket'], wait_timeout=CONNECT_TIMEOUT)
+    try:
+        while not stop.is_set():
+            sent = time.monotonic()
+            await probe.call('get_lobby', {}, timeout=30)
+            metrics.lags.append(time.monotonic() - sent)
+            if args.server_pid:
+                peak['rss'] = max(peak['rss'], read_rss(args.server_pid) or 0)
+            try:
+                await asyncio.wait_for(stop.wait(), args.probe_interval)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        await probe.disconnect()
+
+
+async def run(args) -> dict:
+    metrics = Metrics()
+    peak = {'rooms': 0, 'rss': 0}
+    baseline = read_rss(args.server_pid) if args.server_pid else None
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop(args, metrics, peak, stop))
+    started = time.monotonic()
+
+    async def delayed(i: int):
+        await asyncio.sleep(i * args.ramp)
+        return await run_room(i, args.presets[i % len(args.presets)], args, metrics, peak)
+
+    rooms = await asyncio.gather(*(delayed(i) for i in range(args.rooms)))
+    stop.set()
+    await probe
+    elapsed = time.monotonic() - started
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 1)
+
+    per_second = list(metrics.frames.values())
+    return {
+        'rooms': args.rooms,
+        'presets': args.presets,
+        'finished': sum(r['finished'] for r in rooms),
+        'seconds': round(elapsed, 1),
+        'latency_ms': {f'p{p}': ms(percentile(metrics.latencies, p)) for p in (50, 95, 99)},
+        'actions': len(metrics.latencies),
+        'updates_per_second': {'mean': round(sum(per_second) / elapsed, 1) if elapsed else 0,
+                               'peak': max(per_second, default=0)},
+        'loop_lag_ms': {f'p{p}': ms(percentile(metrics.lags, p)) for p in (50, 95, 99)},
+        'rss_mb': None if baseline is None else {
+            'baseline': round(baseline / 2 ** 20, 1),
+            'peak': round(peak['rss'] / 2 ** 20, 1),
+            'per_room': round((peak['rss'] - baseline) / 2 ** 20 / max(peak['rooms'], 1), 2),
+        },
+        'errors': dict(metrics.errors),
+        'room_results': rooms,
+    }
+
+
+# ── Server process ────────────────────────────────────────────────────────────
+
+def start_server(port: int, rooms: int) -> subprocess.Popen:
+    env = dict(os.environ, PORT=str(port), DISABLE_NGROK='1', MV_STATE_DB='',
+               MV_MAX_ROOMS=str(max(rooms, int(os.environ.get('MV_MAX_ROOMS', '500')))))
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, 'server.py')], env=env, cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f'server.py exited with code {proc.returncode}')
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).close()
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit('server.py did not start listening in 30 s')
+
+
+def print_report(report: dict) -> None:
+    print(f"\n=== Load test: {report['rooms']} rooms ({', '.join(report['presets'])}) ===")
+    print(f"finished games      : {report['finished']}/{report['rooms']} in {report['seconds']} s")
+    lat = report['latency_ms']
+    print(f"action → update (ms): p50 {lat['p50']}  p95 {lat['p95']}  p99 {lat['p99']}  ({report['actions']} actions)")
+    ups = report['updates_per_second']
+    print(f"update frames / s   : mean {ups['mean']}  peak {ups['peak']}")
+    lag = report['loop_lag_ms']
+    print(f"loop lag (ms)       : p50 {lag['p50']}  p95 {lag['p95']}  p99 {lag['p99']}")
+    if report['rss_mb']:
+        rss = report['rss_mb']
+        print(f"server RSS (MB)     : baseline {rss['baseline']}  peak {rss['peak']}  per room {rss['per_room']}")
+    for room in report['room_results']:
+        if 'error' in room or not room['finished']:
+            print(f"  room {room['room']} ({room['preset']}): {room.get('error', 'did not finish')}")
+    if report['errors']:
+        print(f"server errors       : {report['errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Drive full games through socket.io clients and report latency / throughput',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument('--rooms', type=int, default=10)
+    parser.add_argument('--preset', action='append', dest='presets',
+                        help='preset key; repeat to mix presets (rooms take them round-robin)')
+    parser.add_argument('--think', default='0.2:1.0', help='bot think time range in seconds, MIN:MAX')
+    parser.add_argument('--ramp', type=float, default=0.5, help='seconds between room starts')
+    parser.add_argument('--probe-interval', type=float, default=0.5)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--url', help='use a running server instead of starting one')
+    parser.add_argument('--json', help='write the report to this file')
+    args = parser.parse_args()
+
+    args.presets = args.presets or ['preset_standard_12']
+    for preset in args.presets:
+        if resolve_room_config(preset) is None:
+            parser.error(f'unknown preset {preset!r}')
+    low, _, high = args.think.partition(':')
+    args.think = (float(low), float(high or low))
+
+    proc = None
+    if not args.url:
+        proc = start_server(args.port, args.rooms)
+        args.url = f'http://127.0.0.1:{args.port}'
+    args.server_pid = proc.pid if proc else None
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,8 @@
 
 用法（从项目根目录运行）：
     python -m tests.simulate_mw_scenarios
+
+模拟运行在虚拟时钟上（models/runtime/clock.py），所有等待与计时器不占用真实时间。
 """
 
 import asyncio
@@ -25,19 +27,7 @@ import os
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, ROOT)
 
-import utils as _utils_mod
-
-async def _fast_sleep(seconds: float):
-    await asyncio.sleep(min(seconds, 0.01))
-
-from presets.base import DefaultGameFlow as _DGF
-_original_wait_for_player = _DGF.wait_for_player
-
-async def _fast_wait_for_player(self, *, min_duration=None, auto_release=False, silent_timeout=False):
-    return await _original_wait_for_player(
-        self, min_duration=0, auto_release=auto_release, silent_timeout=silent_timeout
-    )
-
+from models.runtime import clock
 from models.system import Global
 from models.user import User
 from models.room import Room
@@ -45,19 +35,8 @@ from models.lobby import resolve_room_config, build_roles_from_config
 from enums import PlayerStatus, GameStage, Role
 from presets.base import WOLF_CAMP_ROLES
 
-import presets.base as _presets_base_mod
-import models.room as _models_room_mod
-import models.runtime.tools as _models_runtime_tools_mod
-import models.runtime.sheriff as _models_runtime_sheriff_mod
-
-_ASYNC_SLEEP_MODULES = [
-    _utils_mod,
-    _presets_base_mod,
-    _models_room_mod,
-    _models_runtime_tools_mod,
-    _models_runtime_sheriff_mod,
-]
-_original_async_sleep = _utils_mod.async_sleep
+WATCH_INTERVAL = 1.0        # 空闲时观察者每隔多少游戏内秒检查一次
+GAME_TIME_LIMIT = 6 * 3600  # 游戏内超过该秒数仍未结束则放弃
 
 
 def make_users(n: int) -> list:
@@ -509,8 +488,11 @@ class ScenarioWatcher:
             ri.select_shoot_target('cancel_shot')
 
     async def run(self):
+        seen = -1
         while not self.room.game_over:
-            await asyncio.sleep(0.02)
+            # 房间状态每次变化时立即响应，否则每个游戏内秒检查一次
+            await self.room.wait_until(lambda: self.room.state_version != seen, WATCH_INTERVAL)
+            seen = self.room.state_version
             if self.room.waiting:
                 self._handle_waiting()
                 continue
@@ -528,10 +510,6 @@ async def run_scenario(label: str, forced_mw_learn_role: Role, *,
     print(f'  {label}')
     print(f'{"="*60}\n')
 
-    for _m in _ASYNC_SLEEP_MODULES:
-        _m.async_sleep = _fast_sleep
-    _DGF.wait_for_player = _fast_wait_for_player
-
     random.seed(seed)
 
     users = make_users(12)
@@ -552,11 +530,11 @@ async def run_scenario(label: str, forced_mw_learn_role: Role, *,
     cursor = print_log(room, cursor)
     print_roles(room)
 
-    elapsed = 0.0
-    while not room.game_over and elapsed < 60:
-        await asyncio.sleep(0.1)
-        elapsed += 0.1
+    started = clock.now()
+    while not room.game_over and clock.now() - started < GAME_TIME_LIMIT:
+        await room.wait_until(lambda: room.game_over, 10)
         cursor = print_log(room, cursor)
+    elapsed = clock.now() - started
 
     watcher_task.cancel()
     cursor = print_log(room, cursor)
@@ -567,9 +545,6 @@ async def run_scenario(label: str, forced_mw_learn_role: Role, *,
     else:
         print(f'=== 超时停止（{elapsed:.0f}s，stage={room.stage}）===')
 
-    for _m in _ASYNC_SLEEP_MODULES:
-        _m.async_sleep = _original_async_sleep
-    _DGF.wait_for_player = _original_wait_for_player
 
 
 async def main():
@@ -600,4 +575,4 @@ async def main():
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    clock.run_virtual(main())
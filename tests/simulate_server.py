@@ -13,6 +13,9 @@ The server does NOT need to be running.
 Usage (from project root):
     python -m tests.simulate_server --preset preset_standard_12 --auto
     python -m tests.simulate_server --preset preset_dev_3 --auto
+
+With --auto the game runs on a virtual clock (models/runtime/clock.py): every
+pause and timer keeps its in-game length but costs no wall time.
 """
 
 import asyncio
@@ -25,21 +28,6 @@ from unittest.mock import AsyncMock, patch
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, ROOT)
 
-# ── Speed patches applied before importing game or server modules ──────────────
-import utils as _utils_mod
-_original_async_sleep = _utils_mod.async_sleep
-
-async def _fast_sleep(seconds: float):
-    await asyncio.sleep(min(seconds, 0.01))
-
-from presets.base import DefaultGameFlow as _DGF
-_original_wait_for_player = _DGF.wait_for_player
-
-async def _fast_wait_for_player(self, *, min_duration=None, auto_release=False, silent_timeout=False):
-    return await _original_wait_for_player(
-        self, min_duration=0, auto_release=auto_release, silent_timeout=silent_timeout
-    )
-
 # ── Mock sio.emit so push_state / push_room_state_all become no-ops ───────────
 # server.py creates `sio` at import time; patch emit after import.
 import socketio as _sio_pkg
@@ -53,24 +41,15 @@ _server.sio.emit = AsyncMock()             # silence all emit calls
 
 # ── Game model imports ────────────────────────────────────────────────────────
 from models.system import Global
+from models.runtime import clock
 from models.user import User
 from models.room import Room
 from models.lobby import resolve_room_config, build_roles_from_config, ROOM_PRESET_CONFIGS
 from enums import PlayerStatus, GameStage, Role
 from presets.base import WOLF_TEAM_ROLES
 
-import presets.base as _presets_base_mod
-import models.room as _models_room_mod
-import models.runtime.tools as _models_runtime_tools_mod
-import models.runtime.sheriff as _models_runtime_sheriff_mod
-
-_ASYNC_SLEEP_MODULES = [
-    _utils_mod,
-    _presets_base_mod,
-    _models_room_mod,
-    _models_runtime_tools_mod,
-    _models_runtime_sheriff_mod,
-]
+WATCH_INTERVAL = 1.0        # in-game seconds between idle watcher checks
+GAME_TIME_LIMIT = 6 * 3600  # in-game seconds before giving up on a stuck game
 
 
 # ── Setup helpers ─────────────────────────────────────────────────────────────
@@ -87,17 +66,21 @@ def make_users(n: int) -> list:
     return users
 
 
-def setup_room(preset: str, users: list) -> Room:
+def setup_room(preset: str, users: list, pacing: str = None, concurrent_night: bool = False) -> Room:
     config = resolve_room_config(preset)
     if config is None:
         raise ValueError(
             f'Unknown preset: {preset!r}\n'
             f'Available: {list(ROOM_PRESET_CONFIGS.keys())}'
         )
+    if pacing:
+        config['pacing'] = pacing
+    config['concurrent_night'] = concurrent_night
     needed = len(build_roles_from_config(config))
     if len(users) < needed:
         raise ValueError(f'Preset {preset!r} needs {needed} players, got {len(users)}')
     room = Room.alloc(config)
+    room.preset = preset
     for user in users[:needed]:
         room.add_player(user)
     return room
@@ -162,10 +145,21 @@ class NetworkWatcher:
     def _has_action(self, user: User, action_name: str) -> bool:
         return bool(self._buttons(user, action_name))
 
+    def _pick_vote(self, user: User, options: list, kind: str) -> str:
+        """Choose a ballot from ``options`` ("seat. nick" labels or nicks); ``kind`` is 'sheriff' or 'exile'.
+
+        Override in a subclass to plug in a different voting policy.
+        """
+        return random.choice(options)
+
     # ── Night phase ───────────────────────────────────────────────────────────
 
     async def _handle_waiting(self):
-        stage = self.room.stage
+        # 并行夜间模式下 open_stages 中的阶段与当前阶段同时进行
+        for stage in (self.room.stage, *self.room.open_stages):
+            await self._act_stage(stage)
+
+    async def _act_stage(self, stage: GameStage):
         if stage == GameStage.WOLF:
             await self._act_wolves()
         elif stage == GameStage.SEER:
@@ -381,7 +375,7 @@ class NetworkWatcher:
             valid = [v for v in btns if v != '弃票']
             if not valid and candidates:
                 valid = candidates  # fall back to nick list (dispatch strips label)
-            target = random.choice(valid) if valid else '弃票'
+            target = self._pick_vote(user, valid, 'sheriff') if valid else '弃票'
             await self._dispatch(user, {'sheriff_ballot': target})
 
     # ── Day phase ─────────────────────────────────────────────────────────────
@@ -453,7 +447,7 @@ class NetworkWatcher:
                     p = self.room.players.get(cn)
                     if p:
                         valid.append(f"{p.seat}. {cn}")
-            target = random.choice(valid) if valid else '弃票'
+            target = self._pick_vote(user, valid, 'exile') if valid else '弃票'
             await self._dispatch(user, {'exile_vote': target})
 
     async def _handle_last_words(self):
@@ -464,8 +458,8 @@ class NetworkWatcher:
         user = self.room.players[current]
         ri = user.role_instance
 
-        # Hunter/wolf_king in active shoot mode
-        if ri and hasattr(ri, 'in_shoot_mode') and ri.in_shoot_mode():
+        # Hunter/wolf_king/mechanical wolf in active shoot mode
+        if self._shoot_action(user):
             await self._hunter_shoot(user)
             return
 
@@ -481,7 +475,7 @@ class NetworkWatcher:
             return
 
         # Hunter/wolf_king picked 发动技能 → now in shoot mode
-        if ri and hasattr(ri, 'in_shoot_mode') and ri.in_shoot_mode():
+        if self._shoot_action(user):
             await self._hunter_shoot(user)
             return
 
@@ -489,17 +483,25 @@ class NetworkWatcher:
         if self._has_action(user, 'last_word_done'):
             await self._dispatch(user, {'last_word_done': '遗言结束'})
 
+    def _shoot_action(self, user: User) -> str:
+        """Prefix of the shoot buttons currently offered to ``user`` ('' if none)."""
+        for prefix in ('hunter_shoot', 'wolfking_shoot', 'mw_shoot'):
+            if self._has_action(user, f'{prefix}_target'):
+                return prefix
+        return ''
+
     async def _hunter_shoot(self, user: User):
-        """Hunter or wolf_king picks a random alive player to shoot."""
-        btns = self._buttons(user, 'hunter_shoot_target')
+        """Hunter, wolf_king or mechanical wolf picks a random alive player to shoot."""
+        prefix = self._shoot_action(user) or 'hunter_shoot'
+        btns = self._buttons(user, f'{prefix}_target')
         valid = [v for v in btns if v != 'cancel_shot']
         if valid:
             target = random.choice(valid)
-            await self._dispatch(user, {'hunter_shoot_target': target})
-            if self._has_action(user, 'hunter_shoot_confirm'):
-                await self._dispatch(user, {'hunter_shoot_confirm': 'confirm'})
+            await self._dispatch(user, {f'{prefix}_target': target})
+            if self._has_action(user, f'{prefix}_confirm'):
+                await self._dispatch(user, {f'{prefix}_confirm': 'confirm'})
         else:
-            await self._dispatch(user, {'hunter_shoot_target': 'cancel_shot'})
+            await self._dispatch(user, {f'{prefix}_target': 'cancel_shot'})
 
     async def _handle_badge_transfer(self):
         sheriff_nick = self.room.skill.get('sheriff_captain')
@@ -516,8 +518,11 @@ class NetworkWatcher:
     # ── Main loop ─────────────────────────────────────────────────────────────
 
     async def run(self):
+        seen = -1
         while not self.room.game_over:
-            await asyncio.sleep(0.02)
+            # React to each state change, and re-check once per in-game second otherwise
+            await self.room.wait_until(lambda: self.room.state_version != seen, WATCH_INTERVAL)
+            seen = self.room.state_version
 
             if self.room.waiting:
                 await self._handle_waiting()
@@ -529,7 +534,7 @@ class NetworkWatcher:
 
 # ── Main ──────────────────────────────────────────────────────────────────────
 
-async def run(preset: str, num_players: int, auto: bool):
+async def run(preset: str, num_players: int, auto: bool, concurrent_night: bool = False):
     print(f'\n=== Server-layer simulation: {preset}, {num_players} players ===\n')
 
     config = resolve_room_config(preset)
@@ -541,13 +546,8 @@ async def run(preset: str, num_players: int, auto: bool):
     if num_players < needed:
         num_players = needed
 
-    if auto:
-        for _m in _ASYNC_SLEEP_MODULES:
-            _m.async_sleep = _fast_sleep
-        _DGF.wait_for_player = _fast_wait_for_player
-
     users = make_users(num_players)
-    room = setup_room(preset, users)
+    room = setup_room(preset, users, concurrent_night=concurrent_night)
     print(f'Room {room.id}: {len(room.players)} players / {len(room.roles)} roles.')
 
     cursor = 0
@@ -566,11 +566,11 @@ async def run(preset: str, num_players: int, auto: bool):
         print('Rerun with --auto to drive the game end-to-end.')
         return
 
-    elapsed = 0.0
-    while not room.game_over and elapsed < 60:
-        await asyncio.sleep(0.1)
-        elapsed += 0.1
+    started = clock.now()
+    while not room.game_over and clock.now() - started < GAME_TIME_LIMIT:
+        await room.wait_until(lambda: room.game_over, 10)
         cursor = print_log(room, cursor)
+    elapsed = clock.now() - started
 
     if watcher_task:
         watcher_task.cancel()
@@ -584,9 +584,6 @@ async def run(preset: str, num_players: int, auto: bool):
               f'sheriff={room.sheriff_state.get("phase") if room.sheriff_state else "-"}, '
               f'day={room.day_state.get("phase") if room.day_state else "-"}) ===')
 
-    for _m in _ASYNC_SLEEP_MODULES:
-        _m.async_sleep = _original_async_sleep
-    _DGF.wait_for_player = _original_wait_for_player
 
 
 def main():
@@ -598,8 +595,12 @@ def main():
     parser.add_argument('--preset', default='preset_standard_12')
     parser.add_argument('--players', type=int, default=12)
     parser.add_argument('--auto', action='store_true')
+    parser.add_argument('--concurrent-night', action='store_true', help='并行夜间模式')
     args = parser.parse_args()
-    asyncio.run(run(args.preset, args.players, args.auto))
+    if args.auto:
+        clock.run_virtual(run(args.preset, args.players, args.auto, args.concurrent_night))
+    else:
+        asyncio.run(run(args.preset, args.players, args.auto))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,80 @@
+"""Tests for the per-room command queue (models/runtime/actor.py)."""
+import asyncio
+
+import pytest
+
+from models.runtime import clock
+from models.runtime.actor import RoomActor
+from models.runtime.tools import AsyncTimer
+
+
+def test_commands_run_one_at_a_time_in_order():
+    actor = RoomActor()
+    trace = []
+
+    async def command(name):
+        trace.append(f'{name}+')
+        await asyncio.sleep(1)          # another command may not slip in here
+        trace.append(f'{name}-')
+        return name
+
+    def fail():
+        raise ValueError('bad')
+
+    async def nested():
+        return await actor.submit(command, 'inner')  # inside a command: runs inline, no deadlock
+
+    async def run():
+        results = await asyncio.gather(actor.submit(command, 'a'), actor.submit(command, 'b'),
+                                       actor.submit(fail), actor.submit(nested), return_exceptions=True)
+        actor.post(fail)                # logged, and the queue keeps going
+        after = await actor.submit(command, 'c')
+        await actor.idle()
+        return results, after
+
+    results, after = clock.run_virtual(run())
+    assert results[:2] == ['a', 'b'] and results[3] == 'inner'
+    assert isinstance(results[2], ValueError)
+    assert after == 'c'
+    assert trace == ['a+', 'a-', 'b+', 'b-', 'inner+', 'inner-', 'c+', 'c-']
+    assert actor.pending == 0 and actor.processed == 6
+
+
+def test_timer_callback_is_a_command_and_cancel_drops_it():
+    actor = RoomActor()
+    timer = AsyncTimer(actor)
+    trace = []
+
+    async def slow_action():
+        trace.append('action+')
+        await asyncio.sleep(5)
+        trace.append('action-')
+
+    async def on_timeout():
+        trace.append('timeout')
+
+    async def run():
+        timer.start(1, on_timeout)
+        busy = asyncio.ensure_future(actor.submit(slow_action))
+        await asyncio.sleep(2)          # the timer expired while the action is still running
+        assert trace == ['action+'] and actor.pending == 2
+        await busy
+        await actor.idle()
+
+        timer.start(1, on_timeout)
+        busy = asyncio.ensure_future(actor.submit(slow_action))
+        await asyncio.sleep(2)
+        timer.cancel()                  # queued behind the action: never runs
+        await busy
+        await actor.idle()
+
+    clock.run_virtual(run())
+    assert trace == ['action+', 'action-', 'timeout', 'action+', 'action-']
+
+
+def test_actor_rebinds_to_a_new_event_loop():
+    actor = RoomActor()
+    assert asyncio.run(actor.submit(lambda: 1)) == 1
+    assert asyncio.run(actor.submit(lambda: 2)) == 2   # a new event loop starts a fresh queue
+    with pytest.raises(ZeroDivisionError):
+        asyncio.run(actor.submit(lambda: 1 / 0))
@@ -0,0 +1,25 @@
+"""Tests for the Monte-Carlo balance runner (tests/simulate_balance.py)."""
+from tests import simulate_balance
+
+
+def test_games_are_reproducible_per_seed():
+    seeds = [simulate_balance.game_seed(0, 'preset_dev_3', i) for i in range(2)]
+    first = simulate_balance.play_batch('preset_dev_3', seeds, 'random')
+    again = simulate_balance.play_batch('preset_dev_3', seeds, 'random')
+    assert first == again
+    for row in first:
+        assert row['winner'] in simulate_balance.CAMPS
+        assert sum(row['alive_roles'].values()) + sum(row['dead_roles'].values()) == 3
+
+
+def test_stats_aggregate_rows():
+    stats = simulate_balance.PresetStats()
+    stats.add({'winner': 'wolf', 'rounds': 2, 'sheriff_camp': 'good', 'badge_destroyed': False,
+               'alive_roles': {'狼人': 1}, 'dead_roles': {'平民': 1}})
+    stats.add({'winner': 'good', 'rounds': 4, 'sheriff_camp': None, 'badge_destroyed': True,
+               'alive_roles': {'平民': 1}, 'dead_roles': {'狼人': 1}})
+    summary = stats.summary()
+    assert summary['win_rate'] == {'good': 0.5, 'wolf': 0.5, 'third': 0.0}
+    assert summary['avg_rounds'] == 3
+    assert summary['sheriff_camp'] == {'good': 0.5, 'none': 0.5}
+    assert summary['role_survival'] == {'狼人': 0.5, '平民': 0.5}
@@ -0,0 +1,50 @@
+"""Tests for the game clock and the virtual-time event loop (models/runtime/clock.py)."""
+import asyncio
+import time
+
+from models.runtime import clock
+from models.runtime.tools import AsyncTimer, deadline_scheduler
+
+
+def test_virtual_loop_skips_idle_time_in_order():
+    fired = []
+
+    async def callback():
+        fired.append(('timer', clock.now()))
+
+    async def run():
+        timer = AsyncTimer()
+        timer.start(120, callback)
+        deadline_scheduler.call_later(20, lambda: fired.append(('deadline', clock.now())))
+        await asyncio.sleep(3600)
+        return clock.now()
+
+    started = time.perf_counter()
+    assert clock.run_virtual(run()) == 3600
+    assert time.perf_counter() - started < 1
+    assert fired == [('deadline', 20), ('timer', 120)]
+
+
+def test_virtual_wall_time_follows_game_time():
+    async def run():
+        before = clock.wall_time()
+        await asyncio.sleep(600)
+        return clock.wall_time() - before
+
+    assert abs(clock.run_virtual(run()) - 600) < 1e-6
+
+
+def test_wait_timeouts_use_the_loop_clock():
+    """wait_for timeouts expire in game time; an early wake-up still happens immediately."""
+    async def run():
+        event = asyncio.Event()
+        asyncio.get_running_loop().call_later(5, event.set)
+        await asyncio.wait_for(event.wait(), 20)
+        woke = clock.now()
+        try:
+            await asyncio.wait_for(asyncio.Event().wait(), 20)
+        except asyncio.TimeoutError:
+            pass
+        return woke, clock.now()
+
+    assert clock.run_virtual(run()) == (5, 25)
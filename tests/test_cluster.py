@@ -0,0 +1,51 @@
+"""Tests for multi-worker room sharding (models/cluster.py) and the shared store tables it uses."""
+from unittest.mock import patch
+
+from models import cluster
+from models.room import Room
+from models.user import User
+from models.system import Global, Config
+from models.store import GameStore
+
+_CONFIG = {
+    'wolf_num': 1, 'citizen_num': 1, 'god_wolf': [], 'god_citizen': ['预言家'],
+    'witch_rule': '仅第一夜可自救', 'guard_rule': '同时被守被救时，对象死亡',
+    'sheriff_bomb_rule': '双爆吞警徽',
+}
+
+
+def test_workers_only_allocate_rooms_they_own():
+    with patch.object(Config, 'SHARD_COUNT', 3), patch.object(Config, 'SHARD_INDEX', 2):
+        rooms = [Room.alloc(dict(_CONFIG)) for _ in range(3)]
+        try:
+            assert cluster.enabled()
+            assert all(cluster.is_local(room.id) for room in rooms)
+            assert [room.id - rooms[0].id for room in rooms] == [0, 3, 6]
+            assert cluster.shard_address(cluster.shard_of(rooms[0].id + 1)) == {'port': Config.SHARD_BASE_PORT}
+        finally:
+            for room in rooms:
+                Global.remove_room(room.id)
+
+
+def test_store_shares_membership_and_lobby(tmp_path):
+    store = GameStore(str(tmp_path / 'state.db'))
+    store.start()
+    u1 = User.alloc('Alice', 's1', 't1')
+    room = Room.alloc(dict(_CONFIG))
+    try:
+        room.add_player(u1)
+        store.save_token('t1', 'Alice')
+        store.save_room(room)
+        store.publish_lobby(0, [{'room_id': '10', 'text': 'a'}])
+        store.publish_lobby(1, [{'room_id': '11', 'text': 'b'}])
+        store.publish_lobby(1, [{'room_id': '13', 'text': 'c'}])
+        store.close()   # flushes the writer queue
+        assert store.nick_for_token('t1') == 'Alice' and store.nick_for_token('nope') is None
+        assert store.nick_in_use('Alice') and not store.nick_in_use('Bob')
+        assert store.room_of('Alice') == str(room.id)
+        assert store.read_lobby(exclude=0) == [{'room_id': '13', 'text': 'c'}]
+        assert store.lobby_version(exclude=0) == 2
+    finally:
+        store.close()
+        Global.users.pop('Alice', None)
+        Global.remove_room(room.id)
@@ -0,0 +1,109 @@
+"""Tests for the concurrent night mode (DefaultGameFlow.concurrent_stages / Room.release_waiting)."""
+import asyncio
+import json
+import random
+
+from enums import GameStage, GuardRule, PlayerStatus, Role
+from models.room import Room, role_classes
+from models.runtime import clock
+from models.system import Config, Global
+from models.user import User
+from tests import simulate_balance
+
+
+def test_open_stage_keeps_the_night_wait_until_everyone_acted():
+    room = Room.alloc({'wolf_num': 1, 'citizen_num': 1, 'god_wolf': [], 'god_citizen': ['预言家'],
+                       'concurrent_night': True})
+    users = [User.alloc(f'Night{i}', f'sn{i}', f'tn{i}') for i in range(3)]
+    for user in users:
+        room.add_player(user)
+    try:
+        for user, role in zip(users, (Role.WOLF, Role.SEER, Role.CITIZEN)):
+            user.role = role
+            user.role_instance = role_classes[role](user)
+        wolf, seer, _ = users
+        room.open_stages = frozenset({GameStage.SEER})
+        room.stage = GameStage.WOLF
+        room.waiting = True
+        assert seer.role_instance.should_act() and room.stage_open(GameStage.SEER)
+
+        wolf.skill['wolf_action_done'] = True
+        room.release_waiting()
+        assert room.waiting  # 预言家尚未行动
+        seer.skill['acted_this_stage'] = True
+        room.release_waiting()
+        assert not room.waiting
+    finally:
+        for user in users:
+            Global.users.pop(user.nick, None)
+        Global.remove_room(room.id)
+
+
+def test_guard_and_witch_on_the_wolf_victim_still_conflict():
+    room = Room.alloc({'wolf_num': 1, 'citizen_num': 1, 'god_wolf': [], 'god_citizen': ['预言家', '女巫', '守卫'],
+                       'concurrent_night': True, 'guard_rule': GuardRule.MED_CONFLICT.value})
+    users = [User.alloc(f'Guard{i}', f'sg{i}', f'tg{i}') for i in range(5)]
+    for user in users:
+        room.add_player(user)
+    try:
+        for user, role in zip(users, (Role.WOLF, Role.SEER, Role.WITCH, Role.GUARD, Role.CITIZEN)):
+            user.role = role
+            user.role_instance = role_classes[role](user)
+            user.status = PlayerStatus.ALIVE
+        wolf, seer, witch, guard, victim = users
+        witch.skill['heal'] = witch.skill['poison'] = True
+        room.started = True
+        room.round = 1
+        flow = room._ensure_game_config()
+        seen = {}
+
+        async def night():
+            await flow.run_wolf_stage()
+            await flow.run_post_wolf_stages()
+
+        async def players():
+            await room.wait_until(lambda: room.stage == GameStage.WOLF and room.waiting)
+            assert room.open_stages == {GameStage.SEER}  # 守卫不与狼人同时行动
+            wolf.role_instance.kill_player(victim.nick)
+            seer.role_instance.skip()
+            await room.wait_until(lambda: room.stage == GameStage.WITCH and room.waiting)
+            seen['witch'] = [u.nick for u in room.list_pending_kill_players()]
+            witch.role_instance.heal_player('confirm_heal')
+            await room.wait_until(lambda: room.stage == GameStage.GUARD and room.waiting)
+            guard.role_instance.protect_player(victim.nick)
+            guard.role_instance.confirm()
+
+        async def run():
+            await asyncio.gather(night(), players())
+
+        clock.run_virtual(run())
+        assert seen['witch'] == [victim.nick]       # 女巫仍能看到刀口并用药
+        assert victim.status == PlayerStatus.PENDING_DEAD  # 同守同救
+    finally:
+        for user in users:
+            Global.users.pop(user.nick, None)
+        Global.remove_room(room.id)
+
+
+def test_independent_stages_run_alongside_the_wolves(tmp_path, monkeypatch):
+    path = tmp_path / 'timeline.jsonl'
+    monkeypatch.setattr(Config, 'TIMELINE_LOG', str(path))
+    records = {}
+    for concurrent in (False, True):
+        random.seed(7)
+        row = clock.run_virtual(simulate_balance._play('preset_dev_6', simulate_balance.BalanceWatcher,
+                                                       concurrent_night=concurrent))
+        assert row['winner'] in simulate_balance.CAMPS
+        records[concurrent] = json.loads(path.read_text(encoding='utf-8').splitlines()[-1])
+
+    sequential, parallel = records[False], records[True]
+    assert parallel['pacing'] == '标准・并行夜间'
+    assert {'SEER', 'GUARD'} <= {s['stage'] for s in sequential['segments']}
+    assert 'SEER' not in {s['stage'] for s in parallel['segments']}
+    # 第一晚：狼人与预言家共用一个阶段，女巫、守卫与猎人仍依次进行
+    first_night = [s['stage'] for s in parallel['segments'] if s['round'] == 1]
+    assert first_night[:4] == ['WOLF', 'WITCH', 'GUARD', 'HUNTER']
+    night_length = {kind: sum(s['duration'] for s in record['segments'] if s['round'] == 1
+                              and s['stage'] in ('WOLF', 'SEER', 'GUARD', 'WITCH', 'HUNTER'))
+                    for kind, record in records.items()}
+    assert night_length[True] < night_length[False] - 20
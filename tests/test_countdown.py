@@ -1,10 +1,11 @@
-"""Tests for the per-user countdown task in server.py."""
+"""Tests for the shared deadline scheduler, AsyncTimer and the room-level countdown in server.py."""
 import asyncio
-from unittest.mock import AsyncMock, patch, MagicMock
+from unittest.mock import patch
 
 from models.room import Room
 from models.user import User
 from models.system import Global
+from models.runtime.tools import AsyncTimer, deadline_scheduler
 from enums import GameStage
 
 
@@ -23,61 +24,98 @@ def _make_room_and_users():
     return room, u1, u2, u3
 
 
-def _cleanup(*users):
+def _cleanup(room, *users):
     for u in users:
         Global.users.pop(u.nick, None)
+    Global.remove_room(room.id)
 
 
-def test_countdown_emits_tick_then_clear():
-    """_countdown sends countdown_tick each second and countdown_clear at the end."""
-    emitted = []
-
-    async def fake_emit(event, data=None, to=None):
-        emitted.append((event, data))
+def test_deadline_scheduler_orders_and_cancels():
+    fired = []
 
     async def run():
-        from server import _countdown
-        room, u1, u2, u3 = _make_room_and_users()
-        u1.sid = 'sid1'
-        u1.skill['countdown_skip_timeout'] = False  # allow timeout to fire
+        deadline_scheduler.call_later(0.03, fired.append, 'late')
+        deadline_scheduler.call_later(0.01, fired.append, 'early')
+        deadline_scheduler.call_later(0.02, fired.append, 'cancelled').cancel()
+        await asyncio.sleep(0.06)
 
-        with patch('server.sio') as mock_sio:
-            mock_sio.emit = fake_emit
-            # Run a 3-second countdown
-            await _countdown(u1, seconds=3)
+    asyncio.run(run())
+    assert fired == ['early', 'late']
 
-        _cleanup(u1, u2, u3)
 
-    asyncio.run(run())
+def test_async_timer_runs_on_shared_scheduler():
+    """AsyncTimer keeps its start/cancel API; restarts replace the pending deadline."""
+    calls = []
 
-    tick_events = [d['seconds'] for e, d in emitted if e == 'countdown_tick']
-    clear_events = [e for e, d in emitted if e == 'countdown_clear']
+    async def callback():
+        calls.append('fired')
 
-    assert tick_events == [3, 2, 1], f"Unexpected ticks: {tick_events}"
-    assert len(clear_events) == 1, "Expected exactly one countdown_clear"
+    async def run():
+        timer, other = AsyncTimer(), AsyncTimer()
+        base = deadline_scheduler.stats()['active']
+        timer.start(0.01, callback)
+        timer.start(0.02, callback)
+        other.start(0.01, callback)
+        assert deadline_scheduler.stats()['active'] == base + 2
+        other.cancel()
+        assert deadline_scheduler.stats()['active'] == base + 1
+        await asyncio.sleep(0.05)
+        assert not timer.active and deadline_scheduler.stats()['active'] == base
 
+    asyncio.run(run())
+    assert calls == ['fired']
 
-def test_countdown_respects_skip_flag():
-    """Setting countdown_skip_timeout before countdown ends prevents timeout logic."""
-    timeout_fired = []
 
+def test_room_countdown_arms_one_deadline_per_key():
+    """The same countdown is reused across pushes and replaced when the context changes."""
     async def run():
-        from server import _countdown
+        import server
         room, u1, u2, u3 = _make_room_and_users()
-        u1.sid = 'sid1'
+        try:
+            room.stage = GameStage.EXILE_VOTE
+            first = server._room_countdown(room)
+            assert first['key'] == f'exile_vote_r{room.round}' and first['seconds'] == 10
+            assert 'expires_at' in first
+            assert server._room_countdown(room) is first
+            room.stage = GameStage.EXILE_PK_VOTE
+            second = server._room_countdown(room)
+            assert second['key'] != first['key']
+            room.stage = None
+            assert server._room_countdown(room) is None and room._countdown_handle is None
+        finally:
+            _cleanup(room, u1, u2, u3)
 
-        async def fake_emit(event, data=None, to=None):
-            # After first tick, set skip flag
-            if event == 'countdown_tick' and data.get('seconds') == 2:
-                u1.skill['countdown_skip_timeout'] = True
+    asyncio.run(run())
+
+
+def test_countdown_expiry_runs_timeouts_for_pending_players():
+    """On expiry, players still pending time out; exempted players do not."""
+    votes = []
+    pushes = []
 
-        with patch('server.sio') as mock_sio:
-            mock_sio.emit = fake_emit
-            await _countdown(u1, seconds=3)
+    async def fake_push_all(room):
+        pushes.append(room.id)
 
-        timeout_fired.append(u1.skill.get('countdown_skip_timeout', False))
-        _cleanup(u1, u2, u3)
+    def fake_vote(room, user, choice):
+        votes.append((user.nick, choice))
+
+    async def run():
+        import server
+        room, u1, u2, u3 = _make_room_and_users()
+        try:
+            room.stage = GameStage.EXILE_VOTE
+            u1.skill['exile_vote_pending'] = True
+            u2.skill['exile_vote_pending'] = True
+            with patch('server._get_countdown_context', return_value=('k', 0.02, 'label')), \
+                    patch('server.push_room_state_all', fake_push_all), \
+                    patch.object(Room, 'record_exile_vote', fake_vote):
+                server._room_countdown(room)
+                server._cancel_countdown(u2, suppress_timeout=True)
+                await asyncio.sleep(0.05)
+                assert room.countdown is None, 'expired countdown is re-armed on the next push'
+        finally:
+            _cleanup(room, u1, u2, u3)
 
     asyncio.run(run())
-    # Skip flag should have been consumed (popped) inside _countdown
-    assert timeout_fired[0] is False
+    assert votes == [('Alice', '弃票')]
+    assert len(pushes) == 1
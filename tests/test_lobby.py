@@ -0,0 +1,122 @@
+"""Tests for the cached lobby room list and the debounced lobby broadcast."""
+import asyncio
+from unittest.mock import patch
+
+from models.lobby import build_room_info_lines
+from models.room import Room
+from models.system import Global
+from models.user import User
+
+CONFIG = {
+    'wolf_num': 1, 'citizen_num': 1, 'god_wolf': [], 'god_citizen': ['预言家'],
+    'witch_rule': '仅第一夜可自救', 'guard_rule': '同时被守被救时，对象死亡',
+    'sheriff_bomb_rule': '双爆吞警徽',
+}
+
+
+def test_room_lines_rebuilt_only_for_changed_rooms():
+    a, b = Room.alloc(CONFIG), Room.alloc(CONFIG)
+    user = User.alloc('Lobbyist', None, 'tl')
+    try:
+        first = build_room_info_lines()
+        again = build_room_info_lines()
+        assert [line['room_id'] for line in first][-2:] == [str(a.id), str(b.id)]
+        assert all(x is y for x, y in zip(first, again))
+
+        a.add_player(user)
+        lines = {line['room_id']: line for line in build_room_info_lines()}
+        old = {line['room_id']: line for line in first}
+        assert lines[str(a.id)]['text'].startswith(f'{a.id}号：1/3 人')
+        assert lines[str(b.id)] is old[str(b.id)]
+    finally:
+        Global.users.pop('Lobbyist', None)
+        for room in (a, b):
+            Global.remove_room(room.id)
+    assert str(a.id) not in {line['room_id'] for line in build_room_info_lines()}
+
+
+def test_lobby_broadcast_is_debounced_to_one_room_emit():
+    import server
+    sent = []
+
+    async def fake_emit(event, data=None, to=None, **kwargs):
+        sent.append((event, to))
+
+    async def run():
+        with patch.object(server.sio, 'emit', fake_emit), patch.object(server, 'LOBBY_DEBOUNCE_SECONDS', 0.01):
+            for _ in range(5):
+                await server.broadcast_lobby()
+            await asyncio.sleep(0.05)
+            assert sent == [('lobby', server.LOBBY_ROOM)]
+            await server.broadcast_lobby()
+            await asyncio.sleep(0.05)
+            assert len(sent) == 2
+
+    asyncio.run(run())
+
+
+def test_room_registry_ids_status_index_and_capacity():
+    from models.system import Config, ROOM_FULL, ROOM_OPEN, ROOM_STARTED
+    a, b = Room.alloc(CONFIG), Room.alloc(CONFIG)
+    users = [User.alloc(f'Reg{i}', None, f'tr{i}') for i in range(3)]
+    rooms = [a, b]
+    try:
+        Global.remove_room(b.id)
+        c = Room.alloc(CONFIG)
+        rooms.append(c)
+        assert a.id < b.id < c.id  # 关闭的房间号不会被重新分配
+        assert str(c.id) in Global.rooms_by_status[ROOM_OPEN]
+
+        for u in users:
+            a.add_player(u)
+        assert Global.room_status(a.id) == ROOM_FULL and a in Global.list_rooms(ROOM_FULL)
+        assert Room.validate_room_join(a.id) == '房间已满'
+        a.started = True
+        assert Global.room_status(a.id) == ROOM_STARTED
+        assert str(a.id) not in Global.rooms_by_status[ROOM_FULL]
+        line = next(line for line in build_room_info_lines() if line['room_id'] == str(a.id))
+        assert line['status'] == ROOM_STARTED and line['text'].endswith('｜游戏中')
+        a.game_over = True
+        a.remove_player(users[0])
+        assert Global.room_status(a.id) == ROOM_OPEN
+
+        with patch.object(Config, 'MAX_ROOMS', len(Global.rooms)):
+            try:
+                Room.alloc(CONFIG)
+                assert False, 'expected the room limit to be enforced'
+            except ValueError as e:
+                assert '已满' in str(e)
+    finally:
+        for u in users:
+            Global.users.pop(u.nick, None)
+        for room in rooms:
+            Global.remove_room(room.id)
+    assert all(str(a.id) not in ids for ids in Global.rooms_by_status.values())
+
+
+def test_play_again_quitters_reopen_the_room_in_the_lobby():
+    import server
+    from models.system import ROOM_OPEN
+
+    room = Room.alloc(CONFIG)
+    users = [User.alloc(f'Again{i}', None, f'ta{i}') for i in range(3)]
+    for u in users:
+        room.add_player(u)
+    try:
+        room.started = room.game_over = True
+        for u, response in zip(users, ('加入', '加入', '不参加')):
+            u.skill['play_again_response'] = response
+
+        async def fake_emit(*args, **kwargs):
+            pass
+
+        with patch.object(server.sio, 'emit', fake_emit):
+            asyncio.run(server._reset_room_for_new_game(room))
+        assert list(room.players) == ['Again0', 'Again1'] and users[2].room is None
+        assert Global.room_status(room.id) == ROOM_OPEN
+        line = next(line for line in build_room_info_lines() if line['room_id'] == str(room.id))
+        assert line['status'] == ROOM_OPEN
+    finally:
+        for u in users:
+            Global.users.pop(u.nick, None)
+        Global.remove_room(room.id)
@@ -0,0 +1,43 @@
+"""Tests for the /metrics instrumentation (models/runtime/metrics.py)."""
+import asyncio
+
+from models.runtime import metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = metrics.Histogram((0.01, 0.1))
+    for value in (0.005, 0.01, 0.05, 3):
+        hist.observe(value)
+    lines = hist.render('x', 'h="a"')
+    assert lines[:3] == ['x_bucket{h="a",le="0.01"} 2', 'x_bucket{h="a",le="0.1"} 3', 'x_bucket{h="a",le="+Inf"} 4']
+    assert lines[-1] == 'x_count{h="a"} 4'
+
+
+def test_endpoint_reports_handlers_emits_and_rooms():
+    import server
+    from models.room import Room
+    from models.system import Global
+    from models.user import User
+
+    room = Room.alloc({'wolf_num': 1, 'citizen_num': 1, 'god_wolf': [], 'god_citizen': ['预言家']})
+    user = User.alloc('Metric', 'sm', 'tm')
+    room.add_player(user)
+    before = list(metrics.emitted['update'])
+    try:
+        text = metrics.CountingJSON.dumps(['update', {'seat': 1}], separators=(',', ':'))
+        assert metrics.emitted['update'] == [before[0] + 1, before[1] + len(text)]
+        metrics.CountingJSON.dumps([None])  # ack payloads are not events
+        assert metrics.emitted['update'][0] == before[0] + 1
+
+        calls = metrics.handler_seconds['push_state'].count
+        asyncio.run(server.push_state(User(nick='Ghost', sid=None, reconnect_token='tg')))
+        assert metrics.handler_seconds['push_state'].count == calls + 1
+
+        body = asyncio.run(server.metrics_endpoint()).body.decode()
+        assert 'mv_handler_seconds_count{handler="on_player_action"}' in body
+        assert 'mv_rooms{stage="none"}' in body and 'mv_rooms_by_status{status="open"}' in body
+        assert 'mv_deadlines{stat="active"}' in body and 'mv_loop_lag_last_seconds' in body
+        assert f'mv_emitted_packets_total{{event="update"}} {before[0] + 1}' in body
+    finally:
+        Global.users.pop('Metric', None)
+        Global.remove_room(room.id)
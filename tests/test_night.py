@@ -0,0 +1,66 @@
+"""Tests for the pure night resolver (models/runtime/night.py)."""
+import time
+
+from enums import PlayerStatus, Role
+from models.runtime.night import (
+    FOX_GONE, MARTYR, NO_SHOOT, POISONED, NightActions, NightPlayer, resolve_night,
+)
+
+A, D = PlayerStatus.ALIVE, PlayerStatus.DEAD
+KILL, POISON = PlayerStatus.PENDING_DEAD, PlayerStatus.PENDING_POISON
+HEAL, GUARD = PlayerStatus.PENDING_HEAL, PlayerStatus.PENDING_GUARD
+
+
+def players(*entries):
+    return [NightPlayer(role, status) for role, status in entries]
+
+
+def test_kill_poison_and_protection_marks():
+    out = resolve_night(players(
+        (Role.CITIZEN, KILL), (Role.HUNTER, POISON), (Role.SEER, HEAL), (Role.GUARD, GUARD), (Role.WOLF, D),
+    ))
+    assert out.statuses == [D, D, A, A, D]
+    assert out.deaths == [0, 1]
+    assert out.events == [(POISONED, 1)]
+
+
+def test_dream_target_is_immune_unless_dreamed_twice():
+    roster = players((Role.DREAMER, A), (Role.WOLF_KING, KILL), (Role.CITIZEN, A))
+    out = resolve_night(roster, NightActions(dreamer=0, dream_target=1))
+    assert out.deaths == [] and out.statuses[1] is A
+
+    out = resolve_night(roster, NightActions(dreamer=0, dream_target=1, dream_streak=True))
+    assert out.deaths == [1]
+    assert out.events == [(NO_SHOOT, 1)]
+
+
+def test_dream_target_follows_dead_dreamer():
+    out = resolve_night(
+        players((Role.DREAMER, KILL), (Role.HUNTER, POISON), (Role.CITIZEN, A)),
+        NightActions(dreamer=0, dream_target=1),
+    )
+    assert out.deaths == [0, 1]
+    assert out.events == [(NO_SHOOT, 1)]
+
+
+def test_martyr_chain_and_fox_tails():
+    out = resolve_night(
+        players(
+            (Role.WOLF_BEAUTY, POISON), (Role.WOLF_BEAUTY, A), (Role.SEER, A),
+            (Role.NINE_TAILED_FOX, A), (Role.WITCH, D), (Role.GUARD, D), (Role.HUNTER, D), (Role.CITIZEN, D),
+        ),
+        NightActions(charms=((0, 1), (1, 2))),
+    )
+    assert out.deaths == [0, 1, 2, 3]
+    assert out.events == [(MARTYR, 1), (MARTYR, 2), (FOX_GONE, 3)]
+    assert out.tails == [(3, 0)]
+
+
+def test_twelve_player_night_is_cheap():
+    roster = players(*([(Role.WOLF, A)] * 4 + [(Role.CITIZEN, KILL)] + [(Role.CITIZEN, A)] * 3
+                       + [(Role.SEER, A), (Role.WITCH, POISON), (Role.HUNTER, A), (Role.NINE_TAILED_FOX, A)]))
+    actions = NightActions(charms=((0, 5),))
+    started = time.perf_counter()
+    for _ in range(1000):
+        resolve_night(roster, actions)
+    assert (time.perf_counter() - started) / 1000 < 1e-3
@@ -0,0 +1,63 @@
+"""Tests for room pacing profiles (models/runtime/pacing.py) and the timings that read them."""
+import pytest
+
+from enums import GameStage, PacingProfile, PlayerStatus
+from models.room import Room
+from models.runtime import clock
+from models.runtime.pacing import PROFILES, STANDARD, Pacing, pacing_options
+from models.store import snapshot_room
+from models.system import Global
+from models.user import User
+
+CONFIG = {'wolf_num': 1, 'citizen_num': 1, 'god_wolf': [], 'god_citizen': ['预言家']}
+
+
+def test_profiles_from_room_config():
+    assert Pacing.from_config({}) == Pacing()
+    assert Pacing.from_config({'pacing': '快速'}) is PROFILES[PacingProfile.FAST]
+    custom = Pacing.from_config({'pacing': '自定义', 'pacing_custom': {'night': 2, 'speech': '90', 'pause_scale': 0.5}})
+    assert (custom.profile, custom.night, custom.decision, custom.speech, custom.pause_scale) == \
+        (PacingProfile.CUSTOM, 5, 10, 90, 0.5)
+    assert Pacing.from_config(custom.as_config()) == custom  # 快照 / 配置表单往返不变
+    with pytest.raises(ValueError):
+        Pacing.from_config({'pacing': '飞快'})
+    with pytest.raises(ValueError):
+        Pacing.from_config({'pacing': '自定义', 'pacing_custom': {'speech': 'long'}})
+
+    options = {option['value']: option for option in pacing_options()}  # 前端配置表单的数据来源
+    assert list(options) == ['标准', '快速', '比赛', '自定义']
+    assert options['快速']['label'] == '快速（夜间 12 秒，发言 60 秒）'
+    assert options['自定义']['defaults']['night'] == STANDARD.night
+    assert options['自定义']['limits']['speech'] == [20, 300]
+
+
+def test_countdowns_and_flow_follow_the_room_pacing():
+    import server
+
+    room = Room.alloc({**CONFIG, 'pacing': '快速'})
+    user = User.alloc('Pace', 'sp', 'tp')
+    room.add_player(user)
+    try:
+        assert snapshot_room(room)['pacing'] == {'pacing': '快速'}
+        room.round = 1
+        room.stage = GameStage.WOLF
+        assert server._get_countdown_context(room)[1] == 12
+        room.stage = GameStage.EXILE_SPEECH
+        room.current_speaker = user.nick
+        assert server._get_countdown_context(room)[1] == server._countdown_seconds(user, room) == 60
+        room.skill['sheriff_captain'] = user.nick
+        assert server._get_countdown_context(room)[1] == server._countdown_seconds(user, room) == 75
+        assert room._ensure_game_config().stage_idle_delay(GameStage.SEER) == 12
+        user.status = PlayerStatus.ALIVE
+        room.day_state['phase'] = 'await_exile_vote'
+        assert room.start_exile_vote(pk_mode=False) is None
+        assert room.log[-1][1] == '放逐投票进行中，请在8秒内完成选择'
+
+        async def scripted_pause():
+            await room.pause(3)
+            return clock.now()
+
+        assert clock.run_virtual(scripted_pause()) == 1.5
+    finally:
+        Global.users.pop(user.nick, None)
+        Global.remove_room(room.id)
@@ -0,0 +1,48 @@
+"""Tests for the per-room player table (models/runtime/players.py)."""
+from enums import PlayerStatus, Role
+from models.room import Room
+from models.user import User
+
+
+def make_room(n):
+    room = Room(id=1, roles=[Role.CITIZEN] * n)
+    users = [User(nick=f'P{i}', sid=None, reconnect_token=f't{i}') for i in range(n)]
+    for u in users:
+        room.add_player(u)
+    return room, users
+
+
+def test_table_follows_user_fields_and_skill_flags():
+    room, (a, b, c) = make_room(3)
+    table = room.player_table
+    a.role, b.role, c.role = Role.WOLF, Role.SEER, Role.CITIZEN
+    for u in (a, b, c):
+        u.status = PlayerStatus.ALIVE
+    b.status = PlayerStatus.PENDING_DEAD
+
+    assert [u.nick for u in room.list_alive_players()] == ['P0', 'P2']
+    assert [u.nick for u in room.get_active_wolves()] == ['P0']
+    assert table.count([Role.SEER], [PlayerStatus.PENDING_DEAD]) == 1
+    assert table.count([Role.SEER], [PlayerStatus.ALIVE]) == 0
+
+    a.skill['wolf_action_done'] = True
+    c.skill.setdefault('wolf_action_done', True)
+    assert table.all_flag('wolf_action_done', ['P0', 'P2'])
+    c.skill.pop('wolf_action_done')
+    assert not table.all_flag('wolf_action_done', ['P0', 'P2'])
+    c.skill = {'wolf_action_done': True}
+    assert table.all_flag('wolf_action_done', ['P0', 'P2'])
+
+
+def test_remove_keeps_join_order_and_snapshot_is_independent():
+    room, users = make_room(20)
+    for u in users:
+        u.status = PlayerStatus.ALIVE
+    room.remove_player(users[3])
+    assert room.player_table.select() == list(room.players)
+    assert room.player_table.status_of('P3') is None
+
+    snap = room.player_table.snapshot()
+    users[0].status = PlayerStatus.DEAD
+    assert snap.status_of('P0') == PlayerStatus.ALIVE
+    assert room.player_table.select(statuses=[PlayerStatus.ALIVE]) == [f'P{i}' for i in range(1, 20) if i != 3]
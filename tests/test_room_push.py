@@ -0,0 +1,211 @@
+"""Tests for Room change notification and the event-driven room pusher in server.py."""
+import asyncio
+from unittest.mock import patch
+
+from models.room import Room
+from models.user import User
+from models.system import Global
+from enums import GameStage
+
+
+def _make_room_and_users():
+    u1 = User.alloc('Alice', 's1', 't1')
+    u2 = User.alloc('Bob',   's2', 't2')
+    u3 = User.alloc('Carol', 's3', 't3')
+    config = {
+        'wolf_num': 1, 'citizen_num': 1, 'god_wolf': [], 'god_citizen': ['预言家'],
+        'witch_rule': '仅第一夜可自救', 'guard_rule': '同时被守被救时，对象死亡',
+        'sheriff_bomb_rule': '双爆吞警徽',
+    }
+    room = Room.alloc(config)
+    for u in (u1, u2, u3):
+        room.add_player(u)
+    return room, u1, u2, u3
+
+
+def _cleanup(room, *users):
+    for u in users:
+        Global.users.pop(u.nick, None)
+    Global.remove_room(room.id)
+
+
+def test_room_mutations_bump_state_version():
+    """Log appends, stage changes and phase transitions all count as changes."""
+    room, u1, u2, u3 = _make_room_and_users()
+    try:
+        v0 = room.state_version
+        room.broadcast_msg('hello')
+        v1 = room.state_version
+        room.stage = GameStage.SHERIFF
+        v2 = room.state_version
+        room.sheriff_state = {'phase': 'signup'}
+        v3 = room.state_version
+        room.sheriff_state['phase'] = 'speech'
+        v4 = room.state_version
+        room.sheriff_state['up'] = ['Alice']
+        v5 = room.state_version
+        assert v0 < v1 < v2 < v3 < v4
+        assert v5 == v4, 'non-phase keys should not count as a change'
+    finally:
+        _cleanup(room, u1, u2, u3)
+
+
+def test_pusher_wakes_once_per_burst():
+    """A burst of mutations in one tick results in exactly one push."""
+    pushes = []
+
+    async def fake_push_all(room):
+        pushes.append(room.state_version)
+        room.change_event().clear()
+
+    async def run():
+        import server
+        room, u1, u2, u3 = _make_room_and_users()
+        with patch('server.push_room_state_all', fake_push_all):
+            server._ensure_room_pusher(room)
+            await asyncio.sleep(0)
+            room.broadcast_msg('a')
+            room.broadcast_msg('b')
+            room.stage = GameStage.WOLF
+            await asyncio.sleep(0.01)
+            assert len(pushes) == 1
+            room.send_msg('c', nick='Alice')
+            await asyncio.sleep(0.01)
+            assert len(pushes) == 2
+            # Removing the last player stops the pusher
+            for u in (u1, u2, u3):
+                room.remove_player(u)
+            await asyncio.sleep(0.01)
+            assert str(room.id) not in server._room_pushers
+        _cleanup(room, u1, u2, u3)
+
+    asyncio.run(run())
+
+
+def test_coalescing_window_merges_changes_into_one_push():
+    """With a coalescing window, changes made shortly after the wake-up share its push."""
+    pushes = []
+
+    async def fake_push_all(room):
+        pushes.append(room.state_version)
+        room.change_event().clear()
+
+    async def run():
+        import server
+        room, u1, u2, u3 = _make_room_and_users()
+        with patch('server.push_room_state_all', fake_push_all), \
+                patch.object(server, 'PUSH_COALESCE_SECONDS', 0.03):
+            server._ensure_room_pusher(room)
+            await asyncio.sleep(0)
+            room.broadcast_msg('a')
+            await asyncio.sleep(0.01)
+            room.broadcast_msg('b')
+            await asyncio.sleep(0.05)
+            assert pushes == [room.state_version]
+            for u in (u1, u2, u3):
+                room.remove_player(u)
+            await asyncio.sleep(0.05)
+        _cleanup(room, u1, u2, u3)
+
+    asyncio.run(run())
+
+
+def test_wait_until_wakes_when_stage_resolves():
+    """The game loop barrier returns as soon as room.waiting is cleared, or False on timeout."""
+    async def run():
+        room, u1, u2, u3 = _make_room_and_users()
+        loop = asyncio.get_running_loop()
+        room.waiting = True
+        loop.call_later(0.05, setattr, room, 'waiting', False)
+        start = loop.time()
+        released = await room.wait_until(lambda: not room.waiting, timeout=5)
+        elapsed = loop.time() - start
+        assert released and elapsed < 1
+
+        room.waiting = True
+        released = await room.wait_until(lambda: not room.waiting, timeout=0.05)
+        assert released is False
+        _cleanup(room, u1, u2, u3)
+
+    asyncio.run(run())
+
+
+def test_shared_state_built_once_per_seat_version():
+    """The room-wide payload is reused until seats/config change, then rebuilt."""
+    import server
+    room, u1, u2, u3 = _make_room_and_users()
+    try:
+        first = server._room_static_state(room)
+        assert server._room_static_state(room) is first
+        room.release_seat(u1)
+        second = server._room_static_state(room)
+        assert second is not first
+        shared = server._room_shared_state(room)
+        assert shared['seat_panel'] is second['seat_panel']
+        assert shared['host_nick'] == room.get_host().nick
+    finally:
+        _cleanup(room, u1, u2, u3)
+
+
+def test_ballot_buttons_shared_per_state_version():
+    """Every pending voter gets the same exile ballot, rebuilt only after the room changes."""
+    import server
+    from roles.citizen import Citizen
+    room, u1, u2, u3 = _make_room_and_users()
+    try:
+        for u in (u1, u2, u3):
+            u.role_instance = Citizen(u)
+        room.started = True
+        room.stage = GameStage.EXILE_VOTE
+        room.day_state['vote_candidates'] = ['Alice', 'Bob']
+        u1.skill['exile_vote_pending'] = True
+        u2.skill['exile_vote_pending'] = True
+
+        def ballot(user):
+            return next(a for a in server._compute_actions(user, room) if a['name'] == 'exile_vote')
+
+        b1, b2 = ballot(u1), ballot(u2)
+        assert b1 is b2
+        assert [b['value'] for b in b1['buttons']] == [f'{u1.seat}. Alice', f'{u2.seat}. Bob', '弃票']
+        room.broadcast_msg('Alice 投票')
+        assert ballot(u2) is not b1
+    finally:
+        _cleanup(room, u1, u2, u3)
+
+
+def test_reconnect_resends_exactly_the_missed_messages():
+    """A resumed connection gets every message after its last seq, a fresh tab the whole transcript."""
+    import server
+    sent = []
+
+    async def fake_emit(event, data=None, to=None, **kwargs):
+        sent.append((event, to, data))
+
+    async def run():
+        room, u1, u2, u3 = _make_room_and_users()
+        server._token_to_nick['t1'] = 'Alice'
+        try:
+            with patch.object(server.sio, 'emit', fake_emit):
+                room.broadcast_msg('a')
+                u1.send_msg('secret')
+                seen, _ = room.log.read('Alice', u1.message_cursor)
+                u1.get_pending_messages()
+                room.broadcast_msg('b')
+                u1.get_pending_messages()  # delivered to a socket that was already gone
+
+                await server.on_connect('s1b', {}, {'token': 't1', 'resume': {'room': room.id, 'seq': seen[-1]['seq']}})
+                [(_, to, frame)] = [e for e in sent if e[0] == 'update']
+                assert to == 's1b' and [m['text'] for m in frame['messages']] == ['b'] and 'state' in frame
+
+                sent.clear()
+                await server.on_connect('s1c', {}, {'token': 't1'})
+                [(_, _, frame)] = [e for e in sent if e[0] == 'update']
+                texts = [m.get('text') for m in frame['messages']]
+                assert texts[-3:] == ['a', 'secret', 'b'] and '你当前的号码牌：2号' not in texts
+        finally:
+            server._token_to_nick.pop('t1', None)
+            for sid in ('s1b', 's1c'):
+                server._sid_to_nick.pop(sid, None)
+            _cleanup(room, u1, u2, u3)
+
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+"""Tests for the versioned state protocol: full snapshot first, then patches, in 'update' frames."""
+import asyncio
+from unittest.mock import patch
+
+from models.room import Room
+from models.user import User
+from models.system import Global
+
+
+def _apply(state, ops):
+    state = dict(state)
+    for op in ops:
+        key = op['path'][1:]
+        if op['op'] == 'remove':
+            state.pop(key, None)
+        else:
+            state[key] = op['value']
+    return state
+
+
+def test_state_patch_ops():
+    import server
+    old = {'a': 1, 'b': [1, 2], 'c': 'x'}
+    new = {'a': 1, 'b': [1, 3], 'd': None}
+    ops = server._state_patch(old, new)
+    assert {op['path'] for op in ops} == {'/b', '/c', '/d'}
+    assert _apply(old, ops) == new
+    assert server._state_patch(new, dict(new)) == []
+
+
+def test_push_state_sends_snapshot_then_patches():
+    emitted = []
+
+    async def fake_emit(event, data=None, to=None):
+        emitted.append((event, data))
+
+    async def run():
+        import server
+        u1 = User.alloc('Alice', 's1', 't1')
+        u2 = User.alloc('Bob', 's2', 't2')
+        room = Room.alloc({
+            'wolf_num': 1, 'citizen_num': 1, 'god_wolf': [], 'god_citizen': ['预言家'],
+            'witch_rule': '仅第一夜可自救', 'guard_rule': '同时被守被救时，对象死亡',
+            'sheriff_bomb_rule': '双爆吞警徽',
+        })
+        try:
+            room.add_player(u1)
+            with patch.object(server.sio, 'emit', fake_emit):
+                await server.push_state(u1)
+                await server.push_state(u1)       # nothing changed
+                room.add_player(u2)               # seat panel changes
+                await server.push_state(u1)
+                u1.sent_state = None              # reconnect
+                await server.push_state(u1)
+        finally:
+            for u in (u1, u2):
+                Global.users.pop(u.nick, None)
+            Global.remove_room(room.id)
+
+        assert {e for e, _ in emitted} == {'update'}
+        # 一次推送一帧：加入房间的消息与状态快照同帧发出
+        assert 'messages' in emitted[0][1] and 'state' in emitted[0][1]
+        states = [(key, d[key]) for _, d in emitted for key in ('state', 'patch') if key in d]
+        assert [key for key, _ in states] == ['state', 'patch', 'state']
+        snapshot, delta, resync = (d for _, d in states)
+        assert delta['base'] == snapshot['version'] and delta['version'] == snapshot['version'] + 1
+        paths = {op['path'] for op in delta['ops']}
+        assert '/seat_panel' in paths and '/room_desc' not in paths
+        patched = _apply(snapshot, delta['ops'])
+        assert patched['seat_panel'] == resync['seat_panel']
+        assert resync['version'] > delta['version']
+
+    asyncio.run(run())
@@ -0,0 +1,147 @@
+"""Tests for the SQLite game store and log archive (models/store.py)."""
+import asyncio
+
+from models.room import Room
+from models.user import User
+from models.system import Global
+from models.store import GameStore, LogArchive
+from enums import Role, PlayerStatus
+
+
+def _make_room_and_users():
+    u1 = User.alloc('Alice', 's1', 't1')
+    u2 = User.alloc('Bob',   's2', 't2')
+    u3 = User.alloc('Carol', 's3', 't3')
+    config = {
+        'wolf_num': 1, 'citizen_num': 1, 'god_wolf': [], 'god_citizen': ['预言家'],
+        'witch_rule': '仅第一夜可自救', 'guard_rule': '同时被守被救时，对象死亡',
+        'sheriff_bomb_rule': '双爆吞警徽',
+    }
+    room = Room.alloc(config)
+    for u in (u1, u2, u3):
+        room.add_player(u)
+    return room, u1, u2, u3
+
+
+def test_checkpoint_round_trip(tmp_path):
+    """Tokens, a night checkpoint and the journaled log survive a restart."""
+    from models.room import role_classes
+    path = str(tmp_path / 'state.db')
+    room, u1, u2, u3 = _make_room_and_users()
+    store = GameStore(path)
+    store.start()
+    Global.store = store
+    try:
+        for u, role in zip((u1, u2, u3), (Role.WOLF, Role.CITIZEN, Role.SEER)):
+            u.role, u.role_instance, u.status = role, role_classes[role](u), PlayerStatus.ALIVE
+            store.save_token(u.reconnect_token, u.nick)
+        store.save_token('t4', 'Dave')  # 只在大厅登录过：重启后不恢复
+        u2.status = PlayerStatus.DEAD
+        u3.skill['last_checked'] = {'Alice': Role.WOLF}
+        room.started, room.round = True, 2
+        room.skill['sheriff_captain'] = 'Carol'
+        room.checkpoint()
+        room.broadcast_msg('天亮了')
+        u1.send_msg('你的身份是：狼人')
+        store.sync_room(room)
+        expected_log = list(room.log)
+        room_id = room.id
+    finally:
+        store.close()
+        Global.store = None
+        for u in (u1, u2, u3):
+            Global.users.pop(u.nick, None)
+        Global.remove_room(room.id)
+
+    store = GameStore(path)
+    tokens, rooms = store.restore()
+    store.start()
+    store.close()
+    try:
+        assert tokens == {'t1': 'Alice', 't2': 'Bob', 't3': 'Carol'}
+        assert 'Dave' not in Global.users and not GameStore(path).nick_in_use('Dave')
+        [restored] = rooms
+        assert restored.id == room_id and Global.get_room(room_id) is restored
+        assert restored.started and restored.round == 2
+        assert restored.skill['sheriff_captain'] == 'Carol'
+        assert [u.seat for u in restored.players.values()] == [1, 2, 3]
+        alice, bob, carol = (restored.players[n] for n in ('Alice', 'Bob', 'Carol'))
+        assert alice.role == Role.WOLF and alice.role_instance.user is alice
+        assert bob.status == PlayerStatus.DEAD
+        assert carol.skill['last_checked'] == {'Alice': Role.WOLF}
+        assert alice.sid is None and alice.room is restored
+        assert list(restored.log) == expected_log
+    finally:
+        for nick in ('Alice', 'Bob', 'Carol'):
+            Global.users.pop(nick, None)
+        Global.remove_room(room_id)
+
+
+def test_spilled_log_pages_back_from_journal(tmp_path, monkeypatch):
+    from models.message_log import SEGMENT
+    from models.system import Config
+    monkeypatch.setattr(Config, 'LOG_MEMORY_ENTRIES', SEGMENT)
+    room, u1, u2, u3 = _make_room_and_users()
+    store = GameStore(str(tmp_path / 'state.db'))
+    store.start()
+    Global.store = store
+    try:
+        start = len(room.log)  # join announcements come first
+        for i in range(3 * SEGMENT):
+            room.broadcast_msg(f'公告{i}')
+            u1.send_msg(f'私信{i}')
+        for u in (u1, u2, u3):
+            u.get_pending_messages()
+        store.sync_room(room)
+        store.close()  # flush the journal
+
+        room.spill_log()
+        assert room.log.first_seq == (start + 5 * SEGMENT) // SEGMENT * SEGMENT
+        page, more = asyncio.run(room.history('Bob', limit=SEGMENT))
+        assert [m['text'] for m in page] == [f'公告{i}' for i in range(2 * SEGMENT, 3 * SEGMENT)] and more
+        page, more = asyncio.run(room.history('Alice', before=start + 4, limit=4))
+        assert [m['text'] for m in page] == ['公告0', '私信0', '公告1', '私信1'] and more  # join messages are older
+    finally:
+        store.close()
+        Global.store = None
+        for u in (u1, u2, u3):
+            Global.users.pop(u.nick, None)
+        Global.remove_room(room.id)
+
+
+def test_log_stays_bounded_without_persistence(tmp_path, monkeypatch):
+    """Without MV_STATE_DB old segments go to the log archive, but only once the writer committed them."""
+    from models.message_log import SEGMENT
+    from models.system import Config
+    monkeypatch.setattr(Config, 'LOG_MEMORY_ENTRIES', SEGMENT)
+    monkeypatch.setattr(Config, 'LOG_ARCHIVE', str(tmp_path / 'logs.db'))
+    assert Global.store is None
+    room, u1, u2, u3 = _make_room_and_users()
+    archive = LogArchive(Config.LOG_ARCHIVE)  # writer not started yet: nothing gets committed
+    monkeypatch.setattr(Global, '_log_archive', archive)
+    try:
+        start = len(room.log)
+        for i in range(3 * SEGMENT):
+            room.broadcast_msg(f'公告{i}')
+        for u in (u1, u2, u3):
+            u.get_pending_messages()
+        room.spill_log()
+        assert room.log.first_seq == 0  # queued but not committed: everything stays in memory
+
+        archive.start()
+        for i in range(3 * SEGMENT, 30 * SEGMENT):
+            room.broadcast_msg(f'公告{i}')
+            if i % SEGMENT == 0:
+                for u in (u1, u2, u3):
+                    u.get_pending_messages()
+                room.spill_log()
+                archive.flush()
+                assert len(room.log) - room.log.first_seq <= Config.LOG_MEMORY_ENTRIES + 3 * SEGMENT
+        assert room.log.first_seq > 20 * SEGMENT
+        page, more = asyncio.run(room.history('Bob', before=start + 2, limit=2))
+        assert [m['text'] for m in page] == ['公告0', '公告1'] and more
+    finally:
+        Global.close_log_archive()
+        for u in (u1, u2, u3):
+            Global.users.pop(u.nick, None)
+        Global.remove_room(room.id)
@@ -0,0 +1,68 @@
+"""Tests for the per-game timeline (models/runtime/timeline.py) and its report."""
+import asyncio
+import json
+
+from models.runtime import clock, timeline
+from tests import report_timeline
+
+
+def test_segments_split_time_by_activity():
+    async def run():
+        tl = timeline.GameTimeline()
+        tl.start(7, 'preset_x', 6)
+        await asyncio.sleep(3)                      # 发牌：other
+        tl.enter('WOLF', 1)
+        with tl.activity('scripted'):
+            await asyncio.sleep(2)
+        with tl.activity('players'):
+            await asyncio.sleep(4)
+            tl.action()
+            await asyncio.sleep(1)
+            tl.action()
+        with tl.activity('padding'):
+            await asyncio.sleep(10)
+        tl.timeout(2)
+        tl.enter('SEER', 1)
+        tl.enter('WITCH', 1)                        # SEER took no time: not recorded
+        await asyncio.sleep(1)
+        return tl.finish('done', 1)
+
+    record = clock.run_virtual(run())
+    assert record['duration'] == 21
+    assert record['totals'] == {'scripted': 2, 'padding': 10, 'players': 5, 'other': 4}
+    assert (record['actions'], record['timeouts']) == (2, 2)
+    assert [s['stage'] for s in record['segments']] == ['NONE', 'WOLF', 'WITCH']
+    wolf = record['segments'][1]
+    assert (wolf['start'], wolf['duration']) == (3, 17)
+    assert (wolf['first_action'], wolf['last_action'], wolf['timeouts']) == (6, 7, 2)
+
+
+def test_inactive_timeline_is_a_no_op():
+    tl = timeline.GameTimeline()
+    with tl.activity('players'):
+        tl.action()
+        tl.timeout()
+    assert tl.finish('done', 0) is None
+
+
+def test_report_aggregates_per_preset(tmp_path):
+    def record(duration, scripted, first):
+        return {'room': 1, 'preset': 'p', 'players': 6, 'started_at': 0, 'reason': 'r', 'rounds': 2,
+                'duration': duration, 'actions': 3, 'timeouts': 1,
+                'totals': {'scripted': scripted, 'padding': 0, 'players': duration - scripted, 'other': 0},
+                'segments': [{'stage': 'WOLF', 'round': 1, 'start': 0, 'duration': duration,
+                              'scripted': scripted, 'padding': 0, 'players': duration - scripted, 'other': 0,
+                              'actions': 3, 'timeouts': 1, 'first_action': first, 'last_action': first}]}
+
+    path = tmp_path / 'timeline.jsonl'
+    timeline.append_jsonl(str(path), record(600, 150, 4))
+    timeline.append_jsonl(str(path), record(1200, 150, None))
+    records = report_timeline.load([str(path)])
+    assert [json.loads(line)['duration'] for line in path.read_text(encoding='utf-8').splitlines()] == [600, 1200]
+
+    summary = report_timeline.summarize(records)
+    assert (summary['games'], summary['avg_minutes'], summary['games_per_hour']) == (2, 15, 4)
+    assert summary['share'] == {'scripted': 16.7, 'padding': 0, 'players': 83.3, 'other': 0}
+    wolf = summary['stages']['WOLF']
+    assert (wolf['seconds_per_game'], wolf['scripted_per_game'], wolf['first_action']) == (900, 150, 4)
+    assert wolf['timeouts_per_visit'] == 1